@@ -0,0 +1,311 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import uuid
+from collections.abc import Iterable
+from datetime import UTC, date, datetime
+from typing import Any
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Connection,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    event,
+    insert,
+    inspect,
+)
+from sqlalchemy.orm import Session, SessionTransaction
+
+from app.database import AsyncSession, async_session
+from app.ids import uuid7
+
+logger = logging.getLogger(__name__)
+
+# Monthly tables, a month of old events is dropped with its table instead of
+# being deleted row by row
+PARTITION_PREFIX = "audit_events_"
+_PARTITION_NAME = re.compile(rf"^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$")
+
+# Rows per INSERT, well below SQLite's limit of bound parameters per statement
+MAX_ROWS_PER_INSERT = 1000
+
+# session.info key of the events recorded in the session's transaction
+_STAGED = "audit_events"
+
+_partition_metadata = MetaData()
+
+
+def partition_name(occurred_at: datetime | date) -> str:
+    return f"{PARTITION_PREFIX}{occurred_at.year:04d}_{occurred_at.month:02d}"
+
+
+def partition_table(name: str) -> Table:
+    """Table of one month of audit events, append-only."""
+    if name in _partition_metadata.tables:
+        return _partition_metadata.tables[name]
+    return Table(
+        name,
+        _partition_metadata,
+        Column("id", Uuid, primary_key=True),
+        Column("occurred_at", DateTime(timezone=True), nullable=False),
+        Column("action", String, nullable=False),
+        Column("actor_id", Uuid, nullable=True),
+        Column("organization_id", Uuid, nullable=True, index=True),
+        Column("subject_id", Uuid, nullable=True),
+        Column("details", JSON, nullable=False),
+    )
+
+
+def list_audit_partitions(connection: Connection) -> list[tuple[date, str]]:
+    """Months that have a partition table and the table names, oldest first."""
+    partitions = []
+    for name in inspect(connection).get_table_names():
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((date(int(match[1]), int(match[2]), 1), name))
+    return sorted(partitions)
+
+
+def drop_audit_partitions_before(connection: Connection, month: date) -> list[str]:
+    """Drop the partitions of the months before `month`, for `run_sync`."""
+    dropped = []
+    for partition_month, name in list_audit_partitions(connection):
+        if partition_month < month.replace(day=1):
+            partition_table(name).drop(connection)
+            _partition_metadata.remove(partition_table(name))
+            dropped.append(name)
+    return dropped
+
+
+def record_audit_event(
+    db: AsyncSession,
+    action: str,
+    *,
+    actor_id: uuid.UUID | None = None,
+    organization_id: uuid.UUID | None = None,
+    subject_id: uuid.UUID | None = None,
+    **details: Any,
+) -> None:
+    """
+    Record an audit event as part of the session's transaction.
+
+    Nothing is written here. The event is handed to the audit log once the
+    transaction commits and dropped if it rolls back, so the trail only
+    contains changes that really happened.
+    """
+    db.info.setdefault(_STAGED, []).append(
+        {
+            "id": uuid7(),
+            # Timestamps are stored naive in UTC
+            "occurred_at": datetime.now(UTC).replace(tzinfo=None),
+            "action": action,
+            "actor_id": actor_id,
+            "organization_id": organization_id,
+            "subject_id": subject_id,
+            "details": details,
+        }
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_staged_events(session: Session) -> None:
+    staged = session.info.pop(_STAGED, None)
+    if staged:
+        get_audit_log().submit(staged)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_events(session: Session, transaction: SessionTransaction) -> None:
+    # Commits took their events already, whatever is left was rolled back
+    if transaction.parent is None:
+        session.info.pop(_STAGED, None)
+
+
+def _to_json(row: dict[str, Any]) -> str:
+    return json.dumps(row, default=str)
+
+
+def _from_json(line: str) -> dict[str, Any]:
+    row = json.loads(line)
+    row["id"] = uuid.UUID(row["id"])
+    row["occurred_at"] = datetime.fromisoformat(row["occurred_at"])
+    for key in ("actor_id", "organization_id", "subject_id"):
+        if row[key] is not None:
+            row[key] = uuid.UUID(row[key])
+    return row
+
+
+class AuditLog:
+    """
+    Buffered writer of audit events.
+
+    Committed events are buffered in memory and written with multi-row
+    inserts whenever `flush_size` of them are waiting or `flush_interval`
+    seconds passed. A failed write keeps the events for the next attempt.
+    Events that can't be written at shutdown are spilled to a JSON lines
+    file and written after the next start.
+    """
+
+    def __init__(
+        self,
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        spill_path: str = "audit_spill.jsonl",
+    ) -> None:
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._buffer: list[dict[str, Any]] = []
+        self._flush_needed = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._created_partitions: set[str] = set()
+
+    def submit(self, rows: Iterable[dict[str, Any]]) -> None:
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.flush_size:
+            self._flush_needed.set()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        partitions: dict[str, list[dict[str, Any]]] = {}
+        for row in rows:
+            partitions.setdefault(partition_name(row["occurred_at"]), []).append(row)
+        async with async_session() as session:
+            connection = await session.connection()
+            for name, partition_rows in partitions.items():
+                table = partition_table(name)
+                if name not in self._created_partitions:
+                    await connection.run_sync(table.create, checkfirst=True)
+                for start in range(0, len(partition_rows), MAX_ROWS_PER_INSERT):
+                    await connection.execute(
+                        insert(table).values(
+                            partition_rows[start : start + MAX_ROWS_PER_INSERT]
+                        )
+                    )
+            await session.commit()
+        self._created_partitions.update(partitions)
+
+    async def flush(self) -> int:
+        """
+        Write the buffered events, returns how many were written.
+
+        On failure the events go back to the buffer and the error is raised.
+        """
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                await self._write(rows)
+            except BaseException:
+                # Events submitted meanwhile stay after the older ones
+                self._buffer[:0] = rows
+                raise
+            return len(rows)
+
+    async def _run_forever(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), self.flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_needed.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception(f"Writing {len(self)} audit events failed")
+
+    def _load_spill(self) -> None:
+        if not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path) as file:
+            rows = [_from_json(line) for line in file if line.strip()]
+        os.remove(self.spill_path)
+        self._buffer[:0] = rows
+        logger.info(f"Loaded {len(rows)} spilled audit events")
+
+    def start(self) -> None:
+        """Pick up events spilled at the last shutdown and start flushing."""
+        if self._task is None:
+            self._load_spill()
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        """Stop flushing and write the rest, spilling it to a file if that fails."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(
+                f"Writing {len(self)} audit events failed, "
+                f"spilling them to {self.spill_path}"
+            )
+            with open(self.spill_path, "a") as file:
+                for row in self._buffer:
+                    file.write(_to_json(row) + "\n")
+            self._buffer = []
+
+
+_audit_log: AuditLog | None = None
+
+
+def create_audit_log() -> AuditLog:
+    """
+    Create the audit log, configured by AUDIT_FLUSH_SIZE (default 500 events),
+    AUDIT_FLUSH_INTERVAL (seconds, default 1) and AUDIT_SPILL_PATH (default
+    audit_spill.jsonl in the working directory).
+    """
+    global _audit_log
+    if _audit_log is None:
+        _audit_log = AuditLog(
+            flush_size=int(os.environ.get("AUDIT_FLUSH_SIZE", "500")),
+            flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1")),
+            spill_path=os.environ.get("AUDIT_SPILL_PATH", "audit_spill.jsonl"),
+        )
+    return _audit_log
+
+
+def get_audit_log() -> AuditLog:
+    """
+    Get the audit log, creating it if needed.
+    """
+    return create_audit_log()
+
+
+async def close_audit_log() -> None:
+    """
+    Write the buffered events and stop the audit log.
+    """
+    global _audit_log
+    if _audit_log is not None:
+        await _audit_log.stop()
+        _audit_log = None
+
+
+__all__ = [
+    "AuditLog",
+    "close_audit_log",
+    "create_audit_log",
+    "drop_audit_partitions_before",
+    "get_audit_log",
+    "list_audit_partitions",
+    "partition_name",
+    "partition_table",
+    "record_audit_event",
+]
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Events queued for one connected client.
+
+    The queue is bounded. A client that doesn't keep up is evicted instead of
+    letting its backlog grow, its stream then ends and the client reconnects
+    and refetches.
+    """
+
+    def __init__(self, profile_id: uuid.UUID, max_queued: int) -> None:
+        self.profile_id = profile_id
+        self.evicted = False
+        # None marks the end of the stream
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(max_queued)
+
+    def offer(self, message: str) -> bool:
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self) -> None:
+        # Drop the backlog so the end marker fits
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def messages(self, keepalive_interval: float) -> AsyncIterator[str]:
+        """Yield SSE messages, with a comment line when idle so proxies keep the connection."""
+        while True:
+            try:
+                message = await asyncio.wait_for(self._queue.get(), keepalive_interval)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+
+
+class Broadcaster:
+    """
+    In-process fan-out of change events to the subscribed profiles.
+
+    Only clients connected to this worker are reached.
+    """
+
+    def __init__(self, max_queued: int = 100, keepalive_interval: float = 15.0) -> None:
+        self._max_queued = max_queued
+        self.keepalive_interval = keepalive_interval
+        self._subscriptions: dict[uuid.UUID, set[Subscription]] = {}
+
+    def subscribe(self, profile_id: uuid.UUID) -> Subscription:
+        subscription = Subscription(profile_id, self._max_queued)
+        self._subscriptions.setdefault(profile_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.profile_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.profile_id]
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def publish(
+        self, profile_ids: Iterable[uuid.UUID], event: str, data: dict[str, Any]
+    ) -> None:
+        """Queue an event for every connection of the given profiles."""
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        for profile_id in profile_ids:
+            for subscription in list(self._subscriptions.get(profile_id, ())):
+                if not subscription.offer(message):
+                    logger.warning(f"Evicting slow event subscriber {profile_id}")
+                    subscription.evicted = True
+                    self.unsubscribe(subscription)
+                    subscription.close()
+
+    def close(self) -> None:
+        """End every stream, e.g. on shutdown."""
+        for subscriptions in list(self._subscriptions.values()):
+            for subscription in subscriptions:
+                subscription.close()
+        self._subscriptions.clear()
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+_broadcaster: Broadcaster | None = None
+
+
+def create_broadcaster() -> Broadcaster:
+    """
+    Create the broadcaster, each connection queues at most SSE_QUEUE_SIZE
+    (default 100) events before it is evicted. Idle streams get a keepalive
+    comment every SSE_KEEPALIVE_INTERVAL seconds (default 15).
+    """
+    global _broadcaster
+    if _broadcaster is None:
+        _broadcaster = Broadcaster(
+            max_queued=int(os.environ.get("SSE_QUEUE_SIZE", "100")),
+            keepalive_interval=float(os.environ.get("SSE_KEEPALIVE_INTERVAL", "15")),
+        )
+    return _broadcaster
+
+
+def get_broadcaster() -> Broadcaster:
+    """
+    Get the broadcaster, creating it if needed.
+    """
+    return create_broadcaster()
+
+
+def close_broadcaster() -> None:
+    """
+    End all event streams.
+    """
+    global _broadcaster
+    if _broadcaster is not None:
+        _broadcaster.close()
+        _broadcaster = None
+
+
+__all__ = [
+    "Broadcaster",
+    "Subscription",
+    "close_broadcaster",
+    "create_broadcaster",
+    "get_broadcaster",
+]
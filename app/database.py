@@ -1,45 +1,264 @@
 import os
+import sqlite3
+import uuid
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from fastapi import Request
+from sqlalchemy import Connection, Table, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.organization_search import (
+    create_organization_search_index,
+    drop_organization_search_index,
+)
+from app.queries import install_statement_cache_stats
+from app.sql_logging import current_route, install_sql_logging
+from app.tracing import install_sql_tracing
+
 # TODO: We want to use PostgreSQL in production, but for now we are using SQLite
 
-# Use test.db for tests, dev.db otherwise to prevent wiping my data when running tests
+# Tests use a database of their own, in memory unless DATABASE_IN_MEMORY=0
+# (then test.db), to prevent wiping my data in dev.db when running tests
 is_testing = "PYTEST_VERSION" in os.environ
-DATABASE_URL = f"sqlite+aiosqlite:///./{'test.db' if is_testing else 'dev.db'}"
 
-_engine = create_async_engine(DATABASE_URL, echo=True)
+
+def in_memory_url(name: str) -> str:
+    """
+    URL of an in-memory database shared by all connections of the process.
+
+    SQLite's memdb VFS, unlike `:memory:`, lets every pooled connection open
+    the same database with transactions of its own. It locks coarser than a
+    file: reads wait while another connection has uncommitted writes.
+    """
+    return f"sqlite+aiosqlite:///file:/{name}?vfs=memdb&uri=true"
+
+
+def _is_in_memory(url: str) -> bool:
+    return make_url(url).query.get("vfs") == "memdb"
+
+
+# DATABASE_IN_MEMORY=1 keeps the database in memory. Nothing survives a
+# restart, but there's no file to create or wipe, for tests (the default
+# under pytest) and quick local runs.
+in_memory = os.environ.get("DATABASE_IN_MEMORY", "1" if is_testing else "0") == "1"
+DATABASE_URL = (
+    in_memory_url("test" if is_testing else "dev")
+    if in_memory
+    else f"sqlite+aiosqlite:///./{'test.db' if is_testing else 'dev.db'}"
+)
+
+# Organizations and their memberships can be spread over several databases by
+# organization ID, so writes to different organizations don't queue up behind
+# SQLite's single writer. Everything else stays in the global database.
+SHARDED_TABLES = ("organizations", "organization_memberships")
+
+
+# In-memory databases are freed with their last connection, one is kept open
+# for the process so disposing of an engine doesn't lose the data
+_in_memory_keepalive: dict[str, sqlite3.Connection] = {}
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    if _is_in_memory(url):
+        if url not in _in_memory_keepalive:
+            database = make_url(url).database
+            _in_memory_keepalive[url] = sqlite3.connect(
+                f"{database}?vfs=memdb", uri=True, check_same_thread=False
+            )
+        # SQLAlchemy would share a single connection for an in-memory URL
+        engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool)
+    else:
+        engine = create_async_engine(url)
+    install_sql_logging(engine)
+    install_statement_cache_stats(engine)
+    install_sql_tracing(engine)
+    return engine
+
+
+_engine = _create_engine(DATABASE_URL)
 async_session = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
 
+_shard_engines: list[AsyncEngine] = []
+_shard_sessions: list[async_sessionmaker[AsyncSession]] = []
+
+
+def configure_shards(urls: list[str] | None) -> None:
+    """
+    Keep the sharded tables in a database per URL, or in the global one for None.
+
+    The number of shards decides where every organization lives, it can't
+    change once organizations were created without moving them.
+    """
+    global _shard_engines, _shard_sessions
+    _shard_engines = [_engine] if urls is None else [_create_engine(u) for u in urls]
+    _shard_sessions = [
+        async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        for engine in _shard_engines
+    ]
+
+
+def shard_urls(database_url: str, shards: int) -> list[str]:
+    """
+    URLs of shards next to a database, `<name>.shard<i>.db` files beside it.
+
+    An in-memory database gets in-memory shards `<name>_shard<i>`.
+    """
+    if _is_in_memory(database_url):
+        name = (make_url(database_url).database or "").removeprefix("file:/")
+        return [in_memory_url(f"{name}_shard{index}") for index in range(shards)]
+    base = database_url.removesuffix(".db")
+    return [f"{base}.shard{index}.db" for index in range(shards)]
+
+
+def _shard_urls_from_env() -> list[str] | None:
+    """DATABASE_SHARDS shards next to the global database, unsharded by default."""
+    shards = int(os.environ.get("DATABASE_SHARDS", "1"))
+    if shards <= 1:
+        return None
+    return shard_urls(DATABASE_URL, shards)
+
+
+configure_shards(_shard_urls_from_env())
+
+
+def is_sharded() -> bool:
+    return _shard_engines[0] is not _engine
+
+
+def shard_count() -> int:
+    return len(_shard_engines)
+
+
+def shard_for(organization_id: uuid.UUID) -> int:
+    """Shard of an organization, the random low bits of its ID spread them evenly."""
+    return organization_id.int % len(_shard_engines)
+
+
+def shard_session(shard: int) -> AsyncSession:
+    """New session on a shard, on the global database when unsharded."""
+    return _shard_sessions[shard]()
+
+
+def _tables(sharded: bool) -> list[Table]:
+    return [
+        table
+        for table in SQLModel.metadata.sorted_tables
+        if (table.name in SHARDED_TABLES) == sharded or not is_sharded()
+    ]
+
+
+def _create_tables(connection: Connection, sharded: bool) -> None:
+    SQLModel.metadata.create_all(connection, tables=_tables(sharded))
+    if sharded or not is_sharded():
+        create_organization_search_index(connection)
+
+
+def _drop_tables(connection: Connection, sharded: bool) -> None:
+    if sharded or not is_sharded():
+        drop_organization_search_index(connection)
+    SQLModel.metadata.drop_all(connection, tables=_tables(sharded))
+
+
+def _delete_rows(connection: Connection, sharded: bool) -> None:
+    # The search index triggers forget the deleted organizations
+    for table in reversed(_tables(sharded)):
+        connection.execute(table.delete())
+
 
 async def init_db() -> None:
     async with _engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(_create_tables, False)
+    await init_shards()
+
+
+async def init_shards() -> None:
+    """Create the sharded tables in every shard, nothing to do when unsharded."""
+    if is_sharded():
+        for engine in _shard_engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(_create_tables, True)
 
 
 async def nuke_db() -> None:
     async with _engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
+        await conn.run_sync(_drop_tables, False)
+    if is_sharded():
+        for engine in _shard_engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(_drop_tables, True)
 
 
-async def get_db_session() -> AsyncGenerator[AsyncSession]:
+async def clear_db() -> None:
+    """
+    Delete every row, keeping the schema, in the global database and the shards.
+
+    Much faster than recreating the tables, to start each test afresh.
+    """
+    async with _engine.begin() as conn:
+        await conn.run_sync(_delete_rows, False)
+    if is_sharded():
+        for engine in _shard_engines:
+            async with engine.begin() as conn:
+                await conn.run_sync(_delete_rows, True)
+
+
+async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession]:
+    """
+    Database session for the request.
+
+    Sessions are lazy, a connection is only checked out from the pool when the
+    first statement runs, and it is returned on commit. The session is also
+    registered on the request so `release_db_sessions` can close it as soon as
+    the handler returns instead of when the dependency is torn down.
+    """
+    route = request.scope.get("route")
+    current_route.set(f"{request.method} {getattr(route, 'path', request.url.path)}")
     async with async_session() as session:
+        if not hasattr(request.state, "db_sessions"):
+            request.state.db_sessions = []
+        request.state.db_sessions.append(session)
         yield session
 
 
+async def release_db_sessions(request: Request) -> None:
+    """Close the request's sessions, returning any connection they hold to the pool."""
+    for session in getattr(request.state, "db_sessions", []):
+        # close() doesn't expire loaded objects, background tasks can still read them
+        await session.close()
+
+
 async def close_db_connection() -> None:
-    """Close the database connection when the application shuts down."""
+    """Close the database connections when the application shuts down."""
     if _engine is not None:
         await _engine.dispose()
+    await close_shards()
+
+
+async def close_shards() -> None:
+    """Close the connections to the shards."""
+    if is_sharded():
+        for engine in _shard_engines:
+            await engine.dispose()
 
 
 __all__ = [
     "AsyncSession",
     "create_async_engine",
     "get_db_session",
+    "release_db_sessions",
     "init_db",
+    "init_shards",
+    "clear_db",
     "close_db_connection",
+    "close_shards",
+    "configure_shards",
+    "is_sharded",
+    "shard_count",
+    "shard_for",
+    "shard_session",
+    "shard_urls",
+    "in_memory_url",
 ]
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+
+from sqlmodel import col, select
+
+from app.database import async_session
+from app.models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+
+class Denylist:
+    """
+    In-memory set of banned emails, checked before a request touches the DB.
+
+    New bans are picked up incrementally by querying `banned_at` past the
+    newest ban seen so far. Unbans and deleted profiles are only noticed by the
+    periodic full reload, the profile lookup still checks `banned_at` anyway.
+    """
+
+    def __init__(
+        self, refresh_interval: float = 10.0, full_reload_interval: float = 300.0
+    ) -> None:
+        self._emails: set[str] = set()
+        self._newest_ban: datetime | None = None
+        self._refresh_interval = refresh_interval
+        self._full_reload_interval = full_reload_interval
+        self._last_full_reload: float | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def is_banned(self, email: str) -> bool:
+        return email in self._emails
+
+    def ban(self, email: str) -> None:
+        """Add an email right away, without waiting for the next refresh."""
+        self._emails.add(email)
+
+    async def reload(self) -> None:
+        """Replace the denylist with every banned profile."""
+        async with async_session() as session:
+            result = await session.exec(
+                select(Profile.email, Profile.banned_at).where(
+                    col(Profile.banned_at).is_not(None)
+                )
+            )
+            rows = result.all()
+        self._emails = {email for email, _ in rows}
+        self._newest_ban = max(
+            (banned_at for _, banned_at in rows if banned_at), default=None
+        )
+        self._last_full_reload = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Add profiles banned since the last refresh, or reload when due."""
+        if (
+            self._last_full_reload is None
+            or time.monotonic() - self._last_full_reload > self._full_reload_interval
+        ):
+            await self.reload()
+            return
+
+        query = select(Profile.email, Profile.banned_at).where(
+            col(Profile.banned_at).is_not(None)
+        )
+        if self._newest_ban is not None:
+            # >= so bans committed later with the same timestamp are not missed
+            query = query.where(col(Profile.banned_at) >= self._newest_ban)
+        async with async_session() as session:
+            rows = (await session.exec(query)).all()
+        for email, banned_at in rows:
+            self._emails.add(email)
+            if banned_at and (self._newest_ban is None or banned_at > self._newest_ban):
+                self._newest_ban = banned_at
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Refreshing the denylist failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._emails)
+
+
+_denylist: Denylist | None = None
+
+
+def create_denylist() -> Denylist:
+    """
+    Create the denylist, refresh intervals are read from DENYLIST_REFRESH_INTERVAL
+    and DENYLIST_FULL_RELOAD_INTERVAL (seconds).
+    """
+    global _denylist
+    if _denylist is None:
+        _denylist = Denylist(
+            refresh_interval=float(os.environ.get("DENYLIST_REFRESH_INTERVAL", "10")),
+            full_reload_interval=float(
+                os.environ.get("DENYLIST_FULL_RELOAD_INTERVAL", "300")
+            ),
+        )
+    return _denylist
+
+
+def get_denylist() -> Denylist:
+    """
+    Get the denylist, creating an empty one if needed.
+    """
+    return create_denylist()
+
+
+async def close_denylist() -> None:
+    """
+    Stop refreshing the denylist.
+    """
+    global _denylist
+    if _denylist:
+        await _denylist.stop()
+        _denylist = None
+
+
+__all__ = ["Denylist", "close_denylist", "create_denylist", "get_denylist"]
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+from collections.abc import Callable, Iterable
+from functools import partial
+from types import FrameType
+from typing import Any, NamedTuple
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class DrainReport(NamedTuple):
+    """Requests still running when the drain deadline passed, and how long it took."""
+
+    pending: list[str]
+    waited: float
+
+
+class Drain:
+    """
+    Tracks in-flight requests so shutdown can let them finish.
+
+    A request counts until its ASGI call returns, which is after its
+    `BackgroundTasks` (the welcome email) ran too. Once draining, new requests
+    are turned away with 503 and `Connection: close`, so load balancers and
+    clients retry on another instance.
+    """
+
+    def __init__(self, timeout: float = 20.0) -> None:
+        self.timeout = timeout
+        self.draining = False
+        self._in_flight: dict[int, str] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._drained: asyncio.Future[DrainReport] | None = None
+        self._server_handlers: dict[int, Callable[..., Any]] = {}
+        self._signal_task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def started(self, key: int, description: str) -> None:
+        self._in_flight[key] = description
+        self._idle.clear()
+
+    def finished(self, key: int) -> None:
+        self._in_flight.pop(key, None)
+        if not self._in_flight:
+            self._idle.set()
+
+    async def drain(self) -> DrainReport:
+        """
+        Stop accepting requests and wait up to `timeout` for the running ones.
+
+        Logs and returns what was still running at the deadline. Draining
+        again waits for, and returns, the same report.
+        """
+        self.draining = True
+        if self._drained is None:
+            self._drained = asyncio.ensure_future(self._drain())
+        return await asyncio.shield(self._drained)
+
+    async def _drain(self) -> DrainReport:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.timeout)
+        except TimeoutError:
+            pass
+        report = DrainReport(
+            pending=sorted(self._in_flight.values()), waited=loop.time() - started
+        )
+        message = json.dumps(
+            {
+                "drain": {
+                    "waited_s": round(report.waited, 3),
+                    "pending_requests": report.pending,
+                }
+            }
+        )
+        if report.pending:
+            logger.warning(message)
+        else:
+            logger.info(message)
+        return report
+
+    def handle_signals(
+        self,
+        before_drain: Callable[[], None] | None = None,
+        signals: Iterable[int] = (signal.SIGINT, signal.SIGTERM),
+    ) -> None:
+        """
+        Start draining as soon as the server is told to stop, for uvicorn.
+
+        Uvicorn closes its sockets and waits for the open connections when it
+        gets SIGINT or SIGTERM, the lifespan shutdown only runs afterwards,
+        with nothing left to drain or turn away. Its handlers, installed with
+        `signal.signal` before the lifespan starts, are wrapped: the drain
+        starts right away and the server is told once it finished, so load
+        balancers see the 503s meanwhile. A second signal stops the server
+        right away. Servers handling signals otherwise are left alone.
+
+        `before_drain` ends requests that wouldn't finish on their own.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for signum in signals:
+            server_handler = signal.getsignal(signum)
+            if not callable(server_handler):
+                continue
+            self._server_handlers[signum] = server_handler
+            signal.signal(
+                signum, partial(self._on_signal, loop, server_handler, before_drain)
+            )
+
+    def restore_signal_handlers(self) -> None:
+        """Give the signals back to the server's handlers."""
+        for signum, server_handler in self._server_handlers.items():
+            signal.signal(signum, server_handler)
+        self._server_handlers.clear()
+
+    def _on_signal(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        server_handler: Callable[..., Any],
+        before_drain: Callable[[], None] | None,
+        signum: int,
+        frame: FrameType | None,
+    ) -> None:
+        if self.draining:
+            server_handler(signum, frame)
+            return
+        self.draining = True
+
+        async def drain_then_stop() -> None:
+            if before_drain is not None:
+                before_drain()
+            await self.drain()
+            server_handler(signum, None)
+
+        def start() -> None:
+            self._signal_task = loop.create_task(drain_then_stop())
+
+        loop.call_soon_threadsafe(start)
+
+
+class DrainMiddleware:
+    """
+    ASGI middleware registering every HTTP request with the drain.
+
+    Plain ASGI rather than `@app.middleware("http")`, whose handlers return
+    before the response body is sent and the background tasks ran.
+    """
+
+    def __init__(self, app: ASGIApp, drain: Drain | None = None) -> None:
+        self.app = app
+        self._drain = drain
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        drain = self._drain if self._drain is not None else get_drain()
+        if drain.draining:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is shutting down"},
+                headers={"Connection": "close", "Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        key = id(scope)
+        drain.started(key, f"{scope['method']} {scope['path']}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            drain.finished(key)
+
+
+_drain: Drain | None = None
+
+
+def create_drain() -> Drain:
+    """
+    Create the drain, waiting up to DRAIN_TIMEOUT seconds (default 20) at shutdown.
+
+    Keep it below the time the process manager gives the app to stop. A
+    drain left over from a previous shutdown is replaced.
+    """
+    global _drain
+    if _drain is None or _drain.draining:
+        _drain = Drain(timeout=float(os.environ.get("DRAIN_TIMEOUT", "20")))
+    return _drain
+
+
+def get_drain() -> Drain:
+    """
+    Get the drain, creating it if needed.
+    """
+    return _drain if _drain is not None else create_drain()
+
+
+async def close_drain() -> DrainReport | None:
+    """
+    Drain the in-flight requests, if a shutdown signal didn't already.
+
+    The drain keeps turning requests away for the rest of the shutdown.
+    """
+    if _drain is None:
+        return None
+    report = await _drain.drain()
+    _drain.restore_signal_handlers()
+    return report
+
+
+__all__ = [
+    "Drain",
+    "DrainMiddleware",
+    "DrainReport",
+    "close_drain",
+    "create_drain",
+    "get_drain",
+]
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import col, select
+
+from app.database import async_session
+from app.models.firebase_auth_user import FirebaseAuthUser
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Only these routes honor the header, anything else is handled as usual
+IDEMPOTENT_ROUTES = frozenset({("POST", "/organizations/"), ("POST", "/profiles/")})
+
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger(__name__)
+
+
+class Idempotency:
+    """
+    Replays the stored response of POSTs retried with the same Idempotency-Key.
+
+    The first request claims the key by inserting a pending row, so duplicates
+    arriving meanwhile (from any worker) wait for its response instead of
+    running the handler again. Responses with a 5xx status aren't stored, the
+    key is released and the retry runs the handler.
+
+    The pending claim is a lease, renewed while the handler runs, so a slow
+    handler never gets its key claimed a second time. A claim left behind by a
+    crashed worker expires after `lease` seconds. The `ttl` of the replayed
+    response only starts once it is stored.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        wait_timeout: float = 10.0,
+        lease: float = 60.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self._ttl = timedelta(seconds=ttl)
+        self._wait_timeout = wait_timeout
+        self._lease = timedelta(seconds=lease)
+        self._poll_interval = poll_interval
+        # Requests in flight in this process, local duplicates don't need to poll
+        self._in_flight: dict[tuple[str, str], asyncio.Event] = {}
+
+    async def _claim(self, user_id: str, key: str, request_hash: str) -> bool:
+        now = datetime.utcnow()
+        async with async_session() as session:
+            dialect = session.bind.dialect.name if session.bind else "sqlite"
+            insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+            # An expired key counts as unused, even if the sweeper didn't get to it
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    col(IdempotencyKey.user_id) == user_id,
+                    col(IdempotencyKey.key) == key,
+                    col(IdempotencyKey.expires_at) < now,
+                )
+            )
+            result = await session.execute(
+                insert(IdempotencyKey)
+                .values(
+                    user_id=user_id,
+                    key=key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=now + self._lease,
+                )
+                .on_conflict_do_nothing(index_elements=["user_id", "key"])
+            )
+            await session.commit()
+        return result.rowcount == 1  # type: ignore[attr-defined]
+
+    async def _renew(self, user_id: str, key: str) -> None:
+        """Extend the claim while the handler runs, until cancelled"""
+        while True:
+            # A few chances to renew before the lease runs out
+            await asyncio.sleep(self._lease.total_seconds() / 3)
+            try:
+                async with async_session() as session:
+                    await session.execute(
+                        update(IdempotencyKey)
+                        .where(
+                            col(IdempotencyKey.user_id) == user_id,
+                            col(IdempotencyKey.key) == key,
+                            col(IdempotencyKey.status_code).is_(None),
+                        )
+                        .values(expires_at=datetime.utcnow() + self._lease)
+                    )
+                    await session.commit()
+            except Exception:
+                logger.exception("Renewing the idempotency key claim failed")
+
+    async def _load(self, user_id: str, key: str) -> IdempotencyKey | None:
+        async with async_session() as session:
+            result = await session.exec(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+                )
+            )
+            return result.first()
+
+    async def _complete(
+        self, user_id: str, key: str, response: Response, body: bytes
+    ) -> None:
+        async with async_session() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(
+                    col(IdempotencyKey.user_id) == user_id,
+                    col(IdempotencyKey.key) == key,
+                )
+                .values(
+                    status_code=response.status_code,
+                    media_type=response.media_type
+                    or response.headers.get("content-type"),
+                    response_body=body,
+                    expires_at=datetime.utcnow() + self._ttl,
+                )
+            )
+            await session.commit()
+
+    async def _release(self, user_id: str, key: str) -> None:
+        async with async_session() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    col(IdempotencyKey.user_id) == user_id,
+                    col(IdempotencyKey.key) == key,
+                    col(IdempotencyKey.status_code).is_(None),
+                )
+            )
+            await session.commit()
+
+    async def _wait(self, user_id: str, key: str, timeout: float) -> None:
+        event = self._in_flight.get((user_id, key))
+        if event is None:
+            # Handled by another worker, all we can do is poll
+            await asyncio.sleep(min(self._poll_interval, timeout))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except TimeoutError:
+            pass
+
+    async def _handle(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+        user_id: str,
+        key: str,
+    ) -> Response:
+        event = asyncio.Event()
+        self._in_flight[(user_id, key)] = event
+        renewal = asyncio.create_task(self._renew(user_id, key))
+        try:
+            try:
+                response = await call_next(request)
+                body = b"".join(
+                    [chunk async for chunk in response.body_iterator]  # type: ignore[attr-defined]
+                )
+            finally:
+                renewal.cancel()
+            if response.status_code < 500:
+                await self._complete(user_id, key, response, body)
+            else:
+                await self._release(user_id, key)
+        except BaseException:
+            await self._release(user_id, key)
+            raise
+        finally:
+            event.set()
+            del self._in_flight[(user_id, key)]
+
+        return Response(
+            content=body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+        )
+
+    async def middleware(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        firebase_user = getattr(request.state, "firebase_user", None)
+        if (
+            key is None
+            or (request.method, request.url.path) not in IDEMPOTENT_ROUTES
+            or not isinstance(firebase_user, FirebaseAuthUser)
+        ):
+            return await call_next(request)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return JSONResponse(
+                status_code=400,
+                content={"detail": "Idempotency-Key must be 1 to 255 characters"},
+            )
+
+        user_id = firebase_user.user_id
+        request_hash = hashlib.sha256(
+            f"{request.method} {request.url.path}\n".encode() + await request.body()
+        ).hexdigest()
+        deadline = asyncio.get_running_loop().time() + self._wait_timeout
+        while True:
+            if await self._claim(user_id, key, request_hash):
+                return await self._handle(request, call_next, user_id, key)
+
+            stored = await self._load(user_id, key)
+            if stored is None:
+                continue  # released since the claim failed, try again
+            if stored.request_hash != request_hash:
+                return JSONResponse(
+                    status_code=422,
+                    content={
+                        "detail": "Idempotency-Key was already used for another request"
+                    },
+                )
+            if stored.status_code is not None:
+                return Response(
+                    content=stored.response_body,
+                    status_code=stored.status_code,
+                    media_type=stored.media_type,
+                    headers={REPLAYED_HEADER: "true"},
+                )
+
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                return JSONResponse(
+                    status_code=409,
+                    content={
+                        "detail": "A request with this Idempotency-Key is in progress"
+                    },
+                )
+            await self._wait(user_id, key, remaining)
+
+
+def create_idempotency() -> Idempotency:
+    """
+    Create the Idempotency-Key handling from environment variables.
+
+    Stored responses are kept for IDEMPOTENCY_KEY_TTL seconds (default 24h),
+    duplicates wait up to IDEMPOTENCY_WAIT_TIMEOUT seconds (default 10) for
+    the first request before getting a 409. A claim is held for
+    IDEMPOTENCY_LEASE seconds (default 60) at a time, renewed while the first
+    request is handled.
+    """
+    return Idempotency(
+        ttl=float(os.environ.get("IDEMPOTENCY_KEY_TTL", "86400")),
+        wait_timeout=float(os.environ.get("IDEMPOTENCY_WAIT_TIMEOUT", "10")),
+        lease=float(os.environ.get("IDEMPOTENCY_LEASE", "60")),
+    )
+
+
+__all__ = [
+    "IDEMPOTENCY_HEADER",
+    "IDEMPOTENT_ROUTES",
+    "Idempotency",
+    "REPLAYED_HEADER",
+    "create_idempotency",
+]
@@ -0,0 +1,46 @@
+import os
+import threading
+import time
+import uuid
+
+_lock = threading.Lock()
+_last_timestamp_ms = 0
+_last_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUIDv7 (RFC 9562), used as the default primary key.
+
+    The first 48 bits are the Unix timestamp in milliseconds, so new rows land
+    at the right edge of the primary key index instead of random pages, and
+    ids sort by creation time. Within one millisecond the 12 `rand_a` bits are
+    a counter seeded randomly, which keeps ids from one process monotonic.
+    Existing uuid4 ids stay valid, both are stored in the same column type.
+    """
+    global _last_timestamp_ms, _last_counter
+    with _lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms > _last_timestamp_ms:
+            counter = int.from_bytes(os.urandom(2)) & 0x7FF
+        else:
+            # Same millisecond (or the clock went back), keep counting up
+            timestamp_ms = _last_timestamp_ms
+            counter = _last_counter + 1
+            if counter > 0xFFF:
+                timestamp_ms += 1
+                counter = int.from_bytes(os.urandom(2)) & 0x7FF
+        _last_timestamp_ms, _last_counter = timestamp_ms, counter
+
+    rand_b = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+__all__ = ["uuid7"]
@@ -0,0 +1,346 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+InvalidationCallback = Callable[[str], None]
+
+V = TypeVar("V")
+
+
+def profile_key(email: str) -> str:
+    return f"profile:{email}"
+
+
+def organization_key(organization_id: uuid.UUID) -> str:
+    return f"organization:{organization_id}"
+
+
+def membership_key(organization_id: uuid.UUID, profile_id: uuid.UUID) -> str:
+    # Nested under the organization key so invalidating an org drops its memberships
+    return f"{organization_key(organization_id)}:membership:{profile_id}"
+
+
+class InvalidationTransportProtocol(Protocol):
+    async def publish(self, origin: str, keys: list[str]) -> None: ...
+    async def poll(self, origin: str) -> list[str]: ...
+    async def close(self) -> None: ...
+
+
+class LocalInvalidationTransport(InvalidationTransportProtocol):
+    """Transport for a single worker, events never leave the process."""
+
+    async def publish(self, origin: str, keys: list[str]) -> None:
+        pass
+
+    async def poll(self, origin: str) -> list[str]:
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteInvalidationTransport(InvalidationTransportProtocol):
+    """
+    Change log stored in a SQLite file shared by all workers on the host.
+
+    Every worker appends its events and polls for rows written by the others.
+    Rows older than `retention_seconds` are pruned on publish.
+    """
+
+    def __init__(self, path: str, retention_seconds: float = 60.0) -> None:
+        self._path = path
+        self._retention_seconds = retention_seconds
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._last_id: int | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self._path, check_same_thread=False, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "origin TEXT NOT NULL, "
+                "key TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _publish(self, origin: str, keys: list[str]) -> None:
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "INSERT INTO invalidations (origin, key, created_at) "
+                    "VALUES (?, ?, ?)",
+                    [(origin, key, now) for key in keys],
+                )
+                connection.execute(
+                    "DELETE FROM invalidations WHERE created_at < ?",
+                    (now - self._retention_seconds,),
+                )
+
+    def _poll(self, origin: str) -> list[str]:
+        with self._lock:
+            connection = self._connect()
+            if self._last_id is None:
+                # A fresh worker has nothing cached yet, skip the backlog
+                row = connection.execute(
+                    "SELECT COALESCE(MAX(id), 0) FROM invalidations"
+                ).fetchone()
+                self._last_id = row[0]
+                return []
+            rows = connection.execute(
+                "SELECT id, origin, key FROM invalidations WHERE id > ? ORDER BY id",
+                (self._last_id,),
+            ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return [key for _, row_origin, key in rows if row_origin != origin]
+
+    async def publish(self, origin: str, keys: list[str]) -> None:
+        await asyncio.to_thread(self._publish, origin, keys)
+
+    async def poll(self, origin: str) -> list[str]:
+        return await asyncio.to_thread(self._poll, origin)
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class InvalidationBus:
+    """
+    Fan-out of keyed invalidation events to the in-process caches of every worker.
+
+    Events are delivered to local subscribers immediately and to other workers
+    through the transport, which is polled by a background task.
+    """
+
+    def __init__(
+        self, transport: InvalidationTransportProtocol, poll_interval: float = 0.5
+    ) -> None:
+        self.origin = uuid.uuid4().hex
+        self._transport = transport
+        self._poll_interval = poll_interval
+        self._subscribers: list[InvalidationCallback] = []
+        self._task: asyncio.Task[None] | None = None
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: InvalidationCallback) -> None:
+        self._subscribers.remove(callback)
+
+    def _deliver(self, keys: list[str]) -> None:
+        for key in keys:
+            for callback in self._subscribers:
+                try:
+                    callback(key)
+                except Exception:
+                    logger.exception(f"Invalidation subscriber failed for key {key}")
+
+    async def publish(self, *keys: str) -> None:
+        """Publish invalidation events, call only after the change was committed."""
+        if not keys:
+            return
+        self._deliver(list(keys))
+        await self._transport.publish(self.origin, list(keys))
+
+    async def poll_once(self) -> int:
+        """Deliver events published by other workers, returns their count."""
+        keys = await self._transport.poll(self.origin)
+        self._deliver(keys)
+        return len(keys)
+
+    async def _poll_forever(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Polling for invalidation events failed")
+            await asyncio.sleep(self._poll_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._poll_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._transport.close()
+
+
+class InvalidatingCache(Generic[V]):
+    """
+    Small in-process cache whose entries are dropped on invalidation events.
+
+    An event for key `k` removes `k` and every entry nested under it (`k:...`).
+    Nothing is cached while the cache isn't subscribed to a bus, no event
+    would drop the entries.
+    """
+
+    def __init__(
+        self,
+        bus: InvalidationBus | None = None,
+        max_size: int = 10_000,
+        ttl: float = 60.0,
+    ) -> None:
+        self._entries: dict[str, tuple[float, V]] = {}
+        self._max_size = max_size
+        self._ttl = ttl
+        self._bus: InvalidationBus | None = None
+        # Bumped by every invalidation, a load that raced one isn't stored
+        self._generation = 0
+        self.subscribe_to(bus)
+
+    def subscribe_to(self, bus: InvalidationBus | None) -> None:
+        """Follow the events of another bus (or none), forgetting every entry."""
+        if self._bus is not None:
+            self._bus.unsubscribe(self.invalidate)
+        self._entries.clear()
+        self._bus = bus
+        if bus is not None:
+            bus.subscribe(self.invalidate)
+
+    def get(self, key: str) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        if self._bus is None:
+            return
+        if len(self._entries) >= self._max_size and key not in self._entries:
+            # Evict the oldest insertion, dicts keep insertion order
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (time.monotonic() + self._ttl, value)
+
+    async def get_or_load(
+        self, key: str, load: Callable[[], Awaitable[V | None]]
+    ) -> V | None:
+        """Get the cached value, or load it and cache it unless it is None."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        generation = self._generation
+        value = await load()
+        # The event may have been about the value that was just loaded
+        if value is not None and generation == self._generation:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        self._generation += 1
+        self._entries.pop(key, None)
+        prefix = f"{key}:"
+        for cached_key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[cached_key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_bus: InvalidationBus | None = None
+# Caches of the application, they follow whichever bus is current
+_caches: list[InvalidatingCache[Any]] = []
+
+
+def create_invalidating_cache(
+    max_size: int = 10_000, ttl: float = 60.0
+) -> InvalidatingCache[Any]:
+    """
+    Create a cache subscribed to the invalidation bus, once there is one.
+    """
+    cache: InvalidatingCache[Any] = InvalidatingCache(_bus, max_size, ttl)
+    _caches.append(cache)
+    return cache
+
+
+def create_invalidation_bus() -> InvalidationBus:
+    """
+    Create the invalidation bus using the transport selected by environment variables.
+
+    INVALIDATION_TRANSPORT is either "local" (default) or "sqlite", the latter
+    shares events through the file at INVALIDATION_SQLITE_PATH.
+    """
+    global _bus
+    if _bus is None:
+        transport_name = os.environ.get("INVALIDATION_TRANSPORT", "local")
+        transport: InvalidationTransportProtocol
+        if transport_name == "local":
+            transport = LocalInvalidationTransport()
+        elif transport_name == "sqlite":
+            transport = SQLiteInvalidationTransport(
+                os.environ.get("INVALIDATION_SQLITE_PATH", "./invalidation.db")
+            )
+        else:
+            raise ValueError(f"Unknown INVALIDATION_TRANSPORT: {transport_name}")
+        _bus = InvalidationBus(
+            transport,
+            poll_interval=float(os.environ.get("INVALIDATION_POLL_INTERVAL", "0.5")),
+        )
+        for cache in _caches:
+            cache.subscribe_to(_bus)
+    return _bus
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """
+    Get the invalidation bus, creating it if needed.
+    """
+    return create_invalidation_bus()
+
+
+async def close_invalidation_bus() -> None:
+    """
+    Stop polling and close the transport of the invalidation bus.
+    """
+    global _bus
+    if _bus:
+        await _bus.stop()
+        _bus = None
+        for cache in _caches:
+            cache.subscribe_to(None)
+
+
+__all__ = [
+    "InvalidationBus",
+    "InvalidatingCache",
+    "InvalidationTransportProtocol",
+    "LocalInvalidationTransport",
+    "SQLiteInvalidationTransport",
+    "close_invalidation_bus",
+    "create_invalidating_cache",
+    "create_invalidation_bus",
+    "get_invalidation_bus",
+    "membership_key",
+    "organization_key",
+    "profile_key",
+]
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+from datetime import UTC, date, datetime
+
+from app.audit import drop_audit_partitions_before
+from app.database import async_session
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+def _months_ago(today: date, months: int) -> date:
+    month_index = today.year * 12 + today.month - 1 - months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+async def drop_expired_audit_partitions(retention_months: int) -> list[str]:
+    """
+    Drop the audit partitions older than the last `retention_months` months.
+
+    The current month counts as one. Returns the names of the dropped tables.
+    """
+    cutoff = _months_ago(datetime.now(UTC).date(), retention_months - 1)
+    async with async_session() as session:
+        connection = await session.connection()
+        dropped = await connection.run_sync(drop_audit_partitions_before, cutoff)
+        await session.commit()
+    return dropped
+
+
+async def _run_forever(interval: float, retention_months: int) -> None:
+    while True:
+        try:
+            dropped = await drop_expired_audit_partitions(retention_months)
+            if dropped:
+                logger.info(f"Dropped audit partitions {', '.join(dropped)}")
+        except Exception:
+            logger.exception("Dropping expired audit partitions failed")
+        await asyncio.sleep(interval)
+
+
+def start_audit_retention() -> None:
+    """
+    Start dropping expired audit partitions in the background.
+
+    Events are kept for AUDIT_RETENTION_MONTHS (default 13) months, checked
+    every AUDIT_RETENTION_INTERVAL seconds (default 86400).
+    """
+    global _task
+    if _task is None:
+        interval = float(os.environ.get("AUDIT_RETENTION_INTERVAL", "86400"))
+        retention_months = int(os.environ.get("AUDIT_RETENTION_MONTHS", "13"))
+        _task = asyncio.create_task(_run_forever(interval, retention_months))
+
+
+async def stop_audit_retention() -> None:
+    """
+    Stop the background retention job.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__ = [
+    "drop_expired_audit_partitions",
+    "start_audit_retention",
+    "stop_audit_retention",
+]
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import delete, tuple_
+from sqlmodel import col, select
+
+from app.database import async_session
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+async def purge_expired_idempotency_keys(batch_size: int = 1000) -> int:
+    """
+    Delete expired idempotency keys, at most `batch_size` per transaction.
+
+    Returns the number of deleted keys.
+    """
+    deleted = 0
+    while True:
+        async with async_session() as session:
+            result = await session.exec(
+                select(IdempotencyKey.user_id, IdempotencyKey.key)
+                .where(col(IdempotencyKey.expires_at) < datetime.utcnow())
+                .limit(batch_size)
+            )
+            expired = result.all()
+            if not expired:
+                return deleted
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    tuple_(col(IdempotencyKey.user_id), col(IdempotencyKey.key)).in_(
+                        expired
+                    )
+                )
+            )
+            await session.commit()
+            deleted += len(expired)
+
+
+async def _run_forever(interval: float, batch_size: int) -> None:
+    while True:
+        try:
+            deleted = await purge_expired_idempotency_keys(batch_size)
+            if deleted:
+                logger.info(f"Purged {deleted} expired idempotency keys")
+        except Exception:
+            logger.exception("Purging expired idempotency keys failed")
+        await asyncio.sleep(interval)
+
+
+def start_idempotency_key_sweeper() -> None:
+    """
+    Start deleting expired idempotency keys in the background.
+
+    The interval and batch size are read from IDEMPOTENCY_SWEEP_INTERVAL
+    (seconds, default 300) and IDEMPOTENCY_SWEEP_BATCH_SIZE (default 1000).
+    """
+    global _task
+    if _task is None:
+        interval = float(os.environ.get("IDEMPOTENCY_SWEEP_INTERVAL", "300"))
+        batch_size = int(os.environ.get("IDEMPOTENCY_SWEEP_BATCH_SIZE", "1000"))
+        _task = asyncio.create_task(_run_forever(interval, batch_size))
+
+
+async def stop_idempotency_key_sweeper() -> None:
+    """
+    Stop the background sweeper.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__ = [
+    "purge_expired_idempotency_keys",
+    "start_idempotency_key_sweeper",
+    "stop_idempotency_key_sweeper",
+]
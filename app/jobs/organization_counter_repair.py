@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any
+
+from sqlalchemy import func, or_, update
+from sqlmodel import col, select
+
+from app.database import shard_count, shard_session
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership, OrganizationRole
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+def recount_organizations(*where: Any) -> Any:
+    """
+    UPDATE recomputing the counters of the organizations matching `where`.
+
+    Counts come from correlated subqueries, so each row is fixed atomically
+    even while memberships change concurrently. Only rows whose counters are
+    off are written.
+    """
+    member_count = (
+        select(func.count())
+        .where(col(OrganizationMembership.organization_id) == col(Organization.id))
+        .scalar_subquery()
+    )
+    admin_count = (
+        select(func.count())
+        .where(
+            col(OrganizationMembership.organization_id) == col(Organization.id),
+            col(OrganizationMembership.role) == OrganizationRole.ADMIN,
+        )
+        .scalar_subquery()
+    )
+    return (
+        update(Organization)
+        .where(
+            *where,
+            or_(
+                col(Organization.member_count) != member_count,
+                col(Organization.admin_count) != admin_count,
+            ),
+        )
+        .values(member_count=member_count, admin_count=admin_count)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def repair_organization_counters(batch_size: int = 1000) -> int:
+    """
+    Recompute member and admin counters of all organizations.
+
+    Organizations are walked by id in batches, each in its own short
+    transaction, one shard after the other. Returns the number of
+    organizations that had wrong counters.
+    """
+    repaired = 0
+    for shard in range(shard_count()):
+        repaired += await _repair_shard(shard, batch_size)
+    return repaired
+
+
+async def _repair_shard(shard: int, batch_size: int) -> int:
+    repaired = 0
+    last_id: uuid.UUID | None = None
+    while True:
+        async with shard_session(shard) as session:
+            query = select(Organization.id).order_by(col(Organization.id))
+            if last_id is not None:
+                query = query.where(col(Organization.id) > last_id)
+            organization_ids = (await session.exec(query.limit(batch_size))).all()
+            if not organization_ids:
+                return repaired
+            result = await session.execute(
+                recount_organizations(col(Organization.id).in_(organization_ids))
+            )
+            await session.commit()
+            repaired += result.rowcount  # type: ignore[attr-defined]
+            last_id = organization_ids[-1]
+
+
+async def _run_forever(interval: float, batch_size: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            repaired = await repair_organization_counters(batch_size)
+            if repaired:
+                logger.warning(f"Repaired counters of {repaired} organizations")
+        except Exception:
+            logger.exception("Repairing organization counters failed")
+
+
+def start_organization_counter_repair() -> None:
+    """
+    Start recomputing organization counters in the background.
+
+    The interval and batch size are read from ORGANIZATION_COUNTER_REPAIR_INTERVAL
+    (seconds, default 3600) and ORGANIZATION_COUNTER_REPAIR_BATCH_SIZE
+    (default 1000).
+    """
+    global _task
+    if _task is None:
+        interval = float(os.environ.get("ORGANIZATION_COUNTER_REPAIR_INTERVAL", "3600"))
+        batch_size = int(
+            os.environ.get("ORGANIZATION_COUNTER_REPAIR_BATCH_SIZE", "1000")
+        )
+        _task = asyncio.create_task(_run_forever(interval, batch_size))
+
+
+async def stop_organization_counter_repair() -> None:
+    """
+    Stop the background repair, an interrupted batch is simply redone next time.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__ = [
+    "recount_organizations",
+    "repair_organization_counters",
+    "start_organization_counter_repair",
+    "stop_organization_counter_repair",
+]
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+
+from sqlalchemy import delete
+from sqlmodel import col, select
+
+from app.database import async_session, shard_count, shard_session
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+from app.sharding import remove_from_directory
+
+logger = logging.getLogger(__name__)
+
+_task: asyncio.Task[None] | None = None
+
+
+async def purge_deleted_organizations(batch_size: int = 1000) -> int:
+    """
+    Hard-delete soft-deleted organizations and their memberships.
+
+    Rows are removed in batches of at most `batch_size`, each batch in its own
+    short transaction so other writers are never blocked for long. Each shard
+    is purged in turn. Returns the number of deleted rows.
+    """
+    deleted = 0
+    for shard in range(shard_count()):
+        deleted += await _purge_shard(shard, batch_size)
+    return deleted
+
+
+async def _purge_shard(shard: int, batch_size: int) -> int:
+    deleted = 0
+    deleted_organization_ids = select(Organization.id).where(
+        col(Organization.deleted_at).is_not(None)
+    )
+
+    # Memberships first, so the organizations are never referenced when removed
+    while True:
+        async with shard_session(shard) as session:
+            result = await session.exec(
+                select(OrganizationMembership.id)
+                .where(
+                    col(OrganizationMembership.organization_id).in_(
+                        deleted_organization_ids
+                    )
+                )
+                .limit(batch_size)
+            )
+            membership_ids = result.all()
+            if not membership_ids:
+                break
+            await session.execute(
+                delete(OrganizationMembership).where(
+                    col(OrganizationMembership.id).in_(membership_ids)
+                )
+            )
+            await session.commit()
+            deleted += len(membership_ids)
+
+    while True:
+        async with shard_session(shard) as session:
+            result = await session.exec(deleted_organization_ids.limit(batch_size))
+            organization_ids = result.all()
+            if not organization_ids:
+                break
+            await session.execute(
+                delete(Organization).where(col(Organization.id).in_(organization_ids))
+            )
+            await session.commit()
+            deleted += len(organization_ids)
+        # After the shard, the directory may only list too much
+        async with async_session() as session:
+            await remove_from_directory(session, organization_ids=organization_ids)
+            await session.commit()
+
+    return deleted
+
+
+async def _run_forever(interval: float, batch_size: int) -> None:
+    while True:
+        try:
+            deleted = await purge_deleted_organizations(batch_size)
+            if deleted:
+                logger.info(f"Purged {deleted} rows of deleted organizations")
+        except Exception:
+            logger.exception("Purging deleted organizations failed")
+        await asyncio.sleep(interval)
+
+
+def start_organization_reaper() -> None:
+    """
+    Start purging soft-deleted organizations in the background.
+
+    The interval and batch size are read from ORGANIZATION_REAPER_INTERVAL
+    (seconds, default 60) and ORGANIZATION_REAPER_BATCH_SIZE (default 1000).
+    """
+    global _task
+    if _task is None:
+        interval = float(os.environ.get("ORGANIZATION_REAPER_INTERVAL", "60"))
+        batch_size = int(os.environ.get("ORGANIZATION_REAPER_BATCH_SIZE", "1000"))
+        _task = asyncio.create_task(_run_forever(interval, batch_size))
+
+
+async def stop_organization_reaper() -> None:
+    """
+    Stop the background reaper, an interrupted batch is simply retried next time.
+    """
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+__all__ = [
+    "purge_deleted_organizations",
+    "start_organization_reaper",
+    "stop_organization_reaper",
+]
@@ -0,0 +1,212 @@
+import asyncio
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class LagHistogram:
+    """Histogram of event loop scheduling delays."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, lag_ms: float) -> None:
+        self.counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self.count += 1
+        self.total_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    def snapshot(self) -> dict[str, object]:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(LAG_BUCKETS_MS, self.counts)}
+        buckets["gt_1000ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task that sleeps `interval`.
+
+    Any synchronous work on the loop (sync logging, large Pydantic validation,
+    SQLAlchemy internals) shows up as lag. The histogram is logged and reset
+    every `report_interval` seconds, as a warning when the worst lag reached
+    `warning_ms`.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        report_interval: float = 60.0,
+        warning_ms: float = 100.0,
+    ) -> None:
+        self._interval = interval
+        self._report_interval = report_interval
+        self._warning_ms = warning_ms
+        self.histogram = LagHistogram()
+        self._task: asyncio.Task[None] | None = None
+
+    def report(self) -> dict[str, object]:
+        """Log the histogram collected since the last report and start a new one."""
+        histogram, self.histogram = self.histogram, LagHistogram()
+        snapshot = histogram.snapshot()
+        # Warnings show up without any logging configured
+        level = (
+            logging.WARNING if histogram.max_ms >= self._warning_ms else logging.INFO
+        )
+        logger.log(level, json.dumps({"event_loop_lag": snapshot}))
+        return snapshot
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval)
+            now = loop.time()
+            self.histogram.record(max(0.0, now - started - self._interval) * 1000)
+            if now - last_report >= self._report_interval:
+                self.report()
+                last_report = now
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class BlockingCallDetector:
+    """
+    Logs the stack of the event loop thread whenever the loop is blocked.
+
+    A task on the loop keeps updating a heartbeat, a watchdog thread checks it
+    and, once it is older than `threshold` seconds, logs what the loop thread
+    is executing right now. Each stall is reported once.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self._threshold = threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def _beat(self) -> None:
+        while True:
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self._threshold / 4)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self._threshold / 4):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat
+            if blocked_for < self._threshold or heartbeat == reported_heartbeat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id or 0)
+            if frame is None:
+                continue
+            reported_heartbeat = heartbeat
+            logger.warning(
+                f"Event loop blocked for {blocked_for * 1000:.0f} ms, "
+                f"currently executing:\n{''.join(traceback.format_stack(frame))}"
+            )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._loop_thread_id = threading.get_ident()
+            self._heartbeat = time.monotonic()
+            self._stopped.clear()
+            self._task = asyncio.create_task(self._beat())
+            self._thread = threading.Thread(
+                target=self._watch, name="blocking-call-detector", daemon=True
+            )
+            self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_monitor: LoopLagMonitor | None = None
+_detector: BlockingCallDetector | None = None
+
+
+def start_loop_monitor() -> None:
+    """
+    Start the loop lag monitor and, when configured, the blocking call detector.
+
+    LOOP_LAG_REPORT_INTERVAL (seconds, default 60, 0 disables the monitor) sets
+    how often the lag histogram is logged, as a warning when the lag reached
+    LOOP_LAG_WARNING_MS (default 100). LOOP_BLOCKING_THRESHOLD_MS (default
+    0, disabled) enables stack traces for callbacks blocking longer than that.
+    """
+    global _monitor, _detector
+    report_interval = float(os.environ.get("LOOP_LAG_REPORT_INTERVAL", "60"))
+    if _monitor is None and report_interval > 0:
+        _monitor = LoopLagMonitor(
+            report_interval=report_interval,
+            warning_ms=float(os.environ.get("LOOP_LAG_WARNING_MS", "100")),
+        )
+        _monitor.start()
+    threshold_ms = float(os.environ.get("LOOP_BLOCKING_THRESHOLD_MS", "0"))
+    if _detector is None and threshold_ms > 0:
+        _detector = BlockingCallDetector(threshold_ms / 1000)
+        _detector.start()
+
+
+async def stop_loop_monitor() -> None:
+    """
+    Stop monitoring, logging the lag collected since the last report.
+    """
+    global _monitor, _detector
+    if _monitor is not None:
+        await _monitor.stop()
+        _monitor.report()
+        _monitor = None
+    if _detector is not None:
+        await _detector.stop()
+        _detector = None
+
+
+__all__ = [
+    "BlockingCallDetector",
+    "LagHistogram",
+    "LoopLagMonitor",
+    "start_loop_monitor",
+    "stop_loop_monitor",
+]
@@ -4,32 +4,96 @@ from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi_pagination import add_pagination
 
+from app.audit import close_audit_log, create_audit_log
+from app.broadcaster import close_broadcaster
 from app.database import close_db_connection, init_db
+from app.denylist import close_denylist, create_denylist, get_denylist
+from app.drain import DrainMiddleware, close_drain, create_drain
+from app.idempotency import create_idempotency
 from app.indiepitcher import (
     close_async_indiepitcher_client,
     create_async_indiepitcher_client,
 )
+from app.invalidation import close_invalidation_bus, create_invalidation_bus
+from app.jobs.audit_retention import start_audit_retention, stop_audit_retention
+from app.jobs.idempotency_key_sweeper import (
+    start_idempotency_key_sweeper,
+    stop_idempotency_key_sweeper,
+)
+from app.jobs.organization_counter_repair import (
+    start_organization_counter_repair,
+    stop_organization_counter_repair,
+)
+from app.jobs.organization_reaper import (
+    start_organization_reaper,
+    stop_organization_reaper,
+)
+from app.loop_monitor import start_loop_monitor, stop_loop_monitor
 from app.models.firebase_auth_user import FirebaseAuthUser
+from app.profiling import create_request_profiler
+from app.queries import get_statement_cache_stats
+from app.routes.admin import router as admin_router
+from app.routes.bootstrap import router as bootstrap_router
 from app.routes.organizations import router as profiles_router
 from app.routes.profiles import router as organization_router
+from app.sql_logging import start_sql_logging, stop_sql_logging
+from app.tracing import close_tracer, create_tracer, traced
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: Initialize the database before yielding
+    start_sql_logging()
+    start_loop_monitor()
     await init_db()
+    denylist = create_denylist()
+    await denylist.reload()
+    denylist.start()
     create_async_indiepitcher_client()
+    create_invalidation_bus().start()
+    start_organization_reaper()
+    start_idempotency_key_sweeper()
+    start_organization_counter_repair()
+    create_audit_log().start()
+    start_audit_retention()
+    # Before the server stops listening on SIGTERM, see Drain.handle_signals.
+    # Event streams never finish by themselves, they are ended first.
+    create_drain().handle_signals(before_drain=close_broadcaster)
     yield
     # Shutdown: Add any cleanup code here if needed
+    # End the event streams first, the server waits for open responses
+    close_broadcaster()
+    # Let in-flight requests and their background tasks (welcome emails)
+    # finish before anything they use is closed, new requests get a 503.
+    # Already done when the shutdown came from a signal.
+    await close_drain()
+    await stop_audit_retention()
+    # Writes the buffered events, after the last request finished
+    await close_audit_log()
+    await stop_organization_counter_repair()
+    await stop_idempotency_key_sweeper()
+    await stop_organization_reaper()
+    await close_invalidation_bus()
+    await close_denylist()
     await close_async_indiepitcher_client()
     await close_db_connection()
+    get_statement_cache_stats().report()
+    await stop_loop_monitor()
+    close_tracer()
+    stop_sql_logging()
 
 
 app = FastAPI(lifespan=lifespan)
 add_pagination(app)  # important! add pagination to your app
 
+# Registered before the auth middleware so it runs inside it, with the user known
+app.middleware("http")(
+    traced("idempotency_middleware")(create_idempotency().middleware)
+)
+
 
 @app.middleware("http")
+@traced("jwt_auth_middleware")
 async def jwt_auth_middleware(request: Request, call_next) -> Response:
     if request.url.path == "/":
         return await call_next(request)
@@ -48,21 +112,39 @@ async def jwt_auth_middleware(request: Request, call_next) -> Response:
     # This micks JWT token verification process, we'd greab a user id and email from the token.
     if token == "petr_token":
         # TODO: check if there's a user with this email in the database
-        # TODO: check if the user is banned
-        request.state.firebase_user = FirebaseAuthUser(
+        firebase_user = FirebaseAuthUser(
             email="petr@indiepitcher.com",
             user_id="1234567890",  # This would be the Firebase user ID
         )
-        return await call_next(request)
     elif token == "john_token":
-        request.state.firebase_user = FirebaseAuthUser(
+        firebase_user = FirebaseAuthUser(
             email="john@indiepitcher.com",
             user_id="0987654321",  # This would be the Firebase user ID
         )
-        return await call_next(request)
     else:
         return JSONResponse(status_code=401, content={"detail": "Invalid token"})
 
+    # Reject banned users before a DB session is opened
+    if get_denylist().is_banned(firebase_user.email):
+        return JSONResponse(status_code=403, content={"detail": "Profile is banned"})
+
+    request.state.firebase_user = firebase_user
+    return await call_next(request)
+
+
+# Registered last so it wraps the auth middleware too, not installed when disabled
+request_profiler = create_request_profiler()
+if request_profiler is not None:
+    app.middleware("http")(request_profiler.middleware)
+
+# Wraps everything but the tracer, a request ends after its background tasks ran
+app.add_middleware(DrainMiddleware)
+
+# Outermost, so the root span covers every other middleware
+tracer = create_tracer()
+if tracer is not None:
+    app.middleware("http")(tracer.middleware)
+
 
 # Configure CORS middleware
 # app.add_middleware(
@@ -76,6 +158,8 @@ async def jwt_auth_middleware(request: Request, call_next) -> Response:
 # Register the router
 app.include_router(profiles_router)
 app.include_router(organization_router)
+app.include_router(bootstrap_router)
+app.include_router(admin_router)
 
 
 @app.get("/")
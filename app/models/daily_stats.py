@@ -0,0 +1,28 @@
+from datetime import date
+from typing import ClassVar
+
+from sqlalchemy import Column, Integer
+from sqlmodel import Field, SQLModel
+
+
+class DailyStats(SQLModel, table=True):
+    """
+    Counters of one UTC day, rolled up as things happen.
+
+    Read by the admin stats endpoint instead of aggregating the base tables.
+    Rebuilt from the base tables by `rebuild_daily_stats`.
+    """
+
+    __tablename__: ClassVar[str] = "daily_stats"
+
+    day: date = Field(primary_key=True)
+    signups: int = Field(
+        default=0, sa_column=Column(Integer, nullable=False, server_default="0")
+    )
+    # Profiles that made an authenticated request that day
+    active_users: int = Field(
+        default=0, sa_column=Column(Integer, nullable=False, server_default="0")
+    )
+    organizations_created: int = Field(
+        default=0, sa_column=Column(Integer, nullable=False, server_default="0")
+    )
@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import ClassVar
+
+from sqlalchemy import Column, DateTime, LargeBinary
+from sqlmodel import Field, SQLModel
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """
+    Response stored for a POST sent with an Idempotency-Key header.
+
+    Keys are scoped per Firebase user. `status_code` is None while the first
+    request is still being handled, retries wait for it and then get the
+    stored response replayed.
+    """
+
+    __tablename__: ClassVar[str] = "idempotency_keys"
+    # The primary key is the only lookup, don't store the rows twice on SQLite
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    user_id: str = Field(primary_key=True, max_length=128)
+    key: str = Field(primary_key=True, max_length=255)
+    # Hash of the method, path and body, a key can't be reused for another request
+    request_hash: str = Field(max_length=64)
+
+    status_code: int | None = Field(default=None)
+    media_type: str | None = Field(default=None)
+    response_body: bytes | None = Field(
+        default=None, sa_column=Column(LargeBinary, nullable=True)
+    )
+
+    created_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
+    expires_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True),
+    )
@@ -0,0 +1,21 @@
+import uuid
+from typing import ClassVar
+
+from sqlmodel import Field, SQLModel
+
+
+class MembershipDirectoryEntry(SQLModel, table=True):
+    """
+    Which shard holds a profile's membership in an organization.
+
+    Kept in the global database next to the profiles, only when the
+    organizations are sharded. Lets the organizations of a profile be read
+    from the shards that have some instead of from all of them.
+    """
+
+    __tablename__: ClassVar[str] = "membership_directory"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    profile_id: uuid.UUID = Field(primary_key=True)
+    organization_id: uuid.UUID = Field(primary_key=True)
+    shard: int
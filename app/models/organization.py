@@ -2,9 +2,11 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, ClassVar
 
-from sqlalchemy import Column, DateTime, func
+from sqlalchemy import Column, DateTime, Integer, func
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.ids import uuid7
+
 if TYPE_CHECKING:
     from app.models.organization_membership import OrganizationMembership
 
@@ -15,12 +17,21 @@ class Organization(SQLModel, table=True):
     __tablename__: ClassVar[str] = "organizations"
 
     id: uuid.UUID = Field(
-        default_factory=uuid.uuid4,
+        default_factory=uuid7,
         primary_key=True,
         index=True,
     )
     name: str = Field(min_length=1, max_length=100)
 
+    # Denormalized from the memberships, kept up to date by the membership use
+    # cases in the same transaction and recomputed by the counter repair job
+    member_count: int = Field(
+        default=0, sa_column=Column(Integer, nullable=False, server_default="0")
+    )
+    admin_count: int = Field(
+        default=0, sa_column=Column(Integer, nullable=False, server_default="0")
+    )
+
     # Timestamp fields
     created_at: datetime = Field(
         default_factory=datetime.utcnow,
@@ -30,6 +41,11 @@ class Organization(SQLModel, table=True):
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime(timezone=True), nullable=False, onupdate=func.now()),
     )
+    # Set when the organization is deleted, rows are purged later by the reaper job
+    deleted_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True),
+    )
 
     memberships: list["OrganizationMembership"] = Relationship(
         back_populates="organization", cascade_delete=True
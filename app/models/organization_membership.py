@@ -6,6 +6,8 @@ from typing import TYPE_CHECKING, ClassVar
 from sqlalchemy import Column, DateTime, String, UniqueConstraint, func
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.ids import uuid7
+
 if TYPE_CHECKING:
     from app.models.organization import Organization
     from app.models.profile import Profile
@@ -28,7 +30,7 @@ class OrganizationMembership(SQLModel, table=True):
     __tablename__: ClassVar[str] = "organization_memberships"
 
     id: uuid.UUID = Field(
-        default_factory=uuid.uuid4,
+        default_factory=uuid7,
         primary_key=True,
         index=True,
     )
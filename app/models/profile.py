@@ -3,11 +3,14 @@ from datetime import datetime
 from typing import TYPE_CHECKING, ClassVar
 
 from pydantic import EmailStr
-from sqlalchemy import JSON, Column, DateTime, func
+from sqlalchemy import Column, DateTime, func
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.ids import uuid7
+
 if TYPE_CHECKING:
     from app.models.organization_membership import OrganizationMembership
+    from app.models.signup_attribution import ProfileAttribution
 
 
 class Profile(SQLModel, table=True):
@@ -16,7 +19,7 @@ class Profile(SQLModel, table=True):
     __tablename__: ClassVar[str] = "profiles"
 
     id: uuid.UUID = Field(
-        default_factory=uuid.uuid4,
+        default_factory=uuid7,
         primary_key=True,
         index=True,
     )
@@ -34,21 +37,21 @@ class Profile(SQLModel, table=True):
         sa_column=Column(DateTime(timezone=True), nullable=False, onupdate=func.now()),
     )
     banned_at: datetime | None = Field(
-        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True),
     )
     last_seen_at: datetime = Field(
         default_factory=datetime.utcnow,
         sa_column=Column(DateTime(timezone=True), nullable=False),
     )
 
-    # Attribution data stored as JSON
-    signup_attribution_data: dict[str, str] = Field(
-        default_factory=dict, sa_column=Column(JSON, nullable=False)
-    )
-
     organization_memberships: list["OrganizationMembership"] = Relationship(
         back_populates="profile", cascade_delete=True
     )
+    # Kept in its own table so profile reads never fetch it
+    signup_attribution: list["ProfileAttribution"] = Relationship(
+        back_populates="profile", cascade_delete=True
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -0,0 +1,39 @@
+import uuid
+from typing import TYPE_CHECKING, ClassVar
+
+from sqlmodel import Field, Relationship, SQLModel
+
+if TYPE_CHECKING:
+    from app.models.profile import Profile
+
+
+class AttributionValue(SQLModel, table=True):
+    """
+    Interned attribution header value.
+
+    The same user-agent and accept strings are sent by many users, so each
+    distinct value is stored once and referenced by id.
+    """
+
+    __tablename__: ClassVar[str] = "attribution_values"
+
+    id: int | None = Field(default=None, primary_key=True)
+    value: str = Field(unique=True)
+
+
+class ProfileAttribution(SQLModel, table=True):
+    """A single header captured when the profile signed up."""
+
+    __tablename__: ClassVar[str] = "profile_attributions"
+    # The primary key is the only index, don't store the rows twice on SQLite
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    profile_id: uuid.UUID = Field(
+        foreign_key="profiles.id",
+        primary_key=True,
+        ondelete="CASCADE",
+    )
+    header: str = Field(primary_key=True, max_length=100)
+    value_id: int = Field(foreign_key="attribution_values.id")
+
+    profile: "Profile" = Relationship(back_populates="signup_attribution")
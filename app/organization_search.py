@@ -0,0 +1,206 @@
+import uuid
+from typing import Any
+
+from sqlalchemy import Connection, func, inspect, literal_column, table
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import col, select
+
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+
+# Trigrams can't match anything shorter, shorter queries scan the caller's
+# organizations instead
+MIN_INDEXED_QUERY_LENGTH = 3
+
+# Profiles in at most this many organizations are searched without the index
+MEMBERSHIP_SCAN_LIMIT = 500
+
+# FTS5 index over organizations.name (SQLite), external content: it only keeps
+# the trigrams and reads the names from the organizations table by rowid.
+# Organizations don't have an INTEGER PRIMARY KEY, so a VACUUM may renumber
+# their rowids and has to be followed by rebuild_organization_search().
+ORGANIZATION_SEARCH = table("organization_search")
+
+_SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE organization_search USING fts5(
+        name, content='organizations', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS organization_search_insert
+    AFTER INSERT ON organizations BEGIN
+        INSERT INTO organization_search(rowid, name) VALUES (new.rowid, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS organization_search_delete
+    AFTER DELETE ON organizations BEGIN
+        INSERT INTO organization_search(organization_search, rowid, name)
+        VALUES ('delete', old.rowid, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS organization_search_update
+    AFTER UPDATE OF name ON organizations BEGIN
+        INSERT INTO organization_search(organization_search, rowid, name)
+        VALUES ('delete', old.rowid, old.name);
+        INSERT INTO organization_search(rowid, name) VALUES (new.rowid, new.name);
+    END
+    """,
+)
+
+_POSTGRESQL_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS ix_organizations_name_trgm
+    ON organizations USING gin (name gin_trgm_ops)
+    """,
+)
+
+
+def create_organization_search_index(connection: Connection) -> None:
+    """
+    Create the name search index if it doesn't exist yet, for `run_sync`.
+
+    Triggers keep the SQLite index in sync with every insert, rename and
+    delete, PostgreSQL maintains its trigram index itself. An index added to
+    an existing database is filled from the organizations already there.
+    """
+    if connection.dialect.name == "postgresql":
+        for statement in _POSTGRESQL_DDL:
+            connection.exec_driver_sql(statement)
+        return
+    if connection.dialect.name != "sqlite":
+        return
+    exists = inspect(connection).has_table("organization_search")
+    for statement in _SQLITE_DDL[0 if not exists else 1 :]:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        rebuild_organization_search(connection)
+
+
+def rebuild_organization_search(connection: Connection) -> None:
+    """Refill the SQLite index from the organizations table."""
+    connection.exec_driver_sql(
+        "INSERT INTO organization_search(organization_search) VALUES ('rebuild')"
+    )
+
+
+def drop_organization_search_index(connection: Connection) -> None:
+    """Drop the SQLite index, its triggers go with the organizations table."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS organization_search")
+
+
+def _fts_phrase(query: str) -> str:
+    # A quoted phrase matches the query as a substring, without FTS syntax
+    return '"' + query.replace('"', '""') + '"'
+
+
+def search_organizations_query(
+    profile_id: uuid.UUID, query: str, dialect: str, use_index: bool = True
+) -> Any:
+    """
+    Organizations of the profile whose name contains `query`, best first.
+
+    Names starting with the query rank above the ones only containing it,
+    then by the index's relevance and finally by name. Without `use_index`
+    SQLite checks the names of all the profile's organizations instead.
+    """
+    columns = select(
+        Organization.id, Organization.name, Organization.member_count
+    ).join(OrganizationMembership)
+    is_prefix = col(Organization.name).istartswith(query, autoescape=True)
+    visible = (
+        OrganizationMembership.profile_id == profile_id,
+        col(Organization.deleted_at).is_(None),
+    )
+
+    if dialect == "sqlite" and use_index and len(query) >= MIN_INDEXED_QUERY_LENGTH:
+        return (
+            columns.join(
+                ORGANIZATION_SEARCH,
+                literal_column("organization_search.rowid")
+                == literal_column("organizations.rowid"),
+            )
+            .where(
+                literal_column("organization_search").op("MATCH")(_fts_phrase(query)),
+                *visible,
+            )
+            .order_by(
+                is_prefix.desc(),
+                literal_column("organization_search.rank"),
+                col(Organization.name),
+            )
+        )
+
+    matching = columns.where(
+        col(Organization.name).icontains(query, autoescape=True), *visible
+    )
+    if dialect == "postgresql":
+        # ILIKE '%query%' is answered by the trigram index
+        return matching.order_by(
+            is_prefix.desc(),
+            func.similarity(Organization.name, query).desc(),
+            col(Organization.name),
+        )
+    return matching.order_by(is_prefix.desc(), col(Organization.name))
+
+
+def merged_search(statement: Any, query: str) -> Any:
+    """
+    Search `statement` reordered for merging with other shards' results.
+
+    Prefix matches first, then by name, as relevance ranks computed by
+    different shards' indexes don't compare. Whether a row is a prefix match
+    is selected as `is_prefix`, the merge has to use the database's idea of
+    it: SQLite only ignores the case of ASCII letters.
+    """
+    is_prefix = col(Organization.name).istartswith(query, autoescape=True)
+    return (
+        statement.add_columns(is_prefix.label("is_prefix"))
+        .order_by(None)
+        .order_by(is_prefix.desc(), col(Organization.name))
+    )
+
+
+async def search_organizations(
+    connection: AsyncConnection, profile_id: uuid.UUID, query: str
+) -> Any:
+    """
+    Statement searching the profile's organizations, with the cheaper plan.
+
+    The index answers the query by matching across all organizations, which
+    only pays off for profiles in many of them. For everybody else reading
+    their few names is faster. SQLite can't tell the two apart, so the
+    memberships are counted first, up to the limit. PostgreSQL's planner
+    makes the same choice from its statistics.
+    """
+    use_index = True
+    if connection.dialect.name == "sqlite":
+        memberships = await connection.execute(
+            select(func.count()).select_from(
+                select(OrganizationMembership.organization_id)
+                .where(OrganizationMembership.profile_id == profile_id)
+                .limit(MEMBERSHIP_SCAN_LIMIT + 1)
+                .subquery()
+            )
+        )
+        use_index = memberships.scalar_one() > MEMBERSHIP_SCAN_LIMIT
+    return search_organizations_query(
+        profile_id, query, connection.dialect.name, use_index
+    )
+
+
+__all__ = [
+    "MEMBERSHIP_SCAN_LIMIT",
+    "MIN_INDEXED_QUERY_LENGTH",
+    "ORGANIZATION_SEARCH",
+    "create_organization_search_index",
+    "drop_organization_search_index",
+    "merged_search",
+    "rebuild_organization_search",
+    "search_organizations",
+    "search_organizations_query",
+]
@@ -0,0 +1,126 @@
+import asyncio
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import re
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+from fastapi import Request, Response
+
+PROFILE_HEADER = "X-Debug-Profile"
+
+_UNSAFE_FILENAME_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def sign_profiling_request(secret: str, path: str, expires_at: int) -> str:
+    """
+    Value of the X-Debug-Profile header that enables profiling of `path`.
+
+    The signature covers the path and the expiry, so a leaked header only
+    profiles one endpoint for a limited time.
+    """
+    signature = hmac.new(
+        secret.encode(), f"{expires_at}:{path}".encode(), hashlib.sha256
+    ).hexdigest()
+    return f"{expires_at}.{signature}"
+
+
+class RequestProfiler:
+    """
+    Runs cProfile across requests that carry a signed debug header or are sampled.
+
+    Only one request is profiled at a time, cProfile can't be nested and it
+    sees everything the worker's event loop does meanwhile, other requests
+    included. Profiles are written to `directory` as `.prof` files.
+    """
+
+    def __init__(
+        self, directory: str, secret: str | None = None, sample_rate: float = 0.0
+    ) -> None:
+        self._directory = directory
+        self._secret = secret
+        self._sample_rate = sample_rate
+        self._active = False
+
+    def _is_requested(self, request: Request) -> bool:
+        header = request.headers.get(PROFILE_HEADER)
+        if header is None or not self._secret:
+            return False
+        expires_at, _, _ = header.partition(".")
+        if not expires_at.isdigit() or int(expires_at) < time.time():
+            return False
+        expected = sign_profiling_request(
+            self._secret, request.url.path, int(expires_at)
+        )
+        return hmac.compare_digest(header, expected)
+
+    def _should_profile(self, request: Request) -> bool:
+        if self._active:
+            return False
+        if self._sample_rate > 0 and random.random() < self._sample_rate:
+            return True
+        return self._is_requested(request)
+
+    def _profile_path(self, request: Request, request_id: str) -> str:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", request.url.path)
+        name = _UNSAFE_FILENAME_CHARACTERS.sub("_", route_path).strip("_")
+        request_id = _UNSAFE_FILENAME_CHARACTERS.sub("_", request_id)
+        return os.path.join(
+            self._directory,
+            f"{int(time.time())}_{request.method}_{name}_{request_id}.prof",
+        )
+
+    async def middleware(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        if not self._should_profile(request):
+            return await call_next(request)
+
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        self._active = True
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+            self._active = False
+
+        path = self._profile_path(request, request_id)
+        os.makedirs(self._directory, exist_ok=True)
+        await asyncio.to_thread(profiler.dump_stats, path)
+        response.headers["X-Profile-File"] = os.path.basename(path)
+        return response
+
+
+def create_request_profiler() -> RequestProfiler | None:
+    """
+    Create the request profiler from environment variables.
+
+    PROFILING_SECRET enables the signed X-Debug-Profile header and
+    PROFILING_SAMPLE_RATE profiles a fraction of all requests. Profiles go to
+    PROFILING_DIR (default ./profiles). Returns None when both are disabled,
+    the middleware is then not installed at all.
+    """
+    secret = os.environ.get("PROFILING_SECRET") or None
+    sample_rate = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+    if secret is None and sample_rate <= 0:
+        return None
+    return RequestProfiler(
+        directory=os.environ.get("PROFILING_DIR", "./profiles"),
+        secret=secret,
+        sample_rate=sample_rate,
+    )
+
+
+__all__ = [
+    "PROFILE_HEADER",
+    "RequestProfiler",
+    "create_request_profiler",
+    "sign_profiling_request",
+]
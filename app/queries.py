@@ -0,0 +1,123 @@
+import json
+import logging
+from typing import Any
+
+from sqlalchemy import bindparam, event
+from sqlalchemy import select as core_select
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import col, select
+
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+from app.models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+# Statements that run on almost every request, built once with bind parameters.
+# Building a select and computing its cache key costs more than compiling it,
+# and SQLAlchemy memoizes the cache key of a statement object, so reusing the
+# same object skips both. Pass the values with `params={...}`.
+
+PROFILE_BY_EMAIL = select(Profile).where(Profile.email == bindparam("email"))
+
+PROFILE_ROW_BY_EMAIL = core_select(
+    col(Profile.id),
+    col(Profile.email),
+    col(Profile.name),
+    col(Profile.avatar_url),
+    col(Profile.banned_at),
+    col(Profile.last_seen_at),
+).where(col(Profile.email) == bindparam("email"))
+
+MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION = select(OrganizationMembership).where(
+    OrganizationMembership.profile_id == bindparam("profile_id"),
+    OrganizationMembership.organization_id == bindparam("organization_id"),
+)
+
+ORGANIZATION_BY_ID = select(Organization).where(
+    Organization.id == bindparam("organization_id"),
+    col(Organization.deleted_at).is_(None),
+)
+
+ORGANIZATION_RESPONSE_BY_ID = select(
+    Organization.id, Organization.name, Organization.member_count
+).where(
+    Organization.id == bindparam("organization_id"),
+    col(Organization.deleted_at).is_(None),
+)
+
+
+class StatementCacheStats:
+    """
+    Counts executions served from the engine's compiled statement cache.
+
+    Statements that can't be cached (raw SQL, DDL) count toward neither.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, cache_hit: Any) -> None:
+        if cache_hit is CacheStats.CACHE_HIT:
+            self.hits += 1
+        elif cache_hit is CacheStats.CACHE_MISS:
+            self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+    def report(self) -> dict[str, object]:
+        """Log the counts collected so far."""
+        snapshot = self.snapshot()
+        logger.info(json.dumps({"statement_cache": snapshot}))
+        return snapshot
+
+
+_stats = StatementCacheStats()
+
+
+def install_statement_cache_stats(engine: AsyncEngine) -> None:
+    """Count compiled cache hits and misses of the statements the engine executes."""
+
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        _stats.record(getattr(context, "cache_hit", None))
+
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def get_statement_cache_stats() -> StatementCacheStats:
+    """
+    Get the compiled statement cache counters of the application's engine.
+    """
+    return _stats
+
+
+__all__ = [
+    "MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION",
+    "ORGANIZATION_BY_ID",
+    "ORGANIZATION_RESPONSE_BY_ID",
+    "PROFILE_BY_EMAIL",
+    "PROFILE_ROW_BY_EMAIL",
+    "StatementCacheStats",
+    "get_statement_cache_stats",
+    "install_statement_cache_stats",
+]
@@ -0,0 +1,119 @@
+import os
+from datetime import UTC, date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlmodel import col, select
+
+from app.database import AsyncSession, get_db_session
+from app.models.daily_stats import DailyStats
+from app.models.firebase_auth_user import FirebaseAuthUser
+from app.queries import get_statement_cache_stats
+from app.routes.di import DBSessionReleasingRoute, get_firebase_user_from_request
+
+# Longest range a single stats request can ask for
+MAX_STATS_DAYS = 366
+
+
+class DailyStatsResponse(BaseModel):
+    """Counters of one UTC day."""
+
+    day: date
+    signups: int
+    active_users: int
+    organizations_created: int
+
+
+class StatementCacheStatsResponse(BaseModel):
+    """Compiled statement cache counters of this worker since it started."""
+
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+def get_admin_emails() -> set[str]:
+    """
+    Emails of the users allowed to use the admin endpoints.
+
+    Configured as a comma separated list in ADMIN_EMAILS, nobody by default.
+    """
+    emails = os.environ.get("ADMIN_EMAILS", "")
+    return {email.strip().lower() for email in emails.split(",") if email.strip()}
+
+
+def require_admin(
+    firebaseUser: FirebaseAuthUser = Depends(get_firebase_user_from_request),
+) -> FirebaseAuthUser:
+    if firebaseUser.email.lower() not in get_admin_emails():
+        # Don't reveal that the endpoints exist
+        raise HTTPException(status_code=404, detail="Not Found")
+    return firebaseUser
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    route_class=DBSessionReleasingRoute,
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.get("/stats", response_model=list[DailyStatsResponse])
+async def get_daily_stats(
+    start: date | None = Query(
+        None, description="First day, 29 days before end by default"
+    ),
+    end: date | None = Query(None, description="Last day, today (UTC) by default"),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Get daily signups, active users and created organizations.
+
+    Reads only the daily rollups, never the profiles or organizations tables.
+    Every day of the range is returned, days without any activity as zeros.
+    """
+    end = end or datetime.now(UTC).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=422, detail="start must not be after end")
+    if (end - start).days >= MAX_STATS_DAYS:
+        raise HTTPException(
+            status_code=422, detail=f"At most {MAX_STATS_DAYS} days can be requested"
+        )
+
+    connection = await db.connection()
+    result = await connection.execute(
+        select(
+            col(DailyStats.day),
+            col(DailyStats.signups),
+            col(DailyStats.active_users),
+            col(DailyStats.organizations_created),
+        ).where(col(DailyStats.day) >= start, col(DailyStats.day) <= end)
+    )
+    stats = {row.day: row for row in result}
+
+    days = (start + timedelta(days=offset) for offset in range((end - start).days + 1))
+    return [
+        DailyStatsResponse(
+            day=day,
+            signups=stats[day].signups if day in stats else 0,
+            active_users=stats[day].active_users if day in stats else 0,
+            organizations_created=stats[day].organizations_created
+            if day in stats
+            else 0,
+        )
+        for day in days
+    ]
+
+
+@router.get("/statement-cache", response_model=StatementCacheStatsResponse)
+async def get_statement_cache() -> StatementCacheStatsResponse:
+    """
+    Get the compiled statement cache hits and misses of the worker.
+
+    The counters are per process, every worker answers with its own.
+    """
+    return StatementCacheStatsResponse.model_validate(
+        get_statement_cache_stats().snapshot()
+    )
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
+from fastapi_pagination import Page, Params
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlmodel import col
+
+from app.database import AsyncSession, get_db_session
+from app.models.firebase_auth_user import FirebaseAuthUser
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+from app.routes.di import DBSessionReleasingRoute, get_firebase_user_from_request
+from app.routes.organizations import OrganizationWithRoleResponse, created_order
+from app.routes.profiles import ProfileResponse, get_or_create_profile
+from app.service.analytics_service import (
+    AnalyticsServiceProtocol,
+    get_analytics_service,
+)
+from app.service.email_service import EmailServiceProtocol, get_email_service
+from app.sharding import (
+    ShardSessions,
+    get_shard_sessions,
+    paginate_across_shards,
+    shards_of_profile,
+)
+
+
+class BootstrapResponse(BaseModel):
+    """Everything the app needs on a cold start, in a single round trip."""
+
+    profile: ProfileResponse
+    organizations: Page[OrganizationWithRoleResponse]
+    is_new_profile: bool
+
+
+router = APIRouter(
+    prefix="/bootstrap", tags=["bootstrap"], route_class=DBSessionReleasingRoute
+)
+
+
+@router.post("/", response_model=BootstrapResponse)
+async def bootstrap(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    size: int = Query(50, ge=1, le=100),
+    firebaseUser: FirebaseAuthUser = Depends(get_firebase_user_from_request),
+    db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+    analyticsService: AnalyticsServiceProtocol = Depends(get_analytics_service),
+    emailService: EmailServiceProtocol = Depends(get_email_service),
+):
+    """
+    Get or create the profile and return it with the first page of organizations.
+
+    Replaces the `POST /profiles/`, `GET /profiles/` and `GET /organizations/`
+    sequence the app runs on launch. Everything runs on one DB session (and the
+    organization shards, when sharded); the organizations query depends on the
+    profile id, so the two cannot overlap.
+    """
+    profile, is_new_profile = await get_or_create_profile(
+        request,
+        background_tasks,
+        firebaseUser,
+        db,
+        shards,
+        analyticsService,
+        emailService,
+    )
+
+    # Organizations and roles come from a single joined query
+    query = (
+        select(
+            col(Organization.id),
+            col(Organization.name),
+            col(Organization.member_count),
+            col(OrganizationMembership.role),
+            col(Organization.created_at),
+        )
+        .join(OrganizationMembership)
+        .where(
+            col(OrganizationMembership.profile_id) == profile.id,
+            col(Organization.deleted_at).is_(None),
+        )
+        .order_by(col(Organization.created_at), col(Organization.id))
+    )
+    params = Params(page=1, size=size)
+    rows, total = await paginate_across_shards(
+        shards,
+        {shard: query for shard in await shards_of_profile(db, profile.id)},
+        params,
+        key=created_order,
+    )
+    organizations = Page[OrganizationWithRoleResponse].create(
+        [
+            OrganizationWithRoleResponse(
+                id=row.id,
+                name=row.name,
+                member_count=row.member_count,
+                role=row.role,
+            )
+            for row in rows
+        ],
+        total=total,
+        params=params,
+    )
+
+    return BootstrapResponse(
+        profile=ProfileResponse.model_validate(profile, from_attributes=True),
+        organizations=organizations,
+        is_new_profile=is_new_profile,
+    )
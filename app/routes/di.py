@@ -1,9 +1,68 @@
-from fastapi import Depends, HTTPException, Request
-from sqlmodel import select
+import uuid
+from collections.abc import Callable, Coroutine
+from datetime import datetime
+from typing import Any, NamedTuple
 
-from app.database import AsyncSession, get_db_session
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from app.database import (
+    AsyncSession,
+    async_session,
+    get_db_session,
+    release_db_sessions,
+)
+from app.invalidation import (
+    InvalidatingCache,
+    InvalidationBus,
+    create_invalidating_cache,
+    get_invalidation_bus,
+    profile_key,
+)
 from app.models.firebase_auth_user import FirebaseAuthUser
 from app.models.profile import Profile
+from app.queries import PROFILE_BY_EMAIL, PROFILE_ROW_BY_EMAIL
+from app.singleflight import SingleFlight
+from app.tracing import traced
+from app.use_cases.daily_stats import record_activity
+
+_profile_lookups: SingleFlight[str, Profile | None] = SingleFlight()
+
+
+class ProfileRow(NamedTuple):
+    """Profile columns read by the hot read-only endpoints, not tracked by a session."""
+
+    id: uuid.UUID
+    email: str
+    name: str | None
+    avatar_url: str | None
+    banned_at: datetime | None
+    last_seen_at: datetime
+
+
+_profile_row_lookups: SingleFlight[str, ProfileRow | None] = SingleFlight()
+# Dropped by `delete_profile` on every worker, bans are checked by the denylist
+_profile_rows: InvalidatingCache[ProfileRow] = create_invalidating_cache()
+
+
+class DBSessionReleasingRoute(APIRoute):
+    """
+    Route that closes the request's DB sessions right after the handler returns.
+
+    Without it the sessions live until dependency teardown, which happens only
+    after the response was sent and background tasks (welcome email) finished.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def release_after_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            finally:
+                await release_db_sessions(request)
+
+        return release_after_handler
 
 
 def get_firebase_user_from_request(request: Request) -> FirebaseAuthUser:
@@ -20,15 +79,77 @@ def get_firebase_user_from_request(request: Request) -> FirebaseAuthUser:
     return firebase_user
 
 
+async def find_profile_by_email(db: AsyncSession, email: str) -> Profile | None:
+    """
+    Find a profile by email, concurrent lookups of the same email share one query.
+
+    The shared query runs on its own session, it outlives a caller that is
+    cancelled or whose session is closed. The detached result is merged into
+    each caller's `db` (without a query) before being returned.
+    """
+
+    async def lookup() -> Profile | None:
+        async with async_session() as session:
+            result = await session.exec(PROFILE_BY_EMAIL, params={"email": email})
+            return result.first()
+
+    profile = await _profile_lookups.do(email, lookup)
+    if profile is None:
+        return None
+    return await db.merge(profile, load=False)
+
+
+async def find_profile_row_by_email(db: AsyncSession, email: str) -> ProfileRow | None:
+    """
+    Find a profile by email without building a `Profile` ORM object.
+
+    Selects only the needed columns through Core, so there is no identity map
+    or validation overhead. Rows are immutable and can be shared by concurrent
+    lookups of the same email, the shared query runs on its own session. Found
+    rows are cached until the profile is invalidated.
+    """
+
+    async def lookup() -> ProfileRow | None:
+        async with async_session() as session:
+            connection = await session.connection()
+            result = await connection.execute(PROFILE_ROW_BY_EMAIL, {"email": email})
+            row = result.first()
+            return ProfileRow(*row) if row else None
+
+    return await _profile_rows.get_or_load(
+        profile_key(email), lambda: _profile_row_lookups.do(email, lookup)
+    )
+
+
+@traced("get_profile_from_request")
 async def get_profile_from_request(
     request: Request, db: AsyncSession = Depends(get_db_session)
 ) -> Profile:
     """Get the profile from the request state."""
     firebaseUser = get_firebase_user_from_request(request)
-    result = await db.exec(select(Profile).where(Profile.email == firebaseUser.email))
-    existing = result.first()
+    existing = await find_profile_by_email(db, firebaseUser.email)
+    if existing:
+        if existing.banned_at:
+            raise HTTPException(status_code=403, detail="Profile is banned")
+        await record_activity(existing.id, existing.last_seen_at)
+        return existing
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+
+@traced("get_profile_row_from_request")
+async def get_profile_row_from_request(
+    request: Request,
+    db: AsyncSession = Depends(get_db_session),
+    invalidationBus: InvalidationBus = Depends(get_invalidation_bus),
+) -> ProfileRow:
+    """Get the profile columns for read-only endpoints that don't modify it."""
+    firebaseUser = get_firebase_user_from_request(request)
+    existing = await find_profile_row_by_email(db, firebaseUser.email)
     if existing:
         if existing.banned_at:
             raise HTTPException(status_code=403, detail="Profile is banned")
+        if await record_activity(existing.id, existing.last_seen_at):
+            # The cached rows still have the old `last_seen_at`
+            await invalidationBus.publish(profile_key(existing.email))
         return existing
     raise HTTPException(status_code=404, detail="Profile not found")
@@ -1,16 +1,51 @@
+import asyncio
 import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import apaginate
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi_pagination import Page, Params, create_page
 from pydantic import BaseModel, Field
-from sqlmodel import select
-
-from app.database import AsyncSession, get_db_session
+from sqlmodel import col, select
+
+from app.audit import record_audit_event
+from app.broadcaster import Broadcaster, get_broadcaster
+from app.database import AsyncSession, get_db_session, shard_for, shard_session
+from app.invalidation import (
+    InvalidatingCache,
+    InvalidationBus,
+    create_invalidating_cache,
+    get_invalidation_bus,
+    membership_key,
+    organization_key,
+)
 from app.models.organization import Organization
 from app.models.organization_membership import OrganizationMembership, OrganizationRole
 from app.models.profile import Profile
-from app.routes.di import get_profile_from_request
+from app.organization_search import merged_search, search_organizations
+from app.queries import (
+    MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION,
+    ORGANIZATION_BY_ID,
+    ORGANIZATION_RESPONSE_BY_ID,
+)
+from app.routes.di import (
+    DBSessionReleasingRoute,
+    ProfileRow,
+    get_profile_from_request,
+    get_profile_row_from_request,
+)
+from app.sharding import (
+    ShardSessions,
+    add_to_directory,
+    get_shard_sessions,
+    paginate_across_shards,
+    shards_of_profile,
+)
+from app.singleflight import SingleFlight
+from app.use_cases.daily_stats import bump_daily_stats
+from app.use_cases.organization_memberships import add_membership
 
 
 class OrganizationResponse(BaseModel):
@@ -18,6 +53,20 @@ class OrganizationResponse(BaseModel):
 
     name: str
     id: uuid.UUID
+    member_count: int
+
+
+class OrganizationWithRoleResponse(OrganizationResponse):
+    """Organization attributes together with the caller's role in it."""
+
+    role: OrganizationRole
+
+
+class OrganizationBatchResponse(BaseModel):
+    """Organizations found by a batch lookup and the requested IDs that weren't."""
+
+    organizations: list[OrganizationWithRoleResponse]
+    missing: list[uuid.UUID]
 
 
 class OrganizationCreate(BaseModel):
@@ -43,61 +92,269 @@ class OrganizationUpdate(BaseModel):
     )
 
 
-router = APIRouter(prefix="/organizations", tags=["organizations"])
+# Most organizations a single batch request can ask for
+MAX_BATCH_SIZE = 100
+
+router = APIRouter(
+    prefix="/organizations", tags=["organizations"], route_class=DBSessionReleasingRoute
+)
+
+_membership_lookups: SingleFlight[
+    tuple[uuid.UUID, uuid.UUID], OrganizationMembership | None
+] = SingleFlight()
+# Dropped on every worker when the membership or its organization is deleted
+_memberships: InvalidatingCache[OrganizationMembership] = create_invalidating_cache()
+
+
+async def find_membership(
+    db: AsyncSession, profile_id: uuid.UUID, organization_id: uuid.UUID
+) -> OrganizationMembership | None:
+    """
+    Find the profile's membership in an organization.
+
+    Concurrent lookups of the same membership share one query, on its own
+    session of the organization's shard. Found memberships are cached until
+    invalidated. Like `find_profile_by_email`, the detached result is merged
+    into each caller's `db` without a query.
+    """
+
+    async def lookup() -> OrganizationMembership | None:
+        async with shard_session(shard_for(organization_id)) as session:
+            result = await session.exec(
+                MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION,
+                params={"profile_id": profile_id, "organization_id": organization_id},
+            )
+            return result.first()
+
+    membership = await _memberships.get_or_load(
+        membership_key(organization_id, profile_id),
+        lambda: _membership_lookups.do((profile_id, organization_id), lookup),
+    )
+    if membership is None:
+        return None
+    return await db.merge(membership, load=False)
+
+
+def _organization_responses(rows: Sequence[Any]) -> list[OrganizationResponse]:
+    return [
+        OrganizationResponse(id=row.id, name=row.name, member_count=row.member_count)
+        for row in rows
+    ]
+
+
+def created_order(row: Any) -> tuple[datetime, uuid.UUID]:
+    """Sort key of organization rows merged from several shards."""
+    return row.created_at, row.id
 
 
 @router.get("/", response_model=Page[OrganizationResponse])
 async def get_organizations(
-    profile: Profile = Depends(get_profile_from_request),
+    params: Params = Depends(),
+    profile: ProfileRow = Depends(get_profile_row_from_request),
     db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
     x="aaa",
 ):
-    """Get organizations the current user is a member of."""
+    """
+    Get organizations the current user is a member of.
+
+    Hot read-only path: only the response columns are selected and the rows
+    are mapped straight to responses, no ORM objects are built. When sharded,
+    the shards holding the user's memberships are read in parallel and merged.
+    """
     query = (
-        select(Organization)
+        select(
+            Organization.id,
+            Organization.name,
+            Organization.member_count,
+            Organization.created_at,
+        )
         .join(OrganizationMembership)
-        .where(OrganizationMembership.profile_id == profile.id)
-        .order_by("created_at")
+        .where(
+            OrganizationMembership.profile_id == profile.id,
+            col(Organization.deleted_at).is_(None),
+        )
+        .order_by(col(Organization.created_at), col(Organization.id))
+    )
+
+    rows, total = await paginate_across_shards(
+        shards,
+        {shard: query for shard in await shards_of_profile(db, profile.id)},
+        params,
+        key=created_order,
+    )
+    return create_page(_organization_responses(rows), total=total, params=params)
+
+
+async def publish_organization_event(
+    db: AsyncSession,
+    broadcaster: Broadcaster,
+    event: str,
+    organization_id: uuid.UUID,
+    data: dict[str, Any],
+) -> None:
+    """
+    Push a change event to the connected members of an organization.
+
+    Call after commit, so clients never see a change that was rolled back.
+    """
+    if not broadcaster.has_subscribers():
+        return  # don't look up the members for nobody
+    result = await db.exec(
+        select(OrganizationMembership.profile_id).where(
+            OrganizationMembership.organization_id == organization_id
+        )
+    )
+    broadcaster.publish(result.all(), event, data)
+
+
+# Registered before /{organization_id} so "events" isn't parsed as an ID
+@router.get("/events")
+async def stream_organization_events(
+    profile: ProfileRow = Depends(get_profile_row_from_request),
+    broadcaster: Broadcaster = Depends(get_broadcaster),
+):
+    """
+    Stream changes of the caller's organizations as Server-Sent Events.
+
+    Sends `organization.created`, `organization.updated` and
+    `organization.deleted` events. The stream ends when the client falls too
+    far behind, it should then reconnect and refetch the organizations.
+    """
+    subscription = broadcaster.subscribe(profile.id)
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for message in subscription.messages(broadcaster.keepalive_interval):
+                yield message
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Registered before /{organization_id} so "search" isn't parsed as an ID
+@router.get("/search", response_model=Page[OrganizationResponse])
+async def search_organizations_by_name(
+    q: str = Query(min_length=1, max_length=100, description="Part of the name"),
+    params: Params = Depends(),
+    profile: ProfileRow = Depends(get_profile_row_from_request),
+    db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+):
+    """
+    Search the organizations the current user is a member of by name.
+
+    Matches anywhere in the name, case-insensitively. Names starting with the
+    query come first.
+    """
+    shard_ids = await shards_of_profile(db, profile.id)
+    queries = {}
+    for shard in shard_ids:
+        connection = await shards.for_shard(shard).connection()
+        query = await search_organizations(connection, profile.id, q)
+        if len(shard_ids) > 1:
+            # Relevance ranks of different shards don't compare, merge by name
+            query = merged_search(query, q)
+        queries[shard] = query
+
+    rows, total = await paginate_across_shards(
+        shards,
+        queries,
+        params,
+        key=lambda row: (not row.is_prefix, row.name),
     )
+    return create_page(_organization_responses(rows), total=total, params=params)
 
-    return await apaginate(db, query)
+
+# Registered before /{organization_id} so "batch" isn't parsed as an ID
+@router.get("/batch", response_model=OrganizationBatchResponse)
+async def get_organizations_batch(
+    ids: list[uuid.UUID] = Query(min_length=1, max_length=MAX_BATCH_SIZE),
+    profile: ProfileRow = Depends(get_profile_row_from_request),
+    shards: ShardSessions = Depends(get_shard_sessions),
+):
+    """
+    Get several organizations by their IDs, with the caller's role in each.
+
+    Membership check and load are a single `IN` query joined with the
+    memberships, per shard holding any of the IDs. IDs that don't exist, were
+    deleted or belong to organizations the caller isn't a member of are all
+    reported as missing.
+    """
+    requested = list(dict.fromkeys(ids))
+    by_shard: dict[int, list[uuid.UUID]] = {}
+    for id in requested:
+        by_shard.setdefault(shard_for(id), []).append(id)
+
+    async def lookup(shard: int, organization_ids: list[uuid.UUID]) -> Sequence[Any]:
+        connection = await shards.for_shard(shard).connection()
+        result = await connection.execute(
+            select(
+                Organization.id,
+                Organization.name,
+                Organization.member_count,
+                OrganizationMembership.role,
+            )
+            .join(OrganizationMembership)
+            .where(
+                col(Organization.id).in_(organization_ids),
+                OrganizationMembership.profile_id == profile.id,
+                col(Organization.deleted_at).is_(None),
+            )
+        )
+        return result.all()
+
+    found = {
+        row.id: OrganizationWithRoleResponse(
+            id=row.id, name=row.name, member_count=row.member_count, role=row.role
+        )
+        for rows in await asyncio.gather(
+            *(lookup(shard, ids) for shard, ids in by_shard.items())
+        )
+        for row in rows
+    }
+
+    return OrganizationBatchResponse(
+        organizations=[found[id] for id in requested if id in found],
+        missing=[id for id in requested if id not in found],
+    )
 
 
 @router.get("/{organization_id}", response_model=OrganizationResponse)
 async def get_organization(
     organization_id: uuid.UUID,
-    profile: Profile = Depends(get_profile_from_request),
-    db: AsyncSession = Depends(get_db_session),
+    profile: ProfileRow = Depends(get_profile_row_from_request),
+    shards: ShardSessions = Depends(get_shard_sessions),
 ):
     """
     Get a specific organization by its ID.
 
     Only returns the organization if the authenticated user is a member of it.
     """
+    db = shards.for_organization(organization_id)
+
     # Check if the user is a member of this organization
-    membership_result = await db.exec(
-        select(OrganizationMembership).where(
-            OrganizationMembership.profile_id == profile.id,
-            OrganizationMembership.organization_id == organization_id,
-        )
-    )
-    membership = membership_result.first()
+    membership = await find_membership(db, profile.id, organization_id)
 
     if not membership:
         raise HTTPException(status_code=404, detail="Organization not found")
 
-    # Get the organization
-    result = await db.exec(
-        # could be eager loaded in the query above, I was just getting some bullshit typing errors when trying to do that.
-        # https://github.com/fastapi/sqlmodel/discussions/871
-        select(Organization).where(Organization.id == organization_id)
+    # Get the organization, read-only so only the response columns are selected
+    connection = await db.connection()
+    result = await connection.execute(
+        ORGANIZATION_RESPONSE_BY_ID, {"organization_id": organization_id}
     )
     organization = result.first()
 
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
 
-    return OrganizationResponse(id=organization.id, name=organization.name)
+    return OrganizationResponse.model_validate(organization, from_attributes=True)
 
 
 @router.post("/", response_model=OrganizationResponse)
@@ -105,6 +362,8 @@ async def create_organization(
     org_data: OrganizationCreate,
     profile: Profile = Depends(get_profile_from_request),
     db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+    broadcaster: Broadcaster = Depends(get_broadcaster),
 ):
     """
     Create a new organization.
@@ -112,36 +371,56 @@ async def create_organization(
     The authenticated user will automatically be added as an admin of the new organization.
     Returns the created organization details.
     """
-    # Create the new organization
+    # Create the new organization, its ID picks the shard
     organization = Organization(
         name=org_data.name,
     )
-    db.add(organization)
-
-    # Flush to generate the ID for the organization
-    await db.flush()
+    organization_db = shards.for_organization(organization.id)
+    organization_db.add(organization)
+    await organization_db.flush()
 
     # Create membership for the current user as admin
-    membership = OrganizationMembership(
+    await add_membership(
+        organization_db,
         profile_id=profile.id,
         organization_id=organization.id,
         role=OrganizationRole.ADMIN,
+        actor_id=profile.id,
     )
-    db.add(membership)
+    record_audit_event(
+        organization_db,
+        "organization.created",
+        actor_id=profile.id,
+        organization_id=organization.id,
+        name=organization.name,
+    )
+
+    add_to_directory(db, profile.id, organization.id)
+    await bump_daily_stats(db, organizations_created=1)
 
-    # Commit both the organization and membership
+    # Commit both the organization and membership, the directory goes first
+    # when sharded (the same transaction otherwise)
     await db.commit()
-    await db.refresh(organization)
+    await organization_db.commit()
+    await organization_db.refresh(organization)
+
+    response = OrganizationResponse.model_validate(organization, from_attributes=True)
+    # The creator is the only member so far
+    broadcaster.publish(
+        [profile.id], "organization.created", response.model_dump(mode="json")
+    )
 
     # Return the created organization
-    return OrganizationResponse(id=organization.id, name=organization.name)
+    return response
 
 
 @router.delete("/{organization_id}", status_code=204)
 async def delete_organization(
     organization_id: uuid.UUID,
     profile: Profile = Depends(get_profile_from_request),
-    db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+    invalidationBus: InvalidationBus = Depends(get_invalidation_bus),
+    broadcaster: Broadcaster = Depends(get_broadcaster),
 ):
     """
     Delete an organization.
@@ -149,14 +428,10 @@ async def delete_organization(
     Only admin users can delete an organization.
     Returns 204 No Content on successful deletion.
     """
+    db = shards.for_organization(organization_id)
+
     # Check if the user is an admin of this organization
-    membership_result = await db.exec(
-        select(OrganizationMembership).where(
-            OrganizationMembership.profile_id == profile.id,
-            OrganizationMembership.organization_id == organization_id,
-        )
-    )
-    membership = membership_result.first()
+    membership = await find_membership(db, profile.id, organization_id)
 
     if not membership or membership.role != OrganizationRole.ADMIN:
         # just return 404 when don't have access to the organization
@@ -166,18 +441,38 @@ async def delete_organization(
     org_result = await db.exec(
         # this could be eager loaded above, but I was getting some bullshit typing errors when trying to do that.
         # https://github.com/fastapi/sqlmodel/discussions/871
-        select(Organization).where(Organization.id == organization_id)
+        ORGANIZATION_BY_ID,
+        params={"organization_id": organization_id},
     )
     organization = org_result.first()
 
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
 
-    # Delete the organization
-    # Note: memberships will be deleted automatically by cascade
-    await db.delete(organization)
+    # Soft delete the organization, the memberships are purged in batches
+    # by the organization reaper job so this stays fast for large organizations
+    organization.deleted_at = datetime.utcnow()
+    record_audit_event(
+        db,
+        "organization.deleted",
+        actor_id=profile.id,
+        organization_id=organization_id,
+        name=organization.name,
+    )
     await db.commit()
 
+    # Also drops the cached memberships nested under the organization key
+    await invalidationBus.publish(organization_key(organization_id))
+
+    # The memberships are still there until the reaper gets to them
+    await publish_organization_event(
+        db,
+        broadcaster,
+        "organization.deleted",
+        organization_id,
+        {"id": organization_id},
+    )
+
     # Return no content on successful deletion
     return None
 
@@ -187,7 +482,9 @@ async def update_organization(
     organization_id: uuid.UUID,
     org_data: OrganizationUpdate,
     profile: Profile = Depends(get_profile_from_request),
-    db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+    invalidationBus: InvalidationBus = Depends(get_invalidation_bus),
+    broadcaster: Broadcaster = Depends(get_broadcaster),
 ):
     """
     Update an existing organization.
@@ -195,14 +492,10 @@ async def update_organization(
     Only admin users can update organization details.
     Returns the updated organization.
     """
+    db = shards.for_organization(organization_id)
+
     # Check if the user is an admin of this organization
-    membership_result = await db.exec(
-        select(OrganizationMembership).where(
-            OrganizationMembership.profile_id == profile.id,
-            OrganizationMembership.organization_id == organization_id,
-        )
-    )
-    membership = membership_result.first()
+    membership = await find_membership(db, profile.id, organization_id)
 
     if not membership or membership.role != OrganizationRole.ADMIN:
         # Return 404 for consistency with delete endpoint
@@ -210,7 +503,7 @@ async def update_organization(
 
     # Get the organization
     org_result = await db.exec(
-        select(Organization).where(Organization.id == organization_id)
+        ORGANIZATION_BY_ID, params={"organization_id": organization_id}
     )
     organization = org_result.first()
 
@@ -222,7 +515,17 @@ async def update_organization(
 
     if not update_data:
         # No fields to update
-        return OrganizationResponse(id=organization.id, name=organization.name)
+        return OrganizationResponse.model_validate(organization, from_attributes=True)
+
+    if update_data.get("name", organization.name) != organization.name:
+        record_audit_event(
+            db,
+            "organization.renamed",
+            actor_id=profile.id,
+            organization_id=organization_id,
+            old_name=organization.name,
+            name=update_data["name"],
+        )
 
     # Apply updates
     for key, value in update_data.items():
@@ -232,5 +535,16 @@ async def update_organization(
     await db.commit()
     await db.refresh(organization)
 
+    await invalidationBus.publish(organization_key(organization_id))
+
+    response = OrganizationResponse.model_validate(organization, from_attributes=True)
+    await publish_organization_event(
+        db,
+        broadcaster,
+        "organization.updated",
+        organization_id,
+        response.model_dump(mode="json"),
+    )
+
     # Return the updated organization
-    return OrganizationResponse(id=organization.id, name=organization.name)
+    return response
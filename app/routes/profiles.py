@@ -1,18 +1,44 @@
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from pydantic import BaseModel, EmailStr
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import select
 
-from app.database import AsyncSession, get_db_session
+from app.audit import record_audit_event
+from app.database import AsyncSession, get_db_session, is_sharded
+from app.invalidation import (
+    InvalidationBus,
+    get_invalidation_bus,
+    membership_key,
+    organization_key,
+    profile_key,
+)
 from app.models.firebase_auth_user import FirebaseAuthUser
 from app.models.organization import Organization
 from app.models.organization_membership import OrganizationMembership, OrganizationRole
 from app.models.profile import Profile
-from app.routes.di import get_firebase_user_from_request, get_profile_from_request
+from app.routes.di import (
+    DBSessionReleasingRoute,
+    ProfileRow,
+    find_profile_by_email,
+    get_firebase_user_from_request,
+    get_profile_from_request,
+    get_profile_row_from_request,
+)
 from app.service.analytics_service import (
     AnalyticsServiceProtocol,
     get_analytics_service,
 )
 from app.service.email_service import EmailServiceProtocol, get_email_service
+from app.sharding import (
+    ShardSessions,
+    add_to_directory,
+    get_shard_sessions,
+    remove_from_directory,
+    shards_of_profile,
+)
+from app.use_cases.daily_stats import bump_daily_stats, record_activity
+from app.use_cases.organization_memberships import add_membership, remove_membership
+from app.use_cases.signup_attribution import store_signup_attribution
 from app.use_cases.use_cases import sendWelcomeEmail
 
 
@@ -24,28 +50,34 @@ class ProfileResponse(BaseModel):
     avatar_url: str | None
 
 
-router = APIRouter(prefix="/profiles", tags=["profiles"])
+router = APIRouter(
+    prefix="/profiles", tags=["profiles"], route_class=DBSessionReleasingRoute
+)
 
 
-@router.post("/", response_model=ProfileResponse)
-async def create_profile(
+async def get_or_create_profile(
     request: Request,
     background_tasks: BackgroundTasks,
-    firebaseUser: FirebaseAuthUser = Depends(get_firebase_user_from_request),
-    db: AsyncSession = Depends(get_db_session),
-    analyticsService: AnalyticsServiceProtocol = Depends(get_analytics_service),
-    emailService: EmailServiceProtocol = Depends(get_email_service),
-):
-    """Create a new user profile."""
+    firebaseUser: FirebaseAuthUser,
+    db: AsyncSession,
+    shards: ShardSessions,
+    analyticsService: AnalyticsServiceProtocol,
+    emailService: EmailServiceProtocol,
+) -> tuple[Profile, bool]:
+    """
+    Get the profile of the authenticated user, creating it on first sign in.
+
+    Returns the profile and a flag telling whether it was created by this call.
+    """
 
     # Check if profile with this firebase_user_id already exists
-    result = await db.exec(select(Profile).where(Profile.email == firebaseUser.email))
-    existing = result.first()
+    existing = await find_profile_by_email(db, firebaseUser.email)
     if existing:
         if existing.banned_at:
             raise HTTPException(status_code=403, detail="Profile is banned")
+        await record_activity(existing.id, existing.last_seen_at)
         await analyticsService.identify(profile=existing)
-        return existing
+        return existing, False
 
     # Create new profile
 
@@ -64,7 +96,6 @@ async def create_profile(
     # Create the profile
     profile = Profile(
         email=firebaseUser.email,
-        signup_attribution_data=headers_dict,
         name=firebaseUser.name,
         avatar_url=str(firebaseUser.avatar_url) if firebaseUser.avatar_url else None,
     )
@@ -72,6 +103,9 @@ async def create_profile(
     await db.flush()
     await db.refresh(profile)
 
+    # Only allowlisted headers are kept, stored outside the profiles table
+    await store_signup_attribution(db, profile.id, headers_dict)
+
     # # Create a default organization for this new profile
     org_name = (
         f"{profile.name}'s Organization" if profile.name else "Default Organization"
@@ -80,23 +114,36 @@ async def create_profile(
     organization = Organization(
         name=org_name,
     )
-    db.add(organization)
-    await db.flush()
-    await db.refresh(organization)
+    organization_db = shards.for_organization(organization.id)
+    organization_db.add(organization)
+    await organization_db.flush()
+    await organization_db.refresh(organization)
 
     # # Create membership linking the profile to the organization
-    membership = OrganizationMembership(
+    await add_membership(
+        organization_db,
         profile_id=profile.id,
         organization_id=organization.id,
         role=OrganizationRole.ADMIN,  # Make them the owner of their org
+        actor_id=profile.id,
     )
-    db.add(membership)
-    await db.flush()
-    await db.refresh(membership)
+    record_audit_event(
+        organization_db,
+        "organization.created",
+        actor_id=profile.id,
+        organization_id=organization.id,
+        name=organization.name,
+    )
+    add_to_directory(db, profile.id, organization.id)
+
+    # Signing up is the first activity of the day too
+    await bump_daily_stats(db, signups=1, active_users=1, organizations_created=1)
 
     # Now all the above operations have been committed as a single transaction
+    # (two when sharded, the profile and directory go first)
 
     await db.commit()
+    await organization_db.commit()
 
     await analyticsService.identify(profile=profile)
 
@@ -111,20 +158,47 @@ async def create_profile(
 
     background_tasks.add_task(sendWelcomeEmail, profile, emailService)
 
+    return profile, True
+
+
+@router.post("/", response_model=ProfileResponse)
+async def create_profile(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    firebaseUser: FirebaseAuthUser = Depends(get_firebase_user_from_request),
+    db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
+    analyticsService: AnalyticsServiceProtocol = Depends(get_analytics_service),
+    emailService: EmailServiceProtocol = Depends(get_email_service),
+):
+    """Create a new user profile."""
+    profile, _ = await get_or_create_profile(
+        request,
+        background_tasks,
+        firebaseUser,
+        db,
+        shards,
+        analyticsService,
+        emailService,
+    )
     return profile
 
 
 @router.get("/", response_model=ProfileResponse)
-async def get_profile(profile: Profile = Depends(get_profile_from_request)):
+async def get_profile(profile: ProfileRow = Depends(get_profile_row_from_request)):
     """Get profile"""
-    return profile
+    return ProfileResponse(
+        email=profile.email, name=profile.name, avatar_url=profile.avatar_url
+    )
 
 
 @router.delete("/", status_code=204)
 async def delete_profile(
     profile: Profile = Depends(get_profile_from_request),
     db: AsyncSession = Depends(get_db_session),
+    shards: ShardSessions = Depends(get_shard_sessions),
     analyticsService: AnalyticsServiceProtocol = Depends(get_analytics_service),
+    invalidationBus: InvalidationBus = Depends(get_invalidation_bus),
 ) -> None:
     """
     Delete the user's profile.
@@ -138,30 +212,57 @@ async def delete_profile(
         properties={"profile_id": str(profile.email)},
     )
 
-    await db.refresh(
-        # looks like sqlmodel cannot can only load immediate relationships :(
-        profile,
-        ["organization_memberships"],
-    )
-    for membership in profile.organization_memberships:
-        organization = await db.get(Organization, membership.organization_id)
-        if organization is None:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Organization with id {membership.organization_id} not found",
+    invalidated_keys = [profile_key(profile.email)]
+    for shard in await shards_of_profile(db, profile.id):
+        shard_db = shards.for_shard(shard)
+        memberships = await shard_db.exec(
+            select(OrganizationMembership).where(
+                OrganizationMembership.profile_id == profile.id
             )
-        await db.refresh(
-            organization, ["memberships"]
-        )  # can this be a part of the get?
-        other_admin_memberships = [
-            m
-            for m in organization.memberships
-            if m.role == OrganizationRole.ADMIN and m.profile_id != profile.id
-        ]
-        if not other_admin_memberships:
-            await db.delete(organization)
+        )
+        for membership in memberships.all():
+            invalidated_keys.append(
+                membership_key(membership.organization_id, profile.id)
+            )
+            organization = await shard_db.get(Organization, membership.organization_id)
+            if organization is None:
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Organization with id {membership.organization_id} not found",
+                )
+            # The admin counter answers this without loading the other memberships
+            other_admins = organization.admin_count - (
+                1 if membership.role == OrganizationRole.ADMIN else 0
+            )
+            if other_admins <= 0:
+                await shard_db.delete(organization)
+                invalidated_keys.append(organization_key(organization.id))
+                # Soft deleted ones were audited when they were deleted
+                if organization.deleted_at is None:
+                    record_audit_event(
+                        shard_db,
+                        "organization.deleted",
+                        actor_id=profile.id,
+                        organization_id=organization.id,
+                        name=organization.name,
+                    )
+            else:
+                await remove_membership(shard_db, membership, actor_id=profile.id)
+        # Before the directory entries go, so none is ever missing
+        if shard_db is not db:
+            await shard_db.commit()
+
+    if is_sharded():
+        await remove_from_directory(db, profile_id=profile.id)
+        # The memberships live in the shards and are gone already
+        set_committed_value(profile, "organization_memberships", [])
 
     # Delete the profile
     await db.delete(profile)
+    record_audit_event(
+        db, "profile.deleted", actor_id=profile.id, subject_id=profile.id
+    )
 
     await db.commit()
+
+    await invalidationBus.publish(*invalidated_keys)
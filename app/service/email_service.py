@@ -7,6 +7,7 @@ from app.indiepitcher import (
     get_async_indiepitcher_client,
     is_async_indiepitcher_client_initialized,
 )
+from app.tracing import CLIENT, span
 
 
 class EmailServiceProtocol(Protocol):
@@ -39,14 +40,15 @@ class IndiePitcherEmailService(EmailServiceProtocol):
         markdownBody: str,
     ) -> None:
         client = get_async_indiepitcher_client()
-        await client.send_email(
-            SendEmail(
-                to=to,
-                subject=subject,
-                body=markdownBody,
-                body_format=EmailBodyFormat.MARKDOWN,
+        with span("indiepitcher.send_email", CLIENT):
+            await client.send_email(
+                SendEmail(
+                    to=to,
+                    subject=subject,
+                    body=markdownBody,
+                    body_format=EmailBodyFormat.MARKDOWN,
+                )
             )
-        )
 
 
 def get_email_service() -> EmailServiceProtocol:
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import uuid
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+from fastapi import Depends, Request
+from fastapi_pagination import Params
+from sqlalchemy import delete, func
+from sqlmodel import col, select
+
+from app.database import (
+    AsyncSession,
+    get_db_session,
+    is_sharded,
+    shard_for,
+    shard_session,
+)
+from app.models.membership_directory import MembershipDirectoryEntry
+
+
+class ShardSessions:
+    """
+    The request's sessions on the organization shards, opened on first use.
+
+    Unsharded, every shard is the request's own session, so handlers written
+    against shards run unchanged in a single database and transaction.
+    Shard sessions are registered on the request like the main one and
+    closed together with it.
+    """
+
+    def __init__(self, request: Request, db: AsyncSession) -> None:
+        self._request = request
+        self._db = db
+        self._sessions: dict[int, AsyncSession] = {}
+
+    def for_shard(self, shard: int) -> AsyncSession:
+        if not is_sharded():
+            return self._db
+        if shard not in self._sessions:
+            session = shard_session(shard)
+            self._request.state.db_sessions.append(session)
+            self._sessions[shard] = session
+        return self._sessions[shard]
+
+    def for_organization(self, organization_id: uuid.UUID) -> AsyncSession:
+        return self.for_shard(shard_for(organization_id))
+
+
+async def get_shard_sessions(
+    request: Request, db: AsyncSession = Depends(get_db_session)
+) -> ShardSessions:
+    return ShardSessions(request, db)
+
+
+def add_to_directory(
+    db: AsyncSession, profile_id: uuid.UUID, organization_id: uuid.UUID
+) -> None:
+    """
+    List a new membership in the directory, in the global database session.
+
+    Commit it before the shard, a failure in between leaves an entry without
+    a membership, which readers skip, rather than a membership nobody finds.
+    """
+    if is_sharded():
+        db.add(
+            MembershipDirectoryEntry(
+                profile_id=profile_id,
+                organization_id=organization_id,
+                shard=shard_for(organization_id),
+            )
+        )
+
+
+async def remove_from_directory(
+    db: AsyncSession,
+    *,
+    profile_id: uuid.UUID | None = None,
+    organization_ids: Sequence[uuid.UUID] | None = None,
+) -> None:
+    """
+    Drop the entries of a profile or of organizations, after the shard committed.
+    """
+    if not is_sharded():
+        return
+    statement = delete(MembershipDirectoryEntry)
+    if profile_id is not None:
+        statement = statement.where(
+            col(MembershipDirectoryEntry.profile_id) == profile_id
+        )
+    if organization_ids is not None:
+        statement = statement.where(
+            col(MembershipDirectoryEntry.organization_id).in_(organization_ids)
+        )
+    await db.execute(statement)
+
+
+async def shards_of_profile(db: AsyncSession, profile_id: uuid.UUID) -> list[int]:
+    """Shards with the profile's memberships, the only one when unsharded."""
+    if not is_sharded():
+        return [0]
+    result = await db.exec(
+        select(MembershipDirectoryEntry.shard)
+        .where(MembershipDirectoryEntry.profile_id == profile_id)
+        .distinct()
+    )
+    return sorted(result.all())
+
+
+async def paginate_across_shards(
+    shards: ShardSessions,
+    queries: dict[int, Any],
+    params: Params,
+    key: Callable[[Any], Any],
+) -> tuple[list[Any], int]:
+    """
+    Rows of a page of the queries' results merged over shards, and the total.
+
+    Each query must be sorted by `key`. A single shard pages in the database.
+    Several shards each read everything up to the end of the page, in
+    parallel, and the sorted results are merged, so deep pages cost every
+    shard `offset + size` rows.
+    """
+    raw_params = params.to_raw_params()
+    limit, offset = raw_params.limit or 0, raw_params.offset or 0
+
+    async def read(shard: int, query: Any) -> tuple[int, Sequence[Any]]:
+        connection = await shards.for_shard(shard).connection()
+        total = await connection.execute(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+        if len(queries) == 1:
+            page = query.limit(limit).offset(offset)
+        else:
+            page = query.limit(offset + limit)
+        return total.scalar_one(), (await connection.execute(page)).all()
+
+    results = await asyncio.gather(
+        *(read(shard, query) for shard, query in queries.items())
+    )
+    total = sum(count for count, _ in results)
+    if len(results) == 1:
+        return list(results[0][1]), total
+    merged: Iterable[Any] = heapq.merge(*(rows for _, rows in results), key=key)
+    return list(itertools.islice(merged, offset, offset + limit)), total
+
+
+__all__ = [
+    "ShardSessions",
+    "add_to_directory",
+    "get_shard_sessions",
+    "paginate_across_shards",
+    "remove_from_directory",
+    "shards_of_profile",
+]
@@ -0,0 +1,37 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    Coalesces concurrent async calls with the same key into a single call.
+
+    The first caller starts the call, everyone arriving while it is in flight
+    awaits the same result (or exception). Nothing is cached once it finishes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        # Shielded so a cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key: K, future: "asyncio.Future[V]") -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+__all__ = ["SingleFlight"]
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("app.sql")
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+# Route that issued the statements, set for every request by get_db_session
+current_route: ContextVar[str | None] = ContextVar("current_route", default=None)
+
+SQL_LOG_MODES = ("off", "sampled", "full")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PYFORMAT_PLACEHOLDER = re.compile(r"%\(\w+\)s|\$\d+")
+_WHITESPACE = re.compile(r"\s+")
+
+_listener: QueueListener | None = None
+_handlers_before_start: list[logging.Handler] = []
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a statement so all executions of the same query shape are equal.
+
+    Literals and placeholders become `?` and IN lists collapse to `(...)`.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _PYFORMAT_PLACEHOLDER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def _redact_value(value: Any) -> Any:
+    if value is None or isinstance(value, bool | int | float):
+        return value
+    if isinstance(value, str | bytes):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact(parameters: Any) -> Any:
+    """Replace parameter values that may hold personal data by their type."""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, list | tuple):
+        # executemany passes a list of parameter sets
+        if parameters and isinstance(parameters[0], dict | list | tuple):
+            return [redact(item) for item in parameters]
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def _record(statement: str, parameters: Any, duration: float) -> str:
+    return json.dumps(
+        {
+            "fingerprint": fingerprint(statement),
+            "parameters": redact(parameters),
+            "duration_ms": round(duration * 1000, 3),
+            "route": current_route.get(),
+        }
+    )
+
+
+def install_sql_logging(engine: AsyncEngine) -> None:
+    """
+    Log statements executed by the engine according to environment variables.
+
+    SQL_LOG_MODE is "off" (default), "sampled" (a SQL_LOG_SAMPLE_RATE fraction
+    of statements, default 0.01) or "full". Independently, statements slower
+    than SQL_SLOW_QUERY_MS (default 200, 0 disables) go to the slow query log.
+    """
+    mode = os.environ.get("SQL_LOG_MODE", "off")
+    if mode not in SQL_LOG_MODES:
+        raise ValueError(f"SQL_LOG_MODE must be one of {', '.join(SQL_LOG_MODES)}")
+    sample_rate = float(os.environ.get("SQL_LOG_SAMPLE_RATE", "0.01"))
+    slow_query_seconds = float(os.environ.get("SQL_SLOW_QUERY_MS", "200")) / 1000
+
+    if mode == "off" and slow_query_seconds <= 0:
+        return  # nothing to log, don't pay for the event hooks
+
+    def before_cursor_execute(conn: Connection, *args: Any) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        duration = time.perf_counter() - conn.info["query_start_time"].pop()
+        if 0 < slow_query_seconds <= duration:
+            slow_query_logger.warning(_record(statement, parameters, duration))
+        elif mode == "full" or (mode == "sampled" and random.random() < sample_rate):
+            logger.info(_record(statement, parameters, duration))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def start_sql_logging() -> None:
+    """
+    Route SQL log records through a queue, so the event loop never waits on log I/O.
+
+    A background thread writes the records to the handlers configured for the
+    `app.sql` logger, or to stderr when there are none.
+    """
+    global _listener, _handlers_before_start
+    if _listener is not None:
+        return
+    _handlers_before_start = list(logger.handlers)
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue()
+    _listener = QueueListener(
+        log_queue,
+        *(_handlers_before_start or [logging.StreamHandler()]),
+        respect_handler_level=True,
+    )
+    for handler in _handlers_before_start:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _listener.start()
+
+
+def stop_sql_logging() -> None:
+    """
+    Flush the queued SQL log records and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        for handler in _handlers_before_start:
+            logger.addHandler(handler)
+        logger.propagate = True
+        _listener = None
+
+
+__all__ = [
+    "current_route",
+    "fingerprint",
+    "install_sql_logging",
+    "redact",
+    "start_sql_logging",
+    "stop_sql_logging",
+]
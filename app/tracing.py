@@ -0,0 +1,427 @@
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, ParamSpec, Protocol, TypeVar
+
+import httpx
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.sql_logging import fingerprint
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# Span kinds, numbered like in OTLP
+INTERNAL = 1
+SERVER = 2
+CLIENT = 3
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Trace:
+    """Spans of one sampled request, exported once none of them is open."""
+
+    __slots__ = ("trace_id", "tracer", "spans", "open")
+
+    def __init__(self, trace_id: str, tracer: "Tracer") -> None:
+        self.trace_id = trace_id
+        self.tracer = tracer
+        self.spans: list[Span] = []
+        self.open = 0
+
+
+class Span:
+    __slots__ = (
+        "trace",
+        "name",
+        "kind",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self, trace: Trace, name: str, kind: int, parent_id: str | None
+    ) -> None:
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = random.getrandbits(64).to_bytes(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: dict[str, Any] = {}
+        self.error: str | None = None
+        trace.open += 1
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        trace = self.trace
+        trace.spans.append(self)
+        trace.open -= 1
+        if trace.open == 0:
+            # Spans started later (background tasks) are exported as a new batch
+            spans, trace.spans = trace.spans, []
+            trace.tracer.enqueue(spans)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+# Innermost open span of the current task, None when the request isn't sampled
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes: Any) -> Iterator[Span | None]:
+    """
+    Record the enclosed block as a child of the current span.
+
+    Does nothing (and yields None) outside a sampled request, so spans can be
+    left in hot code paths.
+    """
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, kind, parent.span_id)
+    child.attributes.update(attributes)
+    token = current_span.set(child)
+    try:
+        yield child
+    except BaseException as error:
+        child.error = repr(error)
+        raise
+    finally:
+        current_span.reset(token)
+        child.end()
+
+
+def traced(
+    name: str, kind: int = INTERNAL
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """
+    Decorator recording each call of an async function as a span.
+
+    The signature is kept, so it works on FastAPI dependencies and middleware.
+    """
+
+    def decorator(fn: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if current_span.get() is None:
+                return await fn(*args, **kwargs)
+            with span(name, kind):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class SpanExporter(Protocol):
+    """Sends finished spans somewhere, called from the exporter thread."""
+
+    def export(self, spans: list[Span]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+class JsonLinesExporter:
+    """Appends every span as one JSON object per line to a local file."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "a")
+
+    def export(self, spans: list[Span]) -> None:
+        self._file.writelines(json.dumps(item.to_dict()) + "\n" for item in spans)
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def _otlp_span(item: Span) -> dict[str, Any]:
+    return {
+        "traceId": item.trace.trace_id,
+        "spanId": item.span_id,
+        "parentSpanId": item.parent_id or "",
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": _otlp_attributes(item.attributes),
+        # 2 is STATUS_CODE_ERROR, 0 STATUS_CODE_UNSET
+        "status": {"code": 2, "message": item.error} if item.error else {"code": 0},
+    }
+
+
+class OTLPExporter:
+    """
+    Posts spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str,
+        headers: dict[str, str] | None = None,
+        client: httpx.Client | None = None,
+    ) -> None:
+        self._url = endpoint.rstrip("/") + "/v1/traces"
+        self._resource = {
+            "attributes": _otlp_attributes({"service.name": service_name})
+        }
+        self._client = client or httpx.Client(headers=headers, timeout=10)
+
+    def payload(self, spans: list[Span]) -> dict[str, Any]:
+        scope_spans = {
+            "scope": {"name": __name__},
+            "spans": list(map(_otlp_span, spans)),
+        }
+        return {
+            "resourceSpans": [{"resource": self._resource, "scopeSpans": [scope_spans]}]
+        }
+
+    def export(self, spans: list[Span]) -> None:
+        response = self._client.post(self._url, json=self.payload(spans))
+        response.raise_for_status()
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+class Tracer:
+    """
+    Starts traces for sampled requests and exports them from a background thread.
+
+    Sampling is decided once per request (head-based): a `traceparent` header
+    from the caller is followed, otherwise `sample_rate` of requests is traced.
+    Unsampled requests never create a span object.
+    """
+
+    def __init__(
+        self, exporter: SpanExporter, sample_rate: float, batch_size: int = 512
+    ) -> None:
+        self._exporter = exporter
+        self._sample_rate = sample_rate
+        self._batch_size = batch_size
+        self._queue: queue.Queue[list[Span] | None] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._export_forever, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, spans: list[Span]) -> None:
+        self._queue.put(spans)
+
+    def _export_forever(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            # Export whatever else is waiting in the same request
+            while len(batch) < self._batch_size:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    stopping = True
+                    break
+                batch.extend(more)
+            try:
+                self._exporter.export(batch)
+            except Exception:
+                logger.exception(f"Exporting {len(batch)} spans failed")
+
+    def start_trace(self, name: str, traceparent: str | None = None) -> Span | None:
+        """Start the root span of a request, or return None when not sampled."""
+        parent_id = None
+        match = _TRACEPARENT.match(traceparent or "")
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not int(flags, 16) & 1:
+                return None
+        elif self._sample_rate > 0 and random.random() < self._sample_rate:
+            trace_id = random.getrandbits(128).to_bytes(16).hex()
+        else:
+            return None
+        return Span(Trace(trace_id, self), name, SERVER, parent_id)
+
+    async def middleware(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        root = self.start_trace(
+            f"{request.method} {request.url.path}", request.headers.get("traceparent")
+        )
+        if root is None:
+            return await call_next(request)
+
+        token = current_span.set(root)
+        root.set_attribute("http.method", request.method)
+        root.set_attribute("http.target", request.url.path)
+        try:
+            response = await call_next(request)
+            root.set_attribute("http.status_code", response.status_code)
+        except BaseException as error:
+            root.error = repr(error)
+            raise
+        finally:
+            current_span.reset(token)
+            route = request.scope.get("route")
+            if route is not None:
+                root.name = f"{request.method} {getattr(route, 'path', '')}"
+            root.end()
+        response.headers["traceparent"] = f"00-{root.trace.trace_id}-{root.span_id}-01"
+        return response
+
+    def close(self) -> None:
+        """Export the queued spans and stop the exporter thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self._exporter.shutdown()
+
+
+def install_sql_tracing(engine: AsyncEngine) -> None:
+    """Record every statement executed in a sampled request as a span."""
+
+    def before_cursor_execute(
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        parent = current_span.get()
+        if parent is None:
+            return
+        child = Span(parent.trace, "db.query", CLIENT, parent.span_id)
+        child.attributes["db.statement"] = fingerprint(statement)
+        conn.info.setdefault("trace_spans", []).append(child)
+
+    def after_cursor_execute(conn: Connection, *args: Any) -> None:
+        spans = conn.info.get("trace_spans")
+        if spans:
+            spans.pop().end()
+
+    def handle_error(exception_context: Any) -> None:
+        connection = exception_context.connection
+        spans = connection.info.get("trace_spans") if connection is not None else None
+        if spans:
+            child = spans.pop()
+            child.error = repr(exception_context.original_exception)
+            child.end()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
+
+
+_tracer: Tracer | None = None
+
+
+def create_tracer() -> Tracer | None:
+    """
+    Create the tracer from environment variables.
+
+    TRACING_EXPORTER is "jsonl" (to TRACING_JSONL_PATH, default ./traces.jsonl)
+    or "otlp" (to OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318).
+    TRACING_SAMPLE_RATE (default 0.01) is the share of requests traced when the
+    caller didn't decide with a traceparent header. Returns None when unset,
+    the middleware is then not installed at all.
+    """
+    global _tracer
+    if _tracer is None:
+        name = os.environ.get("TRACING_EXPORTER", "")
+        exporter: SpanExporter
+        if not name:
+            return None
+        elif name == "jsonl":
+            exporter = JsonLinesExporter(
+                os.environ.get("TRACING_JSONL_PATH", "./traces.jsonl")
+            )
+        elif name == "otlp":
+            exporter = OTLPExporter(
+                os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"),
+                service_name=os.environ.get("OTEL_SERVICE_NAME", "python-saas-test"),
+            )
+        else:
+            raise ValueError("TRACING_EXPORTER must be jsonl or otlp")
+        _tracer = Tracer(exporter, float(os.environ.get("TRACING_SAMPLE_RATE", "0.01")))
+    return _tracer
+
+
+def close_tracer() -> None:
+    """
+    Flush the collected spans and stop exporting.
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        _tracer = None
+
+
+__all__ = [
+    "CLIENT",
+    "INTERNAL",
+    "JsonLinesExporter",
+    "OTLPExporter",
+    "SERVER",
+    "Span",
+    "SpanExporter",
+    "Tracer",
+    "close_tracer",
+    "create_tracer",
+    "current_span",
+    "install_sql_tracing",
+    "span",
+    "traced",
+]
@@ -0,0 +1,176 @@
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from datetime import UTC, date, datetime, time
+from functools import partial
+from typing import Any
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import col, select
+
+from app.database import AsyncSession, async_session, shard_count, shard_session
+from app.models.daily_stats import DailyStats
+from app.models.organization import Organization
+from app.models.profile import Profile
+
+# Days written per statement by the rebuild
+_REBUILD_BATCH_SIZE = 500
+
+
+def _utc_now() -> datetime:
+    # Timestamps are stored naive in UTC
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    # PostgreSQL returns timezone=True columns aware, SQLite naive
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(UTC).replace(tzinfo=None)
+
+
+def _insert(db: AsyncSession) -> Any:
+    dialect = db.bind.dialect.name if db.bind else "sqlite"
+    return postgresql_insert if dialect == "postgresql" else sqlite_insert
+
+
+async def bump_daily_stats(
+    db: AsyncSession, day: date | None = None, **increments: int
+) -> None:
+    """
+    Add to the counters of a day, today by default.
+
+    A single upsert, concurrent bumps of the same day add up. Does not commit,
+    the counters change together with the caller's transaction.
+    """
+    statement = _insert(db)(DailyStats).values(
+        day=day or _utc_now().date(), **increments
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["day"],
+            set_={
+                name: col(getattr(DailyStats, name)) + statement.excluded[name]
+                for name in increments
+            },
+        )
+    )
+
+
+async def record_activity(profile_id: uuid.UUID, last_seen_at: datetime) -> bool:
+    """
+    Mark the profile as seen today, counting it as active on its first request.
+
+    Free for all but the first request of the day. That one moves
+    `last_seen_at` only if no concurrent request did already, so each profile
+    is counted once per day. Returns whether the profile was counted.
+    """
+    now = _utc_now()
+    start_of_day = datetime.combine(now.date(), time())
+    if _as_naive_utc(last_seen_at) >= start_of_day:
+        return False
+
+    async with async_session() as session:
+        result = await session.execute(
+            update(Profile)
+            .where(
+                col(Profile.id) == profile_id,
+                col(Profile.last_seen_at) < start_of_day,
+            )
+            # Being seen isn't an update of the profile
+            .values(last_seen_at=now, updated_at=col(Profile.updated_at))
+        )
+        counted = result.rowcount == 1  # type: ignore[attr-defined]
+        if counted:
+            await bump_daily_stats(session, now.date(), active_users=1)
+        await session.commit()
+    return counted
+
+
+async def _count_by_day(
+    model: Any,
+    column: Any,
+    chunk_size: int,
+    sessions: Callable[[], AsyncSession] = async_session,
+) -> Counter[date]:
+    """Count rows per day of `column`, reading the table in primary key chunks."""
+    counts: Counter[date] = Counter()
+    last_id = None
+    while True:
+        query = select(model.id, column).order_by(col(model.id)).limit(chunk_size)
+        if last_id is not None:
+            query = query.where(col(model.id) > last_id)
+        # A short transaction per chunk, writers aren't blocked for long
+        async with sessions() as session:
+            rows = (await session.exec(query)).all()
+        if not rows:
+            return counts
+        counts.update(timestamp.date() for _, timestamp in rows)
+        last_id = rows[-1][0]
+
+
+async def rebuild_daily_stats(chunk_size: int = 10_000) -> int:
+    """
+    Recompute the daily stats from the base tables.
+
+    Returns the number of days that have rows in the base tables.
+
+    Signups and created organizations are recounted from `created_at`, so
+    deleted profiles and purged organizations no longer count. Past activity
+    isn't stored anywhere but in the rollup, only the last day each profile
+    was seen is known. Active users therefore never decrease, a day gets at
+    least the profiles last seen on it.
+    """
+    signups = await _count_by_day(Profile, Profile.created_at, chunk_size)
+    organizations: Counter[date] = Counter()
+    for shard in range(shard_count()):
+        organizations.update(
+            await _count_by_day(
+                Organization,
+                Organization.created_at,
+                chunk_size,
+                partial(shard_session, shard),
+            )
+        )
+    last_seen = await _count_by_day(Profile, Profile.last_seen_at, chunk_size)
+    days = sorted(signups.keys() | organizations.keys() | last_seen.keys())
+
+    async with async_session() as session:
+        dialect = session.bind.dialect.name if session.bind else "sqlite"
+        greatest = func.greatest if dialect == "postgresql" else func.max
+        # Days without any rows left are zeroed too
+        await session.execute(
+            update(DailyStats).values(signups=0, organizations_created=0)
+        )
+        for start in range(0, len(days), _REBUILD_BATCH_SIZE):
+            statement = _insert(session)(DailyStats).values(
+                [
+                    {
+                        "day": day,
+                        "signups": signups[day],
+                        "active_users": last_seen[day],
+                        "organizations_created": organizations[day],
+                    }
+                    for day in days[start : start + _REBUILD_BATCH_SIZE]
+                ]
+            )
+            await session.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["day"],
+                    set_={
+                        "signups": statement.excluded.signups,
+                        "organizations_created": statement.excluded.organizations_created,
+                        "active_users": greatest(
+                            col(DailyStats.active_users),
+                            statement.excluded.active_users,
+                        ),
+                    },
+                )
+            )
+        await session.commit()
+    return len(days)
+
+
+__all__ = ["bump_daily_stats", "rebuild_daily_stats", "record_activity"]
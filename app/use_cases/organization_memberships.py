@@ -0,0 +1,87 @@
+import uuid
+
+from sqlalchemy import update
+from sqlmodel import col
+
+from app.audit import record_audit_event
+from app.database import AsyncSession
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership, OrganizationRole
+
+
+async def _adjust_counters(
+    db: AsyncSession, organization_id: uuid.UUID, members: int, admins: int
+) -> None:
+    # Relative update, concurrent membership changes can't overwrite each other
+    await db.execute(
+        update(Organization)
+        .where(col(Organization.id) == organization_id)
+        .values(
+            member_count=col(Organization.member_count) + members,
+            admin_count=col(Organization.admin_count) + admins,
+        )
+    )
+
+
+async def add_membership(
+    db: AsyncSession,
+    profile_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    role: OrganizationRole,
+    actor_id: uuid.UUID | None = None,
+) -> OrganizationMembership:
+    """
+    Add a profile to an organization and bump the organization's counters.
+
+    Does not commit, the changes and the audit event become part of the
+    caller's transaction.
+    """
+    membership = OrganizationMembership(
+        profile_id=profile_id, organization_id=organization_id, role=role
+    )
+    db.add(membership)
+    await db.flush()
+    await _adjust_counters(
+        db, organization_id, 1, 1 if role == OrganizationRole.ADMIN else 0
+    )
+    record_audit_event(
+        db,
+        "membership.added",
+        actor_id=actor_id,
+        organization_id=organization_id,
+        subject_id=profile_id,
+        role=role.value,
+    )
+    return membership
+
+
+async def remove_membership(
+    db: AsyncSession,
+    membership: OrganizationMembership,
+    actor_id: uuid.UUID | None = None,
+) -> None:
+    """
+    Remove a membership and decrement the organization's counters.
+
+    Does not commit, the changes and the audit event become part of the
+    caller's transaction.
+    """
+    await db.delete(membership)
+    await db.flush()
+    await _adjust_counters(
+        db,
+        membership.organization_id,
+        -1,
+        -1 if membership.role == OrganizationRole.ADMIN else 0,
+    )
+    record_audit_event(
+        db,
+        "membership.removed",
+        actor_id=actor_id,
+        organization_id=membership.organization_id,
+        subject_id=membership.profile_id,
+        role=OrganizationRole(membership.role).value,
+    )
+
+
+__all__ = ["add_membership", "remove_membership"]
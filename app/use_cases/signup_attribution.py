@@ -0,0 +1,94 @@
+import os
+import uuid
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import col, select
+
+from app.database import AsyncSession
+from app.models.signup_attribution import AttributionValue, ProfileAttribution
+
+DEFAULT_ATTRIBUTION_HEADERS = (
+    "user-agent",
+    "referer",
+    "origin",
+    "accept-language",
+    "sec-ch-ua-platform",
+    "client_ip",
+)
+
+
+def get_attribution_header_allowlist() -> set[str]:
+    """
+    Headers kept as signup attribution.
+
+    Configurable as a comma separated list in SIGNUP_ATTRIBUTION_HEADERS.
+    """
+    headers = os.environ.get("SIGNUP_ATTRIBUTION_HEADERS")
+    if headers is None:
+        return set(DEFAULT_ATTRIBUTION_HEADERS)
+    return {header.strip().lower() for header in headers.split(",") if header.strip()}
+
+
+def filter_attribution_headers(headers: dict[str, str]) -> dict[str, str]:
+    allowlist = get_attribution_header_allowlist()
+    return {k.lower(): v for k, v in headers.items() if k.lower() in allowlist}
+
+
+async def _intern_values(db: AsyncSession, values: set[str]) -> dict[str, int]:
+    """Get ids of the given values, inserting the ones not stored yet."""
+    dialect = db.bind.dialect.name if db.bind else "sqlite"
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+
+    # Concurrent signups may insert the same value, the conflict is harmless
+    await db.execute(
+        insert(AttributionValue)
+        .values([{"value": value} for value in values])
+        .on_conflict_do_nothing(index_elements=["value"])
+    )
+    result = await db.exec(
+        select(AttributionValue.value, AttributionValue.id).where(
+            col(AttributionValue.value).in_(values)
+        )
+    )
+    return {value: value_id for value, value_id in result.all() if value_id}
+
+
+async def store_signup_attribution(
+    db: AsyncSession, profile_id: uuid.UUID, headers: dict[str, str]
+) -> None:
+    """
+    Store the allowlisted headers as the profile's signup attribution.
+
+    Does not commit, the rows become part of the caller's transaction.
+    """
+    attribution = filter_attribution_headers(headers)
+    if not attribution:
+        return
+
+    value_ids = await _intern_values(db, set(attribution.values()))
+    db.add_all(
+        ProfileAttribution(
+            profile_id=profile_id, header=header, value_id=value_ids[value]
+        )
+        for header, value in attribution.items()
+    )
+    await db.flush()
+
+
+async def load_signup_attribution(
+    db: AsyncSession, profile_id: uuid.UUID
+) -> dict[str, str]:
+    result = await db.exec(
+        select(ProfileAttribution.header, AttributionValue.value)
+        .join(AttributionValue)
+        .where(ProfileAttribution.profile_id == profile_id)
+    )
+    return dict(result.all())
+
+
+__all__ = [
+    "get_attribution_header_allowlist",
+    "load_signup_attribution",
+    "store_signup_attribution",
+]
@@ -0,0 +1,32 @@
+"""
+Rebuild the `daily_stats` rollups from the profiles and organizations tables.
+
+Run after deploying the rollups to fill in the days before them, or to fix
+counters that drifted. The base tables are read in primary key chunks, each
+in its own short transaction, and the rollups are written at the end in a
+single one. Run from the repository root:
+
+    python -m scripts.backfill_daily_stats [--chunk-size 10000]
+"""
+
+import argparse
+import asyncio
+import time
+
+import app.main  # noqa: F401  registers every model with the mapper
+from app.database import init_db
+from app.use_cases.daily_stats import rebuild_daily_stats
+
+
+async def main(chunk_size: int) -> None:
+    await init_db()  # creates the daily_stats table
+    started = time.perf_counter()
+    days = await rebuild_daily_stats(chunk_size)
+    print(f"Rebuilt {days} days in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.chunk_size))
@@ -0,0 +1,119 @@
+"""
+Compare CPU time per request of the ORM and the Core read path for organizations.
+
+Builds a 100-item `GET /organizations/` page both ways: loading `Organization`
+instances through the session and validating them into responses, and
+selecting only `id` and `name` on the session's connection and mapping the
+rows directly. Uses a throwaway database in a temporary directory. Run from
+the repository root:
+
+    python -m scripts.bench_organization_reads [iterations]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+
+
+async def main(iterations: int, page_size: int = 100) -> None:
+    from fastapi_pagination import Params, set_params
+    from fastapi_pagination.ext.sqlalchemy import apaginate
+    from sqlmodel import col, select
+
+    import app.main  # noqa: F401  registers every model with the mapper
+    from app.database import async_session, init_db
+    from app.models.organization import Organization
+    from app.models.organization_membership import (
+        OrganizationMembership,
+        OrganizationRole,
+    )
+    from app.models.profile import Profile
+    from app.routes.organizations import OrganizationResponse, _organization_responses
+
+    await init_db()
+    async with async_session() as session:
+        profile = Profile(email="bench@example.com", name="Bench")
+        session.add(profile)
+        await session.flush()
+        for index in range(page_size):
+            organization = Organization(name=f"Organization {index}")
+            session.add(organization)
+            await session.flush()
+            session.add(
+                OrganizationMembership(
+                    profile_id=profile.id,
+                    organization_id=organization.id,
+                    role=OrganizationRole.MEMBER,
+                )
+            )
+        await session.commit()
+        profile_id: uuid.UUID = profile.id
+
+    set_params(Params(page=1, size=page_size))
+
+    async def orm_path() -> int:
+        async with async_session() as session:
+            query = (
+                select(Organization)
+                .join(OrganizationMembership)
+                .where(
+                    OrganizationMembership.profile_id == profile_id,
+                    col(Organization.deleted_at).is_(None),
+                )
+                .order_by(col(Organization.created_at))
+            )
+            page = await apaginate(
+                session,
+                query,
+                transformer=lambda organizations: [
+                    OrganizationResponse.model_validate(
+                        organization, from_attributes=True
+                    )
+                    for organization in organizations
+                ],
+            )
+            return len(page.items)
+
+    async def core_path() -> int:
+        async with async_session() as session:
+            query = (
+                select(Organization.id, Organization.name)
+                .join(OrganizationMembership)
+                .where(
+                    OrganizationMembership.profile_id == profile_id,
+                    col(Organization.deleted_at).is_(None),
+                )
+                .order_by(col(Organization.created_at))
+            )
+            page = await apaginate(
+                await session.connection(),
+                query,
+                transformer=_organization_responses,
+            )
+            return len(page.items)
+
+    async def measure(name: str, path: Callable[[], Awaitable[int]]) -> float:
+        for _ in range(10):  # warm up statement caches
+            assert await path() == page_size
+        started = time.process_time()
+        for _ in range(iterations):
+            await path()
+        per_request = (time.process_time() - started) / iterations
+        print(f"{name:>4}: {per_request * 1000:6.3f} ms CPU per {page_size}-item page")
+        return per_request
+
+    orm = await measure("orm", orm_path)
+    core = await measure("core", core_path)
+    print(f"core path uses {core / orm:.0%} of the ORM path's CPU time")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, os.getcwd())
+        os.chdir(directory)  # the app keeps its SQLite file in the working directory
+        asyncio.run(main(iterations))
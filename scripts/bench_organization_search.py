@@ -0,0 +1,107 @@
+"""
+Measure `GET /organizations/search` lookup latency on a seeded database.
+
+Seeds a throwaway database with `scripts.seed_database` (100k organizations
+by default) and times a page of search results for the profile with the most
+memberships and for a typical one, both through the trigram index and by
+reading the names of the caller's organizations. The plan the endpoint picks
+for the profile is marked. Run from the repository root:
+
+    python -m scripts.bench_organization_search [--organizations 100000]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlmodel import col, select
+
+from app.models.organization_membership import OrganizationMembership
+from app.organization_search import (
+    create_organization_search_index,
+    search_organizations,
+    search_organizations_query,
+)
+from scripts.seed_database import seed
+
+RUNS = 50
+PAGE_SIZE = 50
+# Seeded names are "Organization <index>"
+QUERIES = ("Organization 1", "zation 12", "ion 4242", "nothing like it")
+
+
+async def _profiles(connection: AsyncConnection) -> dict[str, uuid.UUID]:
+    """The profile with the most memberships and one with the median count."""
+    rows = (
+        await connection.execute(
+            select(OrganizationMembership.profile_id, func.count().label("count"))
+            .group_by(col(OrganizationMembership.profile_id))
+            .order_by(func.count().desc())
+        )
+    ).all()
+    heaviest, median = rows[0], rows[len(rows) // 2]
+    return {
+        f"{heaviest.count} memberships": heaviest.profile_id,
+        f"{median.count} memberships": median.profile_id,
+    }
+
+
+async def _time(connection: AsyncConnection, statement: Any) -> tuple[float, int]:
+    durations = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        rows = (await connection.execute(statement)).all()
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, len(rows)
+
+
+async def main(organizations: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(directory, 'search.db')}"
+        )
+        await seed(
+            engine,
+            profiles=organizations // 2,
+            organizations=organizations,
+            memberships=organizations * 5,
+        )
+        async with engine.begin() as connection:
+            started = time.perf_counter()
+            await connection.run_sync(create_organization_search_index)
+            print(f"index built in {time.perf_counter() - started:.1f} s")
+
+        async with engine.connect() as connection:
+            for label, profile_id in (await _profiles(connection)).items():
+                print(f"--- profile with {label}")
+                for query in QUERIES:
+                    chosen = str(
+                        await search_organizations(connection, profile_id, query)
+                    )
+                    for use_index in (True, False):
+                        statement = search_organizations_query(
+                            profile_id, query, "sqlite", use_index
+                        )
+                        median, found = await _time(
+                            connection, statement.limit(PAGE_SIZE)
+                        )
+                        print(
+                            f"{query!r:>18} {'index' if use_index else 'scan':>5}: "
+                            f"median {median:7.3f} ms, {found} results"
+                            + ("  <- picked" if str(statement) == chosen else "")
+                        )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--organizations", type=int, default=100_000)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.organizations))
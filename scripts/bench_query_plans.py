@@ -0,0 +1,276 @@
+"""
+Run every route's query shape against seeded databases of growing size.
+
+For each scale a throwaway database is seeded with `scripts.seed_database`,
+then each query shape below is explained and timed. Plans that scan a whole
+table or sort through a temporary B-tree are flagged, those are the missing
+indexes that only hurt once a customer grows. Results are printed and
+appended as JSON lines to `--output`. Run from the repository root:
+
+    python -m scripts.bench_query_plans [--scales 0.001 0.01 0.1]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlmodel import SQLModel, col, select
+
+from app import queries
+from app.models.idempotency_key import IdempotencyKey
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+from app.models.profile import Profile
+from scripts.seed_database import (
+    MEMBERSHIPS,
+    ORGANIZATIONS,
+    PROFILES,
+    seed,
+)
+
+RUNS = 20
+PAGE_SIZE = 50
+
+# Plan steps that mean the query won't keep up as the tables grow, full scans
+# of a table and sorts of rows that an index could have returned in order
+SQLITE_WARNINGS = ("SCAN ", "USE TEMP B-TREE")
+POSTGRESQL_WARNINGS = ("Seq Scan", "Sort")
+INDEX_USAGE = re.compile(r"(?:USING (?:COVERING )?INDEX|Index.* Scan using) (\w+)")
+
+
+class Sample:
+    """Ids of rows the query shapes are run with."""
+
+    def __init__(
+        self,
+        email: str,
+        profile_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        organization_ids: list[uuid.UUID],
+    ) -> None:
+        # Timestamps are stored naive in UTC
+        self.now = datetime.now(UTC).replace(tzinfo=None)
+        self.email = email
+        self.profile_id = profile_id
+        self.organization_id = organization_id
+        self.organization_ids = organization_ids
+
+
+def _organizations_of_profile(sample: Sample) -> Any:
+    return (
+        select(Organization.id, Organization.name)
+        .join(OrganizationMembership)
+        .where(
+            OrganizationMembership.profile_id == sample.profile_id,
+            col(Organization.deleted_at).is_(None),
+        )
+        .order_by(col(Organization.created_at))
+    )
+
+
+# Route (or job) -> statement built like the route builds it
+QUERY_SHAPES: dict[str, Callable[[Sample], Any]] = {
+    "auth: profile by email": lambda sample: queries.PROFILE_BY_EMAIL.params(
+        email=sample.email
+    ),
+    "GET /profiles/": lambda sample: queries.PROFILE_ROW_BY_EMAIL.params(
+        email=sample.email
+    ),
+    "membership lookup": lambda sample: (
+        queries.MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION.params(
+            profile_id=sample.profile_id, organization_id=sample.organization_id
+        )
+    ),
+    "GET /organizations/{id}": lambda sample: (
+        queries.ORGANIZATION_RESPONSE_BY_ID.params(
+            organization_id=sample.organization_id
+        )
+    ),
+    "PATCH/DELETE /organizations/{id}": lambda sample: (
+        queries.ORGANIZATION_BY_ID.params(organization_id=sample.organization_id)
+    ),
+    "GET /organizations/ page": lambda sample: (
+        _organizations_of_profile(sample).limit(PAGE_SIZE).offset(0)
+    ),
+    "GET /organizations/ count": lambda sample: select(func.count()).select_from(
+        _organizations_of_profile(sample).order_by(None).subquery()
+    ),
+    "GET /organizations/batch": lambda sample: (
+        select(Organization.id, Organization.name, OrganizationMembership.role)
+        .join(OrganizationMembership)
+        .where(
+            col(Organization.id).in_(sample.organization_ids),
+            OrganizationMembership.profile_id == sample.profile_id,
+            col(Organization.deleted_at).is_(None),
+        )
+    ),
+    "POST /bootstrap/ page": lambda sample: (
+        select(Organization.id, Organization.name, OrganizationMembership.role)
+        .join(OrganizationMembership)
+        .where(
+            OrganizationMembership.profile_id == sample.profile_id,
+            col(Organization.deleted_at).is_(None),
+        )
+        .order_by(col(Organization.created_at))
+        .limit(PAGE_SIZE)
+    ),
+    "denylist refresh": lambda sample: select(Profile.email, Profile.banned_at).where(
+        col(Profile.banned_at) >= sample.now - timedelta(minutes=1)
+    ),
+    "organization reaper": lambda sample: (
+        select(OrganizationMembership.id)
+        .where(
+            col(OrganizationMembership.organization_id).in_(
+                select(Organization.id).where(col(Organization.deleted_at).is_not(None))
+            )
+        )
+        .limit(1000)
+    ),
+    "idempotency key sweep": lambda sample: delete(IdempotencyKey).where(
+        tuple_(col(IdempotencyKey.user_id), col(IdempotencyKey.key)).in_(
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(col(IdempotencyKey.expires_at) < sample.now)
+            .limit(1000)
+        )
+    ),
+}
+
+
+async def _pick_sample(connection: AsyncConnection) -> Sample:
+    """The profile with the most memberships, where list queries hurt the most."""
+    profile_id, _ = (
+        await connection.execute(
+            select(
+                OrganizationMembership.profile_id,
+                func.count().label("memberships"),
+            )
+            .group_by(col(OrganizationMembership.profile_id))
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+    ).one()
+    email = (
+        await connection.execute(select(Profile.email).where(Profile.id == profile_id))
+    ).scalar_one()
+    organization_ids = list(
+        (
+            await connection.execute(
+                select(OrganizationMembership.organization_id)
+                .where(OrganizationMembership.profile_id == profile_id)
+                .limit(100)
+            )
+        ).scalars()
+    )
+    return Sample(email, profile_id, organization_ids[-1], organization_ids)
+
+
+async def _explain(connection: AsyncConnection, statement: Any) -> list[str]:
+    sql = str(
+        statement.compile(
+            dialect=connection.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+    if connection.dialect.name == "sqlite":
+        rows = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in rows]
+    rows = await connection.exec_driver_sql(f"EXPLAIN {sql}")
+    return [row[0] for row in rows]
+
+
+async def _time(connection: AsyncConnection, statement: Any) -> list[float]:
+    durations = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        transaction = await connection.begin_nested()
+        # Writes are rolled back so every run sees the same data
+        result = await connection.execute(statement)
+        if result.returns_rows:
+            result.all()
+        await transaction.rollback()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def _flagged(plan: list[str], dialect: str) -> list[str]:
+    if dialect != "sqlite":
+        return [step for step in plan if step.strip().startswith(POSTGRESQL_WARNINGS)]
+    tables = SQLModel.metadata.tables
+    return [
+        step
+        for step in plan
+        if step.startswith("USE TEMP B-TREE")
+        # Scanning a subquery's result is fine, scanning a table isn't
+        or (step.startswith("SCAN ") and step.split()[1] in tables)
+    ]
+
+
+def _indexes(plan: list[str]) -> list[str]:
+    return sorted({match for step in plan for match in INDEX_USAGE.findall(step)})
+
+
+async def benchmark(engine: AsyncEngine, scale: float, output: str) -> None:
+    async with engine.connect() as connection:
+        sample = await _pick_sample(connection)
+        for name, build in QUERY_SHAPES.items():
+            statement = build(sample)
+            plan = await _explain(connection, statement)
+            durations = await _time(connection, statement)
+            flagged = _flagged(plan, connection.dialect.name)
+            indexes = _indexes(plan)
+            median = statistics.median(durations) * 1000
+            p95 = sorted(durations)[int(len(durations) * 0.95) - 1] * 1000
+            print(
+                f"{name:>34}: median {median:8.3f} ms, p95 {p95:8.3f} ms, "
+                f"indexes {', '.join(indexes) or '-'}"
+                + ("  !! " + "; ".join(flagged) if flagged else "")
+            )
+            with open(output, "a") as file:
+                record = {
+                    "scale": scale,
+                    "query": name,
+                    "median_ms": round(median, 3),
+                    "p95_ms": round(p95, 3),
+                    "plan": plan,
+                    "indexes": indexes,
+                    "flagged": flagged,
+                }
+                file.write(json.dumps(record) + "\n")
+
+
+async def main(scales: list[float], output: str) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in scales:
+            print(
+                f"--- scale {scale}: {int(PROFILES * scale)} profiles, "
+                f"{int(ORGANIZATIONS * scale)} organizations, "
+                f"{int(MEMBERSHIPS * scale)} memberships"
+            )
+            path = os.path.join(directory, f"scale_{scale}.db")
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            await seed(
+                engine,
+                profiles=max(int(PROFILES * scale), 1),
+                organizations=max(int(ORGANIZATIONS * scale), 1),
+                memberships=max(int(MEMBERSHIPS * scale), 1),
+            )
+            await benchmark(engine, scale, output)
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.001, 0.01, 0.1])
+    parser.add_argument("--output", default="query_plans.jsonl")
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.scales, os.path.abspath(arguments.output)))
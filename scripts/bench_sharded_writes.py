@@ -0,0 +1,138 @@
+"""
+Measure `POST /organizations/` throughput as the number of shards grows.
+
+Several worker processes, like the workers of an app server, each create
+organizations through the app in-process, straight through ASGI with every
+middleware, from concurrent clients. For each shard count the organizations
+are spread over that many SQLite files (DATABASE_SHARDS) next to the global
+database, in a throwaway temporary directory. Requests failing on a locked
+database are counted, not retried. Every creation still writes the
+membership directory and the daily stats to the global database. Run from
+the repository root:
+
+    python -m scripts.bench_sharded_writes [--shards 1 2 4 8] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from multiprocessing.synchronize import Barrier
+from typing import Any
+
+HEADERS = {"Authorization": "Bearer petr_token"}
+
+
+async def _prepare() -> None:
+    import app.main  # noqa: F401  registers every model with the mapper
+    from app.database import async_session, close_db_connection, init_db, nuke_db
+    from app.models.profile import Profile
+
+    await nuke_db()
+    await init_db()
+    # Signing up through the API would send a welcome email
+    async with async_session() as session:
+        session.add(Profile(email="petr@indiepitcher.com", name="Petr"))
+        await session.commit()
+    await close_db_connection()
+
+
+async def _create(
+    requests: int, concurrency: int, start: Barrier
+) -> tuple[float, float, int]:
+    import httpx
+
+    import app.main
+
+    application = app.main.app
+    async with application.router.lifespan_context(application):
+        transport = httpx.ASGITransport(app=application, raise_app_exceptions=False)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as client:
+            # Warm up imports, statement caches and the profile lookup
+            await client.get("/organizations/", headers=HEADERS)
+            remaining = requests
+            failed = 0
+
+            async def create() -> None:
+                nonlocal remaining, failed
+                while remaining > 0:
+                    remaining -= 1
+                    response = await client.post(
+                        "/organizations/", headers=HEADERS, json={"name": "Bench"}
+                    )
+                    failed += response.status_code != 200
+
+            start.wait()
+            started = time.perf_counter()
+            await asyncio.gather(*(create() for _ in range(concurrency)))
+            return started, time.perf_counter(), failed
+
+
+def _worker(
+    directory: str, task: str, arguments: tuple[Any, ...], results: Any
+) -> None:
+    # The app keeps its SQLite files in the working directory
+    os.chdir(directory)
+    if task == "prepare":
+        asyncio.run(_prepare())
+    else:
+        results.put(asyncio.run(_create(*arguments)))
+
+
+def _run(shards: int, workers: int, requests: int, concurrency: int) -> None:
+    context = multiprocessing.get_context("spawn")
+    # Read by app.database when the spawned workers import it
+    os.environ["DATABASE_SHARDS"] = str(shards)
+    with tempfile.TemporaryDirectory() as directory:
+        results = context.Queue()
+        prepare = context.Process(
+            target=_worker, args=(directory, "prepare", (), results)
+        )
+        prepare.start()
+        prepare.join()
+
+        start = context.Barrier(workers)
+        processes = [
+            context.Process(
+                target=_worker,
+                args=(
+                    directory,
+                    "create",
+                    (requests // workers, concurrency, start),
+                    results,
+                ),
+            )
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        finished = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    elapsed = max(end for _, end, _ in finished) - min(
+        started for started, _, _ in finished
+    )
+    failed = sum(failed for _, _, failed in finished)
+    created = (requests // workers) * workers - failed
+    print(
+        f"{shards} shard(s): {created / elapsed:7.1f} organizations/s, "
+        f"{failed} failed requests"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=4)
+    arguments = parser.parse_args()
+    # The lifespan creates the client, no email is sent
+    os.environ.setdefault("INDIE_PITCHER_API_KEY", "unused")
+    for shards in arguments.shards:
+        _run(shards, arguments.workers, arguments.requests, arguments.concurrency)
@@ -0,0 +1,146 @@
+"""
+Measure the memory an idle `GET /organizations/events` connection costs a worker.
+
+Opens many concurrent event streams against the app in-process, straight
+through ASGI with every middleware, and waits until each is subscribed. The
+growth of the resident set size divided by the number of connections is the
+memory per connection, without the socket buffers a real server adds. Then
+one event is published to all of them and the time until every stream got
+it is reported. `--tracemalloc` additionally reports the Python heap per
+connection (and inflates the RSS). Uses a throwaway database in a temporary
+directory. Run from the repository root:
+
+    python -m scripts.bench_sse_connections [--connections 10000] [--tracemalloc]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from starlette.types import Message, Scope
+
+
+def _rss() -> int:
+    """Current resident set size in bytes."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak instead of current on platforms without procfs (KiB on Linux)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+async def main(connections: int, trace: bool) -> None:
+    import app.main
+    from app.broadcaster import get_broadcaster
+    from app.database import async_session
+    from app.models.profile import Profile
+
+    application = app.main.app
+    async with application.router.lifespan_context(application):
+        async with async_session() as session:
+            profile = Profile(email="petr@indiepitcher.com", name="Petr")
+            session.add(profile)
+            await session.commit()
+            profile_id = profile.id
+
+        broadcaster = get_broadcaster()
+        disconnect = asyncio.Event()
+        opened = 0
+        received = 0
+        all_opened = asyncio.Event()
+        all_received = asyncio.Event()
+
+        async def connect() -> None:
+            scope: Scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": "/organizations/events",
+                "raw_path": b"/organizations/events",
+                "root_path": "",
+                "query_string": b"",
+                "headers": [(b"authorization", b"Bearer petr_token")],
+                "client": ("127.0.0.1", 50000),
+                "server": ("testserver", 80),
+            }
+
+            async def receive() -> Message:
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message: Message) -> None:
+                nonlocal opened, received
+                if message["type"] == "http.response.start":
+                    assert message["status"] == 200, message
+                    opened += 1
+                    if opened == connections:
+                        all_opened.set()
+                elif message.get("body", b"").startswith(b"event:"):
+                    received += 1
+                    if received == connections + 1:  # the warm-up one too
+                        all_received.set()
+
+            await application(scope, receive, send)
+
+        # Warm up imports, statement caches and the profile lookup
+        warm_up = asyncio.create_task(connect())
+        while opened == 0:
+            await asyncio.sleep(0.01)
+        opened = 0
+
+        gc.collect()
+        if trace:
+            tracemalloc.start()
+        rss_before = _rss()
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(connect()) for _ in range(connections)]
+        await all_opened.wait()
+        # The subscription happens in the handler, the stream starts right after
+        while len(broadcaster) < connections + 1:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        rss_after = _rss()
+        print(f"opened {connections} connections in {elapsed:.1f} s")
+        print(
+            f"RSS grew by {(rss_after - rss_before) / 2**20:.1f} MiB, "
+            f"{(rss_after - rss_before) / connections / 1024:.1f} KiB per connection"
+        )
+        if trace:
+            traced, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"Python heap: {traced / connections / 1024:.1f} KiB per connection")
+
+        started = time.perf_counter()
+        broadcaster.publish([profile_id], "organization.updated", {"name": "Bench"})
+        await all_received.wait()
+        print(
+            f"fan-out of one event to {connections} streams took "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+        disconnect.set()
+        await asyncio.gather(warm_up, *tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--tracemalloc", action="store_true")
+    arguments = parser.parse_args()
+    # The lifespan creates the client, no email is sent
+    os.environ.setdefault("INDIE_PITCHER_API_KEY", "unused")
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, os.getcwd())
+        os.chdir(directory)  # the app keeps its SQLite file in the working directory
+        asyncio.run(main(arguments.connections, arguments.tracemalloc))
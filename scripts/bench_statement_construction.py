@@ -0,0 +1,97 @@
+"""
+Compare the cost of building the hot statements per call with reusing them.
+
+For each statement in `app.queries`, times building the equivalent
+`select(...).where(...)` and generating its cache key, as the routes did on
+every call, against generating the cache key of the pre-built statement,
+which SQLAlchemy memoizes. Run from the repository root:
+
+    python -m scripts.bench_statement_construction [iterations]
+"""
+
+import sys
+import timeit
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from sqlalchemy import select as core_select
+from sqlmodel import col, select
+
+import app.main  # noqa: F401  registers every model with the mapper
+from app import queries
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+from app.models.profile import Profile
+
+
+def build_profile_by_email() -> Any:
+    return select(Profile).where(Profile.email == "petr@indiepitcher.com")
+
+
+def build_profile_row_by_email() -> Any:
+    return core_select(
+        col(Profile.id),
+        col(Profile.email),
+        col(Profile.name),
+        col(Profile.avatar_url),
+        col(Profile.banned_at),
+    ).where(col(Profile.email) == "petr@indiepitcher.com")
+
+
+def build_membership() -> Any:
+    return select(OrganizationMembership).where(
+        OrganizationMembership.profile_id == uuid.uuid4(),
+        OrganizationMembership.organization_id == uuid.uuid4(),
+    )
+
+
+def build_organization_by_id() -> Any:
+    return select(Organization).where(
+        Organization.id == uuid.uuid4(), col(Organization.deleted_at).is_(None)
+    )
+
+
+def build_organization_response_by_id() -> Any:
+    return select(Organization.id, Organization.name).where(
+        Organization.id == uuid.uuid4(), col(Organization.deleted_at).is_(None)
+    )
+
+
+STATEMENTS: list[tuple[str, Callable[[], Any], Any]] = [
+    ("profile by email", build_profile_by_email, queries.PROFILE_BY_EMAIL),
+    (
+        "profile row by email",
+        build_profile_row_by_email,
+        queries.PROFILE_ROW_BY_EMAIL,
+    ),
+    (
+        "membership",
+        build_membership,
+        queries.MEMBERSHIP_BY_PROFILE_AND_ORGANIZATION,
+    ),
+    ("organization by id", build_organization_by_id, queries.ORGANIZATION_BY_ID),
+    (
+        "organization response",
+        build_organization_response_by_id,
+        queries.ORGANIZATION_RESPONSE_BY_ID,
+    ),
+]
+
+
+def main(iterations: int) -> None:
+    for name, build, prebuilt in STATEMENTS:
+        rebuilt = timeit.timeit(
+            lambda: build()._generate_cache_key(), number=iterations
+        )
+        reused = timeit.timeit(
+            lambda: prebuilt._generate_cache_key(), number=iterations
+        )
+        print(
+            f"{name:>21}: rebuilt {rebuilt / iterations * 1e6:6.1f} us, "
+            f"pre-built {reused / iterations * 1e6:6.1f} us per call"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
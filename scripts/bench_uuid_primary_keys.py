@@ -0,0 +1,89 @@
+"""
+Compare insert throughput and index size of uuid4 and uuid7 primary keys.
+
+Creates the real `organizations` table (DDL compiled from the model, so the
+primary key and its extra `index=True` index are included) in two throwaway
+SQLite databases and inserts the same number of rows into each, once with
+random uuid4 ids and once with time-ordered uuid7 ids. Reports throughput
+for the whole run and for the last batch (when the index no longer fits in
+the page cache random keys degrade most), plus per-index size from dbstat.
+Run from the repository root:
+
+    python -m scripts.bench_uuid_primary_keys [rows] [batch_size]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.ids import uuid7
+from app.models.organization import Organization
+
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    table = Organization.__table__  # type: ignore[attr-defined]
+    dialect = sqlite.dialect()
+    connection.execute(str(CreateTable(table).compile(dialect=dialect)))
+    for index in table.indexes:
+        connection.execute(str(CreateIndex(index).compile(dialect=dialect)))
+
+
+def run(
+    path: str, rows: int, batch_size: int, generate_id: Callable[[], uuid.UUID]
+) -> None:
+    connection = sqlite3.connect(path)
+    create_schema(connection)
+    now = datetime.now(UTC).isoformat(sep=" ")
+    started = time.perf_counter()
+    batch_seconds = 0.0
+    for offset in range(0, rows, batch_size):
+        batch = [
+            (generate_id().hex, f"Organization {offset + i}", now, now)
+            for i in range(min(batch_size, rows - offset))
+        ]
+        batch_started = time.perf_counter()
+        with connection:
+            connection.executemany(
+                "INSERT INTO organizations (id, name, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                batch,
+            )
+        batch_seconds = time.perf_counter() - batch_started
+    elapsed = time.perf_counter() - started
+
+    sizes = dict(
+        connection.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"
+        ).fetchall()
+    )
+    connection.close()
+    name = generate_id.__name__
+    print(
+        f"{name}: {rows / elapsed:9.0f} rows/s overall, "
+        f"{len(batch) / batch_seconds:9.0f} rows/s last batch, "
+        f"file {os.path.getsize(path) / 2**20:8.1f} MiB"
+    )
+    for table_or_index, size in sorted(sizes.items()):
+        if table_or_index != "sqlite_schema":
+            print(f"    {table_or_index:>32}: {size / 2**20:8.1f} MiB")
+
+
+def main(rows: int, batch_size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for generate_id in (uuid.uuid4, uuid7):
+            path = os.path.join(directory, f"{generate_id.__name__}.db")
+            run(path, rows, batch_size, generate_id)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    main(rows, batch_size)
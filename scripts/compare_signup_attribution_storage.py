@@ -0,0 +1,150 @@
+"""
+Compare the on-disk size of the JSON and the normalized signup attribution layouts.
+
+Builds throwaway SQLite files filled with synthetic but realistic request
+headers and prints their sizes. Run from the repository root:
+
+    python -m scripts.compare_signup_attribution_storage [profiles]
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import uuid
+
+from app.use_cases.signup_attribution import DEFAULT_ATTRIBUTION_HEADERS
+
+PROFILES_DDL = (
+    "CREATE TABLE profiles (id CHAR(32) PRIMARY KEY, email VARCHAR NOT NULL, "
+    "name VARCHAR, avatar_url VARCHAR, created_at DATETIME NOT NULL, "
+    "updated_at DATETIME NOT NULL, banned_at DATETIME, last_seen_at DATETIME NOT NULL"
+    "{extra})"
+)
+
+
+def _fake_headers(rng: random.Random) -> dict[str, str]:
+    platform = rng.choice(['"macOS"', '"Windows"', '"iOS"', '"Android"', '"Linux"'])
+    version = rng.randint(110, 130)
+    return {
+        "host": "api.indiepitcher.com",
+        "user-agent": (
+            f"Mozilla/5.0 ({platform.strip('"')}) AppleWebKit/537.36 "
+            f"(KHTML, like Gecko) Chrome/{version}.0.0.0 Safari/537.36"
+        ),
+        "accept": "application/json, text/plain, */*",
+        "accept-encoding": "gzip, deflate, br, zstd",
+        "accept-language": rng.choice(["en-US,en;q=0.9", "cs-CZ,cs;q=0.9", "de"]),
+        "origin": "https://indiepitcher.com",
+        "referer": rng.choice(
+            ["https://indiepitcher.com/", "https://www.google.com/", "https://x.com/"]
+        ),
+        "sec-ch-ua": f'"Chromium";v="{version}", "Not.A/Brand";v="24"',
+        "sec-ch-ua-mobile": "?0",
+        "sec-ch-ua-platform": platform,
+        "sec-fetch-dest": "empty",
+        "sec-fetch-mode": "cors",
+        "sec-fetch-site": "same-site",
+        "content-length": "0",
+        "connection": "keep-alive",
+        "client_ip": ".".join(str(rng.randint(1, 254)) for _ in range(4)),
+    }
+
+
+def _profile_row(index: int) -> tuple[str, ...]:
+    now = "2025-01-01 00:00:00"
+    return (uuid.uuid4().hex, f"user{index}@example.com", now, now, now)
+
+
+def _build_json(path: str, profiles: list[dict[str, str]]) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(
+        PROFILES_DDL.format(extra=", signup_attribution_data JSON NOT NULL")
+    )
+    connection.executemany(
+        "INSERT INTO profiles (id, email, created_at, updated_at, last_seen_at, "
+        "signup_attribution_data) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (*_profile_row(index), json.dumps(headers))
+            for index, headers in enumerate(profiles)
+        ),
+    )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def _build_normalized(
+    path: str, profiles: list[dict[str, str]], allowlist: set[str] | None
+) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(PROFILES_DDL.format(extra=""))
+    connection.execute(
+        "CREATE TABLE attribution_values (id INTEGER PRIMARY KEY, "
+        "value VARCHAR NOT NULL UNIQUE)"
+    )
+    connection.execute(
+        "CREATE TABLE profile_attributions (profile_id CHAR(32) NOT NULL, "
+        "header VARCHAR(100) NOT NULL, value_id INTEGER NOT NULL, "
+        "PRIMARY KEY (profile_id, header)) WITHOUT ROWID"
+    )
+    value_ids: dict[str, int] = {}
+    for index, headers in enumerate(profiles):
+        row = _profile_row(index)
+        connection.execute(
+            "INSERT INTO profiles (id, email, created_at, updated_at, last_seen_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            row,
+        )
+        for header, value in headers.items():
+            if allowlist is not None and header not in allowlist:
+                continue
+            if value not in value_ids:
+                value_ids[value] = len(value_ids) + 1
+                connection.execute(
+                    "INSERT INTO attribution_values (id, value) VALUES (?, ?)",
+                    (value_ids[value], value),
+                )
+            connection.execute(
+                "INSERT INTO profile_attributions VALUES (?, ?, ?)",
+                (row[0], header, value_ids[value]),
+            )
+    connection.commit()
+    connection.execute("VACUUM")
+    connection.close()
+
+
+def main(count: int) -> None:
+    rng = random.Random(42)
+    profiles = [_fake_headers(rng) for _ in range(count)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        layouts = {
+            "json, all headers": lambda path: _build_json(path, profiles),
+            "normalized, all headers": lambda path: _build_normalized(
+                path, profiles, None
+            ),
+            "normalized, allowlist": lambda path: _build_normalized(
+                path, profiles, set(DEFAULT_ATTRIBUTION_HEADERS)
+            ),
+        }
+        print(f"{count} profiles")
+        for name, build in layouts.items():
+            path = os.path.join(directory, f"{name}.db")
+            build(path)
+            # dbstat reports the pages used by the hot profiles table alone
+            connection = sqlite3.connect(path)
+            profiles_bytes = connection.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = 'profiles'"
+            ).fetchone()[0]
+            connection.close()
+            print(
+                f"{name:>24}: {os.path.getsize(path) / 1024 / 1024:7.2f} MiB total, "
+                f"profiles table {profiles_bytes / 1024 / 1024:7.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
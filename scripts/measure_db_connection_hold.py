@@ -0,0 +1,115 @@
+"""
+Measure how long requests hold pooled DB connections when clients are slow.
+
+Fires concurrent `GET /organizations/` requests whose response is sent over a
+slow (simulated) network, once with sessions released right after the handler
+and once with the release disabled (sessions live until dependency teardown).
+Uses a throwaway database in a temporary directory. Run from the repository root:
+
+    python -m scripts.measure_db_connection_hold [concurrency] [send_delay]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.types import Message, Receive, Scope, Send
+
+HEADERS = {"Authorization": "Bearer petr_token"}
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.checked_out = 0
+        self.peak = 0
+        self.hold_times: list[float] = []
+        self._checked_out_at: dict[int, float] = {}
+
+    def on_checkout(self, dbapi_connection: Any, *args: Any) -> None:
+        self.checked_out += 1
+        self.peak = max(self.peak, self.checked_out)
+        self._checked_out_at[id(dbapi_connection)] = time.perf_counter()
+
+    def on_checkin(self, dbapi_connection: Any, *args: Any) -> None:
+        self.checked_out -= 1
+        started = self._checked_out_at.pop(id(dbapi_connection), None)
+        if started is not None:
+            self.hold_times.append(time.perf_counter() - started)
+
+
+async def run(concurrency: int, send_delay: float, release: bool) -> None:
+    import app.routes.di
+    from app.database import release_db_sessions
+    from app.main import app as fastapi_app
+
+    async def keep_sessions(request: Any) -> None:
+        pass
+
+    app.routes.di.release_db_sessions = (  # type: ignore[attr-defined]
+        release_db_sessions if release else keep_sessions
+    )
+
+    async def slow_network_app(scope: Scope, receive: Receive, send: Send) -> None:
+        async def slow_send(message: Message) -> None:
+            if message["type"] == "http.response.body":
+                await asyncio.sleep(send_delay)
+            await send(message)
+
+        await fastapi_app(scope, receive, slow_send)
+
+    stats = PoolStats()
+    event.listen(Pool, "checkout", stats.on_checkout)
+    event.listen(Pool, "checkin", stats.on_checkin)
+    async with AsyncClient(
+        transport=ASGITransport(app=slow_network_app), base_url="http://bench"
+    ) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(
+                client.get("/organizations/", headers=HEADERS)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    event.remove(Pool, "checkout", stats.on_checkout)
+    event.remove(Pool, "checkin", stats.on_checkin)
+
+    assert all(response.status_code == 200 for response in responses)
+    mean_hold = sum(stats.hold_times) / len(stats.hold_times)
+    print(
+        f"{'early release' if release else 'teardown release':>16}: "
+        f"peak {stats.peak:2d} connections for {concurrency} requests, "
+        f"mean hold {mean_hold * 1000:7.1f} ms, wall {elapsed * 1000:7.1f} ms"
+    )
+
+
+async def main(concurrency: int, send_delay: float) -> None:
+    from fastapi_pagination import add_pagination
+
+    from app.database import init_db
+    from app.main import app as fastapi_app
+
+    await init_db()
+    add_pagination(fastapi_app)  # the lifespan doesn't run without a server
+    async with AsyncClient(
+        transport=ASGITransport(app=fastapi_app), base_url="http://bench"
+    ) as client:
+        await client.post("/profiles/", headers=HEADERS)
+
+    for release in (False, True):
+        await run(concurrency, send_delay, release)
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    send_delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, os.getcwd())
+        os.chdir(directory)  # the app keeps its SQLite file in the working directory
+        asyncio.run(main(concurrency, send_delay))
@@ -0,0 +1,88 @@
+"""
+Move `profiles.signup_attribution_data` into the normalized attribution tables.
+
+Profiles are migrated in chunks, each in its own transaction, so the script can
+be interrupted and re-run. The JSON column is dropped once every profile is
+migrated. Run from the repository root:
+
+    python -m scripts.migrate_signup_attribution
+"""
+
+import asyncio
+import json
+import uuid
+from typing import Any
+
+from sqlalchemy import inspect, literal_column, text
+from sqlmodel import col, select
+from sqlmodel.sql.expression import Select
+
+from app.database import async_session, init_db
+from app.models import organization, organization_membership  # noqa: F401
+from app.models.profile import Profile
+from app.models.signup_attribution import ProfileAttribution
+from app.use_cases.signup_attribution import store_signup_attribution
+
+CHUNK_SIZE = 1000
+
+
+async def _has_legacy_column() -> bool:
+    async with async_session() as session:
+        connection = await session.connection()
+        columns = await connection.run_sync(
+            lambda sync_connection: inspect(sync_connection).get_columns("profiles")
+        )
+    return any(column["name"] == "signup_attribution_data" for column in columns)
+
+
+async def migrate() -> None:
+    await init_db()  # creates the attribution tables
+    if not await _has_legacy_column():
+        print("Nothing to migrate, signup_attribution_data is already gone")
+        return
+
+    migrated = 0
+    last_id = None
+    while True:
+        async with async_session() as session:
+            query: Select[uuid.UUID, Any] = (
+                select(Profile.id, literal_column("signup_attribution_data"))
+                .order_by(col(Profile.id))
+                .limit(CHUNK_SIZE)
+            )
+            if last_id is not None:
+                query = query.where(col(Profile.id) > last_id)
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            profile_ids = [row[0] for row in rows]
+            already_migrated = set(
+                (
+                    await session.exec(
+                        select(ProfileAttribution.profile_id).where(
+                            col(ProfileAttribution.profile_id).in_(profile_ids)
+                        )
+                    )
+                ).all()
+            )
+            for profile_id, data in rows:
+                if profile_id in already_migrated or not data:
+                    continue
+                headers = json.loads(data) if isinstance(data, str) else data
+                await store_signup_attribution(session, profile_id, headers)
+            await session.commit()
+            migrated += len(rows)
+            print(f"Migrated {migrated} profiles")
+
+    async with async_session() as session:
+        await session.execute(
+            text("ALTER TABLE profiles DROP COLUMN signup_attribution_data")
+        )
+        await session.commit()
+    print("Dropped profiles.signup_attribution_data")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,278 @@
+"""
+Fill the configured database with a realistic synthetic dataset.
+
+Rows are written with bulk Core inserts, bypassing the ORM. Every organization
+gets an admin, the remaining memberships are spread with a power-law skew, so
+a few profiles belong to many organizations and a few organizations have
+many members, like in production. A small share of organizations is soft
+deleted and of profiles banned. Defaults are 1M profiles, 2M organizations
+and 10M memberships, `--scale` shrinks all three. With DATABASE_SHARDS set,
+organizations and their memberships go to their shards and the membership
+directory is filled, like the app does. Run from the repository root (the
+app keeps its SQLite files in the working directory):
+
+    python -m scripts.seed_database [--scale 0.01] [--skew 3]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections.abc import Callable, Iterator, Sequence
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import SQLModel
+
+import app.main  # noqa: F401  registers every model with the mapper
+from app.database import SHARDED_TABLES, shard_count, shard_for
+from app.ids import uuid7
+from app.jobs.organization_counter_repair import recount_organizations
+from app.models.organization_membership import OrganizationRole
+
+PROFILES = 1_000_000
+ORGANIZATIONS = 2_000_000
+MEMBERSHIPS = 10_000_000
+BATCH_SIZE = 10_000
+
+DELETED_ORGANIZATIONS = 0.01
+BANNED_PROFILES = 0.001
+HISTORY = timedelta(days=730)
+
+
+def _skewed_index(size: int, skew: float) -> int:
+    """Index in range(size), low indexes are picked far more often."""
+    return min(int(size * random.random() ** skew), size - 1)
+
+
+def _created_at(index: int, size: int, now: datetime) -> datetime:
+    # Older rows first, so created_at grows with insertion order like in reality
+    return now - HISTORY * (1 - index / size)
+
+
+def _insert(engine: AsyncEngine, table_name: str) -> Any:
+    table = SQLModel.metadata.tables[table_name]
+    if engine.dialect.name == "postgresql":
+        return postgresql_insert(table).on_conflict_do_nothing()
+    if engine.dialect.name == "sqlite":
+        return sqlite_insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+
+async def _bulk_insert(
+    engines: Sequence[AsyncEngine],
+    table_name: str,
+    rows: Iterator[dict[str, Any]],
+    shard_of: Callable[[dict[str, Any]], int] = lambda row: 0,
+) -> int:
+    """Insert the rows in batches, each into the engine of its `shard_of` index."""
+    statement = _insert(engines[0], table_name)
+    inserted = 0
+    started = time.perf_counter()
+    batches: list[list[dict[str, Any]]] = [[] for _ in engines]
+
+    async def flush(shard: int) -> None:
+        nonlocal inserted
+        async with engines[shard].begin() as connection:
+            result = await connection.execute(statement, batches[shard])
+        inserted += max(result.rowcount, 0)
+        batches[shard] = []
+
+    for row in rows:
+        shard = shard_of(row)
+        batches[shard].append(row)
+        if len(batches[shard]) == BATCH_SIZE:
+            await flush(shard)
+    for shard, batch in enumerate(batches):
+        if batch:
+            await flush(shard)
+    elapsed = time.perf_counter() - started
+    print(f"{table_name:>24}: {inserted:>10} rows in {elapsed:7.1f} s")
+    return inserted
+
+
+async def _fill_directory(
+    engine: AsyncEngine, shard_engines: Sequence[AsyncEngine]
+) -> int:
+    """List the memberships each shard holds in the global membership directory."""
+    memberships = SQLModel.metadata.tables["organization_memberships"]
+    statement = _insert(engine, "membership_directory")
+    inserted = 0
+    started = time.perf_counter()
+    for shard, shard_engine in enumerate(shard_engines):
+        async with shard_engine.connect() as connection:
+            result = await connection.stream(
+                select(memberships.c.profile_id, memberships.c.organization_id)
+            )
+            async for partition in result.partitions(BATCH_SIZE):
+                async with engine.begin() as global_connection:
+                    inserted_batch = await global_connection.execute(
+                        statement,
+                        [
+                            {
+                                "profile_id": profile_id,
+                                "organization_id": organization_id,
+                                "shard": shard,
+                            }
+                            for profile_id, organization_id in partition
+                        ],
+                    )
+                inserted += max(inserted_batch.rowcount, 0)
+    elapsed = time.perf_counter() - started
+    print(f"{'membership_directory':>24}: {inserted:>10} rows in {elapsed:7.1f} s")
+    return inserted
+
+
+async def seed(
+    engine: AsyncEngine,
+    shard_engines: Sequence[AsyncEngine] | None = None,
+    profiles: int = PROFILES,
+    organizations: int = ORGANIZATIONS,
+    memberships: int = MEMBERSHIPS,
+    skew: float = 3.0,
+    random_seed: int = 0,
+) -> None:
+    """
+    Create the schema if needed and insert the synthetic dataset.
+
+    `shard_engines` are the organization shards the app is configured with,
+    `shard_for` picks among them. Without them everything goes to `engine`.
+    """
+    random.seed(random_seed)
+    now = datetime.utcnow()
+    sharded = shard_engines is not None
+    if shard_engines is not None and len(shard_engines) != shard_count():
+        raise ValueError(f"The app is configured with {shard_count()} shards")
+    shard_engines = shard_engines or [engine]
+    for seeded_engine in {engine, *shard_engines}:
+        if seeded_engine.dialect.name == "sqlite":
+
+            def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+                # Seeding can simply be rerun if the machine crashes meanwhile
+                cursor = dbapi_connection.cursor()
+                cursor.execute("PRAGMA synchronous = OFF")
+                cursor.close()
+
+            event.listen(seeded_engine.sync_engine, "connect", on_connect)
+
+    tables = SQLModel.metadata.sorted_tables
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            SQLModel.metadata.create_all,
+            tables=[t for t in tables if not sharded or t.name not in SHARDED_TABLES],
+        )
+    if sharded:
+        for shard_engine in shard_engines:
+            async with shard_engine.begin() as connection:
+                await connection.run_sync(
+                    SQLModel.metadata.create_all,
+                    tables=[t for t in tables if t.name in SHARDED_TABLES],
+                )
+
+    profile_ids = [uuid7() for _ in range(profiles)]
+    organization_ids = [uuid7() for _ in range(organizations)]
+
+    def profile_rows() -> Iterator[dict[str, Any]]:
+        for index, profile_id in enumerate(profile_ids):
+            created_at = _created_at(index, profiles, now)
+            yield {
+                "id": profile_id,
+                "email": f"user{index}@example.com",
+                "name": f"User {index}",
+                "avatar_url": None,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "banned_at": now if random.random() < BANNED_PROFILES else None,
+                "last_seen_at": created_at,
+            }
+
+    def organization_rows() -> Iterator[dict[str, Any]]:
+        for index, organization_id in enumerate(organization_ids):
+            created_at = _created_at(index, organizations, now)
+            deleted = random.random() < DELETED_ORGANIZATIONS
+            yield {
+                "id": organization_id,
+                "name": f"Organization {index}",
+                "created_at": created_at,
+                "updated_at": created_at,
+                "deleted_at": now if deleted else None,
+            }
+
+    def membership_rows() -> Iterator[dict[str, Any]]:
+        for index in range(memberships):
+            if index < organizations:
+                # Every organization was created by someone, its admin
+                organization_index = index
+                role = OrganizationRole.ADMIN
+            else:
+                organization_index = _skewed_index(organizations, skew)
+                role = random.choice((OrganizationRole.MEMBER, OrganizationRole.GUEST))
+            created_at = _created_at(organization_index, organizations, now)
+            # Duplicate (profile, organization) pairs are skipped by the insert
+            yield {
+                "id": uuid7(),
+                "profile_id": profile_ids[_skewed_index(profiles, skew)],
+                "organization_id": organization_ids[organization_index],
+                "role": role.value,
+                "created_at": created_at,
+                "updated_at": created_at,
+                "joined_at": created_at,
+            }
+
+    await _bulk_insert([engine], "profiles", profile_rows())
+    await _bulk_insert(
+        shard_engines,
+        "organizations",
+        organization_rows(),
+        lambda row: shard_for(row["id"]) if sharded else 0,
+    )
+    await _bulk_insert(
+        shard_engines,
+        "organization_memberships",
+        membership_rows(),
+        lambda row: shard_for(row["organization_id"]) if sharded else 0,
+    )
+    if sharded:
+        # Like add_to_directory, without the duplicates the shards skipped
+        await _fill_directory(engine, shard_engines)
+
+    # The bulk inserts bypass the membership use cases that keep counters
+    started = time.perf_counter()
+    for shard_engine in shard_engines:
+        async with shard_engine.begin() as connection:
+            await connection.execute(recount_organizations())
+    print(f"{'counters':>24}: recomputed in {time.perf_counter() - started:7.1f} s")
+
+
+async def main(scale: float, skew: float) -> None:
+    from app.database import DATABASE_URL, shard_urls
+
+    engine = create_async_engine(DATABASE_URL)
+    shard_engines = (
+        [create_async_engine(url) for url in shard_urls(DATABASE_URL, shard_count())]
+        if shard_count() > 1
+        else None
+    )
+    await seed(
+        engine,
+        shard_engines,
+        profiles=max(int(PROFILES * scale), 1),
+        organizations=max(int(ORGANIZATIONS * scale), 1),
+        memberships=max(int(MEMBERSHIPS * scale), 1),
+        skew=skew,
+    )
+    await engine.dispose()
+    for shard_engine in shard_engines or []:
+        await shard_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--skew", type=float, default=3.0)
+    arguments = parser.parse_args()
+    asyncio.run(main(arguments.scale, arguments.skew))
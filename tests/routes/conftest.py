@@ -5,14 +5,18 @@ import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from fastapi_pagination import add_pagination
+from sqlalchemy import Connection
 
+from app.audit import close_audit_log, list_audit_partitions, partition_table
 from app.database import (
     AsyncSession,
     async_session,
+    clear_db,
     close_db_connection,
     init_db,
     nuke_db,
 )
+from app.invalidation import close_invalidation_bus
 from app.main import app
 
 
@@ -22,11 +26,9 @@ def test_client() -> TestClient:
     return TestClient(app)
 
 
-@pytest_asyncio.fixture(autouse=True, scope="function", loop_scope="function")
-async def db_setup_and_teardown() -> AsyncGenerator[Any, Any]:
-    """Setup and teardown for each test."""
-    # Setup: Initialize the database
-    await close_db_connection()
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def db_schema() -> AsyncGenerator[Any, Any]:
+    """Create the schema once, in the in-memory database tests run against."""
     await nuke_db()
     await init_db()
     add_pagination(
@@ -37,6 +39,28 @@ async def db_setup_and_teardown() -> AsyncGenerator[Any, Any]:
     await close_db_connection()
 
 
+def _delete_audit_events(connection: Connection) -> None:
+    # The partitions stay, creating them again would slow down every flush
+    for _, name in list_audit_partitions(connection):
+        connection.execute(partition_table(name).delete())
+
+
+@pytest_asyncio.fixture(autouse=True, scope="function", loop_scope="function")
+async def db_setup_and_teardown(db_schema: Any) -> AsyncGenerator[Any, Any]:
+    """Empty the database after each test."""
+    yield
+    await close_audit_log()
+    # Forgets the cached rows, they are about to be deleted
+    await close_invalidation_bus()
+    await clear_db()
+    async with async_session() as session:
+        connection = await session.connection()
+        await connection.run_sync(_delete_audit_events)
+        await session.commit()
+    # The connections were opened in the test's event loop
+    await close_db_connection()
+
+
 @pytest_asyncio.fixture
 async def db() -> AsyncGenerator[AsyncSession]:
     """Create a fresh database session for a test."""
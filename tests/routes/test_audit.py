@@ -0,0 +1,141 @@
+import asyncio
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.audit import (
+    AuditLog,
+    get_audit_log,
+    list_audit_partitions,
+    partition_name,
+    partition_table,
+    record_audit_event,
+)
+from app.database import AsyncSession
+from app.jobs.audit_retention import drop_expired_audit_partitions
+from app.models.profile import Profile
+
+
+async def _events(db: AsyncSession, actor_id: uuid.UUID) -> list[Any]:
+    table = partition_table(partition_name(datetime.utcnow()))
+    result = await db.execute(
+        select(table.c.action, table.c.details)
+        .where(table.c.actor_id == actor_id)
+        .order_by(table.c.id)
+    )
+    return [(row.action, row.details) for row in result]
+
+
+@pytest.mark.asyncio
+async def test_mutations_are_audited(test_client: TestClient, db: AsyncSession) -> None:
+    """Test that committed changes end up in the audit log once it flushes"""
+    headers = {"Authorization": "Bearer petr_token"}
+    test_client.post("/profiles/", headers=headers)
+    profile = (await db.exec(select(Profile))).one()
+    organization_id = test_client.post(
+        "/organizations/", json={"name": "Org"}, headers=headers
+    ).json()["id"]
+    test_client.patch(
+        f"/organizations/{organization_id}", json={"name": "Renamed"}, headers=headers
+    )
+    test_client.delete(f"/organizations/{organization_id}", headers=headers)
+    test_client.delete("/profiles/", headers=headers)
+
+    await get_audit_log().flush()
+
+    assert await _events(db, profile.id) == [
+        ("membership.added", {"role": "admin"}),
+        ("organization.created", {"name": "Default Organization"}),
+        ("membership.added", {"role": "admin"}),
+        ("organization.created", {"name": "Org"}),
+        ("organization.renamed", {"old_name": "Org", "name": "Renamed"}),
+        ("organization.deleted", {"name": "Renamed"}),
+        ("organization.deleted", {"name": "Default Organization"}),
+        ("profile.deleted", {}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_events_are_dropped(db: AsyncSession) -> None:
+    """Test that only events of committed transactions are submitted"""
+    audit_log = get_audit_log()
+    await audit_log.flush()
+    actor_id = uuid.uuid4()
+
+    await db.exec(select(Profile))
+    record_audit_event(db, "profile.deleted", actor_id=actor_id)
+    await db.rollback()
+    await db.exec(select(Profile))
+    record_audit_event(db, "profile.deleted", actor_id=actor_id, committed=True)
+    await db.commit()
+
+    assert len(audit_log) == 1
+    await audit_log.flush()
+    assert await _events(db, actor_id) == [("profile.deleted", {"committed": True})]
+
+
+@pytest.mark.asyncio
+async def test_buffered_events_survive_failed_shutdown(
+    tmp_path: Path, db: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that events that can't be written are spilled and written on restart"""
+    spill_path = str(tmp_path / "spill.jsonl")
+    actor_id = uuid.uuid4()
+    audit_log = AuditLog(flush_size=2, flush_interval=60, spill_path=spill_path)
+    audit_log.start()
+
+    # Reaching the flush size writes right away instead of after the interval
+    for _ in range(2):
+        record_audit_event(db, "profile.deleted", actor_id=actor_id)
+    audit_log.submit(db.info.pop("audit_events"))
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if not len(audit_log):
+            break
+    assert len(await _events(db, actor_id)) == 2
+
+    async def unavailable(rows: list[dict[str, Any]]) -> None:
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(audit_log, "_write", unavailable)
+    record_audit_event(db, "profile.deleted", actor_id=actor_id, spilled=True)
+    audit_log.submit(db.info.pop("audit_events"))
+    await audit_log.stop()
+    assert Path(spill_path).exists()
+
+    restarted = AuditLog(flush_interval=60, spill_path=spill_path)
+    restarted.start()
+    await restarted.stop()
+    assert not Path(spill_path).exists()
+    assert (await _events(db, actor_id))[-1] == ("profile.deleted", {"spilled": True})
+
+
+@pytest.mark.asyncio
+async def test_expired_partitions_are_dropped(db: AsyncSession) -> None:
+    """Test that whole months older than the retention are dropped"""
+    audit_log = AuditLog()
+    audit_log.submit(
+        {
+            "id": uuid.uuid4(),
+            "occurred_at": occurred_at,
+            "action": "profile.deleted",
+            "actor_id": None,
+            "organization_id": None,
+            "subject_id": None,
+            "details": {},
+        }
+        for occurred_at in (datetime(2001, 1, 31), datetime.utcnow())
+    )
+    await audit_log.flush()
+
+    dropped = await drop_expired_audit_partitions(retention_months=1)
+
+    assert dropped == ["audit_events_2001_01"]
+    connection = await db.connection()
+    partitions = await connection.run_sync(list_audit_partitions)
+    assert [name for _, name in partitions] == [partition_name(datetime.utcnow())]
@@ -0,0 +1,58 @@
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.database import AsyncSession
+from app.models.profile import Profile
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_creates_profile(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that bootstrap creates the profile on first launch"""
+
+    response = test_client.post(
+        "/bootstrap/", headers={"Authorization": "Bearer petr_token"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["is_new_profile"] is True
+    assert data["profile"]["email"] == "petr@indiepitcher.com"
+
+    # The default organization is returned with the admin role
+    assert data["organizations"]["total"] == 1
+    assert data["organizations"]["page"] == 1
+    assert data["organizations"]["items"][0]["name"] == "Default Organization"
+    assert data["organizations"]["items"][0]["role"] == "admin"
+
+    assert len((await db.exec(select(Profile))).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_bootstrap_existing_profile(test_client: TestClient) -> None:
+    """Test that bootstrap returns an existing profile and its organizations"""
+
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    for i in range(3):
+        test_client.post(
+            "/organizations/",
+            json={"name": f"Organization {i}"},
+            headers={"Authorization": "Bearer petr_token"},
+        )
+
+    response = test_client.post(
+        "/bootstrap/?size=2", headers={"Authorization": "Bearer petr_token"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["is_new_profile"] is False
+    assert data["organizations"]["total"] == 4
+    assert len(data["organizations"]["items"]) == 2
+
+    # Without a token the request is rejected
+    response = test_client.post("/bootstrap/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,114 @@
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.database import AsyncSession
+from app.models.daily_stats import DailyStats
+from app.models.organization import Organization
+from app.models.profile import Profile
+from app.use_cases.daily_stats import rebuild_daily_stats, record_activity
+
+PETR = {"Authorization": "Bearer petr_token"}
+JOHN = {"Authorization": "Bearer john_token"}
+
+
+def _today() -> str:
+    return datetime.now(UTC).date().isoformat()
+
+
+@pytest.mark.asyncio
+async def test_daily_stats_are_rolled_up(
+    test_client: TestClient, db: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that signups, activity and new organizations bump today's counters"""
+    monkeypatch.setenv("ADMIN_EMAILS", "petr@indiepitcher.com")
+    test_client.post("/profiles/", headers=PETR)
+    test_client.post("/profiles/", headers=JOHN)
+    test_client.post("/organizations/", headers=PETR, json={"name": "Org"})
+
+    # John comes back the next day, counted once however often he calls
+    john = (
+        await db.exec(select(Profile).where(Profile.email == "john@indiepitcher.com"))
+    ).one()
+    john.last_seen_at = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=1)
+    await db.commit()
+    for _ in range(3):
+        assert test_client.get("/profiles/", headers=JOHN).status_code == 200
+
+    response = test_client.get(
+        "/admin/stats", params={"start": _today(), "end": _today()}, headers=PETR
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [
+        {
+            "day": _today(),
+            "signups": 2,
+            "active_users": 3,
+            "organizations_created": 3,
+        }
+    ]
+
+    # Days without activity are zeros
+    response = test_client.get("/admin/stats", headers=PETR)
+    assert len(response.json()) == 30
+    assert response.json()[0]["signups"] == 0
+
+
+@pytest.mark.asyncio
+async def test_activity_accepts_aware_timestamps(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that activity is recorded from aware timestamps, as PostgreSQL returns"""
+    test_client.post("/profiles/", headers=PETR)
+    petr = (
+        await db.exec(select(Profile).where(Profile.email == "petr@indiepitcher.com"))
+    ).one()
+    petr.last_seen_at = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=1)
+    await db.commit()
+    prague = timezone(timedelta(hours=2))
+
+    yesterday = datetime.now(prague) - timedelta(days=1)
+    assert await record_activity(petr.id, yesterday) is True
+    assert await record_activity(petr.id, datetime.now(prague)) is False
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_access(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that only configured admins see the stats, within a bounded range"""
+    monkeypatch.setenv("ADMIN_EMAILS", "petr@indiepitcher.com")
+    assert test_client.get("/admin/stats").status_code == 401
+    assert test_client.get("/admin/stats", headers=JOHN).status_code == 404
+
+    response = test_client.get(
+        "/admin/stats", params={"start": "2020-01-01"}, headers=PETR
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_rebuild_daily_stats(test_client: TestClient, db: AsyncSession) -> None:
+    """Test that the backfill recounts the rollups from the base tables"""
+    test_client.post("/profiles/", headers=PETR)
+    organization = (await db.exec(select(Organization))).one()
+    organization.created_at = datetime(2024, 5, 1, 12)
+    db.add(DailyStats(day=datetime(2024, 5, 2).date(), active_users=7, signups=4))
+    await db.commit()
+
+    assert await rebuild_daily_stats(chunk_size=1) == 2
+
+    db.expire_all()
+    stats = {
+        row.day.isoformat(): (row.signups, row.active_users, row.organizations_created)
+        for row in (await db.exec(select(DailyStats))).all()
+    }
+    assert stats == {
+        "2024-05-01": (0, 0, 1),
+        # No base rows left, recorded activity is kept
+        "2024-05-02": (0, 7, 0),
+        _today(): (1, 1, 0),
+    }
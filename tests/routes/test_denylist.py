@@ -0,0 +1,81 @@
+from collections.abc import AsyncGenerator
+from datetime import datetime
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+
+from app.database import AsyncSession
+from app.denylist import Denylist, close_denylist, get_denylist
+from app.models.profile import Profile
+
+
+@pytest_asyncio.fixture
+async def denylist() -> AsyncGenerator[Denylist]:
+    """The app-wide denylist, reset after the test."""
+    yield get_denylist()
+    await close_denylist()
+
+
+async def _ban(db: AsyncSession, email: str) -> None:
+    profile = (await db.exec(select(Profile).where(Profile.email == email))).one()
+    profile.banned_at = datetime.utcnow()
+    db.add(profile)
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_banned_user_rejected_without_db_query(
+    test_client: TestClient, db: AsyncSession, denylist: Denylist
+) -> None:
+    """Test that the middleware rejects a denylisted user before any DB work"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    test_client.post("/profiles/", headers={"Authorization": "Bearer john_token"})
+    await _ban(db, "petr@indiepitcher.com")
+    await denylist.reload()
+
+    statements: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = test_client.get(
+            "/profiles/", headers={"Authorization": "Bearer petr_token"}
+        )
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert statements == []
+
+    # Other users are not affected
+    response = test_client.get(
+        "/profiles/", headers={"Authorization": "Bearer john_token"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_denylist_refresh_picks_up_new_bans(
+    test_client: TestClient, db: AsyncSession, denylist: Denylist
+) -> None:
+    """Test that incremental refreshes add bans made after the initial load"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    test_client.post("/profiles/", headers={"Authorization": "Bearer john_token"})
+    await _ban(db, "petr@indiepitcher.com")
+    await denylist.reload()
+    assert not denylist.is_banned("john@indiepitcher.com")
+
+    await _ban(db, "john@indiepitcher.com")
+    await denylist.refresh()
+
+    assert denylist.is_banned("petr@indiepitcher.com")
+    assert denylist.is_banned("john@indiepitcher.com")
+    assert len(denylist) == 2
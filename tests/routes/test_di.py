@@ -0,0 +1,53 @@
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from starlette.types import Message, Receive, Scope, Send
+
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_connection_released_before_response_is_sent(
+    test_client: TestClient,
+) -> None:
+    """Test that a read-only request returns its connection before responding"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+
+    events: list[str] = []
+
+    def on_checkout(*args: Any) -> None:
+        events.append("checkout")
+
+    def on_checkin(*args: Any) -> None:
+        events.append("checkin")
+
+    async def recording_app(scope: Scope, receive: Receive, send: Send) -> None:
+        async def recording_send(message: Message) -> None:
+            events.append(message["type"])
+            await send(message)
+
+        await app(scope, receive, recording_send)
+
+    event.listen(Pool, "checkout", on_checkout)
+    event.listen(Pool, "checkin", on_checkin)
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=recording_app), base_url="http://test"
+        ) as client:
+            response = await client.get(
+                "/organizations/", headers={"Authorization": "Bearer petr_token"}
+            )
+    finally:
+        event.remove(Pool, "checkout", on_checkout)
+        event.remove(Pool, "checkin", on_checkin)
+
+    assert response.status_code == 200
+    assert "checkout" in events
+    assert events[-1] == "http.response.body"
+    assert events.index("http.response.start") > max(
+        index for index, name in enumerate(events) if name == "checkin"
+    )
@@ -0,0 +1,161 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI, Request, Response, status
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlmodel import select
+
+from app.database import AsyncSession
+from app.idempotency import REPLAYED_HEADER, Idempotency
+from app.jobs.idempotency_key_sweeper import purge_expired_idempotency_keys
+from app.main import app
+from app.models.firebase_auth_user import FirebaseAuthUser
+from app.models.idempotency_key import IdempotencyKey
+from app.models.organization import Organization
+
+
+@pytest.mark.asyncio
+async def test_retried_post_replays_stored_response(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that a retry with the same key gets the first response back"""
+    headers = {"Authorization": "Bearer petr_token", "Idempotency-Key": "signup-1"}
+    first_profile = test_client.post("/profiles/", headers=headers)
+    retried_profile = test_client.post("/profiles/", headers=headers)
+    assert retried_profile.status_code == status.HTTP_200_OK
+    assert retried_profile.json() == first_profile.json()
+    assert retried_profile.headers[REPLAYED_HEADER] == "true"
+
+    headers["Idempotency-Key"] = "create-org-1"
+    first = test_client.post("/organizations/", headers=headers, json={"name": "Org"})
+    retried = test_client.post("/organizations/", headers=headers, json={"name": "Org"})
+    assert retried.status_code == status.HTTP_200_OK
+    assert retried.json() == first.json()
+
+    organizations = (
+        await db.exec(select(Organization).where(Organization.name == "Org"))
+    ).all()
+    assert len(organizations) == 1
+
+    # The same key can't be reused for a different payload
+    reused = test_client.post("/organizations/", headers=headers, json={"name": "New"})
+    assert reused.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    # Keys are scoped per user
+    headers = {"Authorization": "Bearer john_token", "Idempotency-Key": "signup-1"}
+    response = test_client.post("/profiles/", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert REPLAYED_HEADER not in response.headers
+    assert response.json()["email"] == "john@indiepitcher.com"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_first_request(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that concurrent duplicates run the handler once"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+
+    headers = {"Authorization": "Bearer petr_token", "Idempotency-Key": "create-org"}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        responses = await asyncio.gather(
+            *(
+                client.post("/organizations/", headers=headers, json={"name": "Org"})
+                for _ in range(5)
+            )
+        )
+
+    assert {response.status_code for response in responses} == {status.HTTP_200_OK}
+    assert len({response.json()["id"] for response in responses}) == 1
+    organizations = (
+        await db.exec(select(Organization).where(Organization.name == "Org"))
+    ).all()
+    assert len(organizations) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_keeps_its_claim(db: AsyncSession) -> None:
+    """Test that a handler slower than the wait and the lease runs once"""
+    calls = 0
+    release = asyncio.Event()
+
+    def worker() -> FastAPI:
+        # Each worker has its own Idempotency, like separate processes do
+        worker_app = FastAPI()
+        idempotency = Idempotency(wait_timeout=0.1, lease=0.3, poll_interval=0.01)
+
+        @worker_app.post("/organizations/")
+        async def create_organization() -> dict[str, int]:
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"calls": calls}
+
+        worker_app.middleware("http")(idempotency.middleware)
+
+        @worker_app.middleware("http")
+        async def authenticate(
+            request: Request, call_next: Callable[[Request], Awaitable[Response]]
+        ) -> Response:
+            request.state.firebase_user = FirebaseAuthUser(
+                email="petr@indiepitcher.com", user_id="1234567890"
+            )
+            return await call_next(request)
+
+        return worker_app
+
+    headers = {"Idempotency-Key": "slow-org"}
+    first_worker, second_worker = (
+        AsyncClient(transport=ASGITransport(app=worker()), base_url="http://test")
+        for _ in range(2)
+    )
+    async with first_worker, second_worker:
+        first = asyncio.create_task(
+            first_worker.post("/organizations/", headers=headers)
+        )
+        while not calls:
+            await asyncio.sleep(0.01)
+
+        # Retries keep getting a 409, also once the first lease would have run out
+        for client in (first_worker, second_worker, second_worker):
+            # A second run of the handler would block until the release
+            retried = await asyncio.wait_for(
+                client.post("/organizations/", headers=headers), 5
+            )
+            assert retried.status_code == status.HTTP_409_CONFLICT
+            await asyncio.sleep(0.2)
+
+        release.set()
+        assert (await first).json() == {"calls": 1}
+        replayed = await second_worker.post("/organizations/", headers=headers)
+        assert replayed.json() == {"calls": 1}
+        assert replayed.headers[REPLAYED_HEADER] == "true"
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_keys_are_purged(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that the sweeper deletes only expired keys"""
+    headers = {"Authorization": "Bearer petr_token", "Idempotency-Key": "signup"}
+    test_client.post("/profiles/", headers=headers)
+    db.add(
+        IdempotencyKey(
+            user_id="1234567890",
+            key="old",
+            request_hash="",
+            status_code=200,
+            expires_at=datetime.utcnow() - timedelta(minutes=1),
+        )
+    )
+    await db.commit()
+
+    assert await purge_expired_idempotency_keys() == 1
+    keys = (await db.exec(select(IdempotencyKey.key))).all()
+    assert keys == ["signup"]
@@ -0,0 +1,73 @@
+import uuid
+from pathlib import Path
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+from sqlmodel import col
+
+from app.database import AsyncSession
+from app.invalidation import (
+    InvalidationBus,
+    SQLiteInvalidationTransport,
+    close_invalidation_bus,
+    create_invalidation_bus,
+    organization_key,
+    profile_key,
+)
+from app.models.organization_membership import OrganizationMembership
+from app.models.profile import Profile
+
+PETR = {"Authorization": "Bearer petr_token"}
+
+
+@pytest.mark.asyncio
+async def test_write_on_another_worker_evicts_cached_rows(
+    test_client: TestClient,
+    db: AsyncSession,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that an event published by another worker drops this worker's cache"""
+    path = str(tmp_path / "invalidation.db")
+    monkeypatch.setenv("INVALIDATION_TRANSPORT", "sqlite")
+    monkeypatch.setenv("INVALIDATION_SQLITE_PATH", path)
+    await close_invalidation_bus()
+    bus = create_invalidation_bus()
+    await bus.poll_once()  # skip the existing backlog
+    other_worker = InvalidationBus(SQLiteInvalidationTransport(path))
+
+    test_client.post("/profiles/", headers=PETR)
+    organization_id = test_client.post(
+        "/organizations/", headers=PETR, json={"name": "Org"}
+    ).json()["id"]
+    assert test_client.get(f"/organizations/{organization_id}", headers=PETR).is_success
+
+    # Changed behind this worker's back, its cached membership is still used
+    await db.execute(
+        delete(OrganizationMembership).where(
+            col(OrganizationMembership.organization_id) == uuid.UUID(organization_id)
+        )
+    )
+    await db.commit()
+    assert test_client.get(f"/organizations/{organization_id}", headers=PETR).is_success
+
+    await other_worker.publish(organization_key(uuid.UUID(organization_id)))
+    assert await bus.poll_once() == 1
+    response = test_client.get(f"/organizations/{organization_id}", headers=PETR)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    # The same for the cached profile
+    await db.execute(
+        delete(Profile).where(col(Profile.email) == "petr@indiepitcher.com")
+    )
+    await db.commit()
+    assert test_client.get("/profiles/", headers=PETR).is_success
+
+    await other_worker.publish(profile_key("petr@indiepitcher.com"))
+    assert await bus.poll_once() == 1
+    response = test_client.get("/profiles/", headers=PETR)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    await other_worker.stop()
@@ -1,3 +1,4 @@
+import json
 import uuid
 
 import pytest
@@ -5,9 +6,15 @@ from fastapi import status
 from fastapi.testclient import TestClient
 from sqlmodel import select
 
+from app import organization_search
+from app.broadcaster import get_broadcaster
 from app.database import AsyncSession
+from app.jobs.organization_counter_repair import repair_organization_counters
+from app.jobs.organization_reaper import purge_deleted_organizations
 from app.models.organization import Organization
 from app.models.organization_membership import OrganizationMembership, OrganizationRole
+from app.models.profile import Profile
+from app.use_cases.organization_memberships import add_membership
 
 
 @pytest.mark.asyncio
@@ -241,3 +248,207 @@ async def test_get_paginated_organizations(
     # Ensure they can't see other user's organizations
     for name in [f"Organization {i}" for i in range(1, 6)]:
         assert name not in org_names
+
+
+@pytest.mark.asyncio
+async def test_delete_organization(test_client: TestClient, db: AsyncSession) -> None:
+    """Test that deleting an organization hides it and the reaper purges it"""
+
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    create_response = test_client.post(
+        "/organizations/",
+        json={"name": "Doomed Organization"},
+        headers={"Authorization": "Bearer petr_token"},
+    )
+    organization_id = create_response.json()["id"]
+
+    delete_response = test_client.delete(
+        f"/organizations/{organization_id}",
+        headers={"Authorization": "Bearer petr_token"},
+    )
+    assert delete_response.status_code == status.HTTP_204_NO_CONTENT
+
+    # The organization is gone from every endpoint
+    get_response = test_client.get(
+        f"/organizations/{organization_id}",
+        headers={"Authorization": "Bearer petr_token"},
+    )
+    assert get_response.status_code == status.HTTP_404_NOT_FOUND
+    list_response = test_client.get(
+        "/organizations/", headers={"Authorization": "Bearer petr_token"}
+    )
+    assert list_response.json()["total"] == 1
+    second_delete_response = test_client.delete(
+        f"/organizations/{organization_id}",
+        headers={"Authorization": "Bearer petr_token"},
+    )
+    assert second_delete_response.status_code == status.HTTP_404_NOT_FOUND
+
+    # The rows are only soft deleted until the reaper runs
+    org = await db.get(Organization, uuid.UUID(organization_id))
+    assert org is not None
+    assert org.deleted_at is not None
+
+    assert await purge_deleted_organizations(batch_size=1) == 2
+
+    db.expunge_all()
+    assert await db.get(Organization, uuid.UUID(organization_id)) is None
+    memberships = await db.exec(
+        select(OrganizationMembership).where(
+            OrganizationMembership.organization_id == uuid.UUID(organization_id)
+        )
+    )
+    assert memberships.first() is None
+    assert len((await db.exec(select(Organization))).all()) == 1
+
+
+@pytest.mark.asyncio
+async def test_get_organizations_batch(test_client: TestClient) -> None:
+    """Test that a batch lookup returns member orgs and hides the rest"""
+    petr = {"Authorization": "Bearer petr_token"}
+    john = {"Authorization": "Bearer john_token"}
+    test_client.post("/profiles/", headers=petr)
+    test_client.post("/profiles/", headers=john)
+
+    own = test_client.post("/organizations/", headers=petr, json={"name": "Own"})
+    foreign = test_client.post("/organizations/", headers=john, json={"name": "John"})
+    own_id = own.json()["id"]
+    foreign_id = foreign.json()["id"]
+    unknown_id = str(uuid.uuid4())
+
+    response = test_client.get(
+        "/organizations/batch",
+        headers=petr,
+        params={"ids": [unknown_id, own_id, foreign_id, own_id]},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "organizations": [
+            {"id": own_id, "name": "Own", "member_count": 1, "role": "admin"}
+        ],
+        "missing": [unknown_id, foreign_id],
+    }
+
+    too_many = test_client.get(
+        "/organizations/batch",
+        headers=petr,
+        params={"ids": [str(uuid.uuid4()) for _ in range(101)]},
+    )
+    assert too_many.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_organization_counters(test_client: TestClient, db: AsyncSession) -> None:
+    """Test that member and admin counters follow memberships and can be repaired"""
+    petr = {"Authorization": "Bearer petr_token"}
+    john = {"Authorization": "Bearer john_token"}
+    test_client.post("/profiles/", headers=petr)
+    test_client.post("/profiles/", headers=john)
+    created = test_client.post("/organizations/", headers=petr, json={"name": "Org"})
+    assert created.json()["member_count"] == 1
+    organization_id = uuid.UUID(created.json()["id"])
+
+    john_profile = (
+        await db.exec(select(Profile).where(Profile.email == "john@indiepitcher.com"))
+    ).one()
+    await add_membership(db, john_profile.id, organization_id, OrganizationRole.ADMIN)
+    await db.commit()
+
+    response = test_client.get(f"/organizations/{organization_id}", headers=petr)
+    assert response.json()["member_count"] == 2
+    organization = await db.get(Organization, organization_id)
+    assert organization is not None
+    await db.refresh(organization)
+    assert (organization.member_count, organization.admin_count) == (2, 2)
+
+    # Petr isn't the only admin any more, so the organization survives
+    assert test_client.delete("/profiles/", headers=petr).status_code == 204
+    await db.refresh(organization)
+    assert (organization.member_count, organization.admin_count) == (1, 1)
+
+    organization.member_count = 10
+    organization.admin_count = 0
+    await db.commit()
+    assert await repair_organization_counters(batch_size=1) == 1
+    await db.refresh(organization)
+    assert (organization.member_count, organization.admin_count) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_organization_events(test_client: TestClient, db: AsyncSession) -> None:
+    """Test that members get change events once the change is committed"""
+    headers = {"Authorization": "Bearer petr_token"}
+    test_client.post("/profiles/", headers=headers)
+    profile = (await db.exec(select(Profile))).one()
+    broadcaster = get_broadcaster()
+    subscription = broadcaster.subscribe(profile.id)
+    try:
+        events = subscription.messages(keepalive_interval=1)
+
+        created = test_client.post(
+            "/organizations/", json={"name": "Org"}, headers=headers
+        ).json()
+        assert await anext(events) == (
+            f"event: organization.created\ndata: {json.dumps(created)}\n\n"
+        )
+
+        updated = test_client.patch(
+            f"/organizations/{created['id']}", json={"name": "Renamed"}, headers=headers
+        ).json()
+        assert await anext(events) == (
+            f"event: organization.updated\ndata: {json.dumps(updated)}\n\n"
+        )
+
+        test_client.delete(f"/organizations/{created['id']}", headers=headers)
+        assert await anext(events) == (
+            "event: organization.deleted\n"
+            f"data: {json.dumps({'id': created['id']})}\n\n"
+        )
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("membership_scan_limit", [0, 500])
+async def test_search_organizations(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch, membership_scan_limit: int
+) -> None:
+    """Test name search through the index and through the caller's memberships"""
+    monkeypatch.setattr(
+        organization_search, "MEMBERSHIP_SCAN_LIMIT", membership_scan_limit
+    )
+    petr = {"Authorization": "Bearer petr_token"}
+    john = {"Authorization": "Bearer john_token"}
+    test_client.post("/profiles/", headers=petr)
+    test_client.post("/profiles/", headers=john)
+    ids = {}
+    for name in ("Corporate Acme", "Acme Corp", "Other", "100% Real"):
+        response = test_client.post(
+            "/organizations/", headers=petr, json={"name": name}
+        )
+        ids[name] = response.json()["id"]
+    test_client.post("/organizations/", headers=john, json={"name": "Acme of John"})
+
+    def search(q: str) -> list[str]:
+        response = test_client.get(
+            "/organizations/search", params={"q": q}, headers=petr
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return [organization["name"] for organization in response.json()["items"]]
+
+    # Prefix matches first, other users' organizations aren't found
+    assert search("ACME") == ["Acme Corp", "Corporate Acme"]
+    assert search("corp") == ["Corporate Acme", "Acme Corp"]
+    assert search("me") == ["Acme Corp", "Corporate Acme"]
+    assert search('0% "') == []
+    assert search("0%") == ["100% Real"]
+
+    # The index follows renames and deletes
+    test_client.patch(
+        f"/organizations/{ids['Other']}", headers=petr, json={"name": "Acmeish"}
+    )
+    test_client.delete(f"/organizations/{ids['Acme Corp']}", headers=petr)
+    assert search("acme") == ["Acmeish", "Corporate Acme"]
+
+    assert test_client.get("/organizations/search", headers=petr).status_code == 422
@@ -9,7 +9,9 @@ from sqlmodel import select
 from app.database import AsyncSession
 from app.models.organization import Organization
 from app.models.profile import Profile
+from app.models.signup_attribution import AttributionValue
 from app.service.analytics_service import MockAnalyticsService
+from app.use_cases.signup_attribution import load_signup_attribution
 
 
 @pytest_asyncio.fixture
@@ -110,3 +112,33 @@ async def test_create_profile_with_invalid_token(
 
     # Verify still no profiles in database
     assert len((await db.exec(select(Profile))).all()) == 0
+
+
+@pytest.mark.asyncio
+async def test_signup_attribution_is_interned(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that allowlisted headers are stored once and shared between profiles"""
+
+    headers = {"User-Agent": "IndiePitcher/1.0 (iPhone)", "X-Custom": "dropped"}
+    for token in ["petr_token", "john_token"]:
+        response = test_client.post(
+            "/profiles/", headers={"Authorization": f"Bearer {token}", **headers}
+        )
+        assert response.status_code == 200
+
+    profiles = (await db.exec(select(Profile))).all()
+    for profile in profiles:
+        attribution = await load_signup_attribution(db, profile.id)
+        assert attribution["user-agent"] == "IndiePitcher/1.0 (iPhone)"
+        assert "x-custom" not in attribution
+        assert "authorization" not in attribution
+
+    values = (
+        await db.exec(
+            select(AttributionValue).where(
+                AttributionValue.value == "IndiePitcher/1.0 (iPhone)"
+            )
+        )
+    ).all()
+    assert len(values) == 1
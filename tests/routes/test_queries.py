@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.queries import get_statement_cache_stats
+
+
+def test_hot_statements_are_served_from_compiled_cache(
+    test_client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that repeated requests reuse the compiled hot statements"""
+    headers = {"Authorization": "Bearer petr_token"}
+    test_client.post("/profiles/", headers=headers)
+    organization = test_client.post(
+        "/organizations/", headers=headers, json={"name": "Test Organization"}
+    ).json()
+    test_client.get(f"/organizations/{organization['id']}", headers=headers)
+
+    stats = get_statement_cache_stats()
+    hits, misses = stats.hits, stats.misses
+    for _ in range(5):
+        response = test_client.get(
+            f"/organizations/{organization['id']}", headers=headers
+        )
+        assert response.status_code == 200
+
+    assert stats.hits > hits
+    assert stats.misses == misses
+    assert 0 < stats.hit_ratio <= 1
+
+    # Admins can read the counters, they aren't only logged on shutdown
+    monkeypatch.setenv("ADMIN_EMAILS", "petr@indiepitcher.com")
+    response = test_client.get("/admin/statement-cache", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["hits"] >= stats.hits
+    assert response.json()["misses"] == stats.misses
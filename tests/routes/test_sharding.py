@@ -0,0 +1,202 @@
+import uuid
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlmodel import col, select
+
+from app.database import (
+    AsyncSession,
+    clear_db,
+    close_shards,
+    configure_shards,
+    in_memory_url,
+    init_shards,
+    shard_count,
+    shard_for,
+    shard_session,
+    shard_urls,
+)
+from app.jobs.organization_reaper import purge_deleted_organizations
+from app.models.membership_directory import MembershipDirectoryEntry
+from app.models.organization import Organization
+from app.models.organization_membership import OrganizationMembership
+
+SHARDS = 3
+
+
+@pytest_asyncio.fixture(params=["memory", "files"])
+async def sharded(
+    request: pytest.FixtureRequest, tmp_path: Path
+) -> AsyncGenerator[None]:
+    """Organizations spread over three databases, in memory or SQLite files."""
+    if request.param == "memory":
+        database_url = in_memory_url("test")
+    else:
+        database_url = f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    configure_shards(shard_urls(database_url, SHARDS))
+    await init_shards()
+    yield
+    # In-memory shards outlive their engines
+    await clear_db()
+    await close_shards()
+    configure_shards(None)
+
+
+async def _organization_ids(shard: int) -> set[uuid.UUID]:
+    async with shard_session(shard) as session:
+        return set((await session.exec(select(Organization.id))).all())
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sharded")
+async def test_organizations_are_routed_to_shards(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that organizations and memberships live in the shard of their ID"""
+    petr = {"Authorization": "Bearer petr_token"}
+    john = {"Authorization": "Bearer john_token"}
+    test_client.post("/profiles/", headers=petr)
+    test_client.post("/profiles/", headers=john)
+    created = [
+        test_client.post(
+            "/organizations/", headers=petr, json={"name": f"Organization {i}"}
+        ).json()
+        for i in range(12)
+    ]
+    ids = [uuid.UUID(organization["id"]) for organization in created]
+
+    assert shard_count() == SHARDS
+    # 12 random IDs landing in the same shard are rare enough to ignore
+    assert len({shard_for(id) for id in ids}) > 1
+    for shard in range(SHARDS):
+        stored = await _organization_ids(shard)
+        assert {id for id in ids if shard_for(id) == shard} <= stored
+        assert all(shard_for(id) == shard for id in stored)
+        async with shard_session(shard) as session:
+            memberships = await session.exec(select(OrganizationMembership))
+            assert all(
+                shard_for(membership.organization_id) == shard
+                for membership in memberships.all()
+            )
+
+    # The directory lists every membership of the profile with its shard
+    directory = await db.exec(
+        select(MembershipDirectoryEntry).where(
+            col(MembershipDirectoryEntry.organization_id).in_(ids)
+        )
+    )
+    assert {(entry.organization_id, entry.shard) for entry in directory.all()} == {
+        (id, shard_for(id)) for id in ids
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sharded")
+async def test_sharded_organization_endpoints(
+    test_client: TestClient, db: AsyncSession
+) -> None:
+    """Test that every organization endpoint works across shards"""
+    petr = {"Authorization": "Bearer petr_token"}
+    john = {"Authorization": "Bearer john_token"}
+    test_client.post("/profiles/", headers=petr)
+    test_client.post("/profiles/", headers=john)
+    names = [f"Organization {i:02d}" for i in range(10)]
+    ids = [
+        test_client.post("/organizations/", headers=petr, json={"name": name}).json()[
+            "id"
+        ]
+        for name in names
+    ]
+    test_client.post("/organizations/", headers=john, json={"name": "Organization X"})
+
+    # Pages are merged from all shards in creation order
+    expected = ["Default Organization", *names]
+    pages = [
+        test_client.get(
+            "/organizations/", headers=petr, params={"page": page, "size": 4}
+        ).json()
+        for page in (1, 2, 3)
+    ]
+    assert [page["total"] for page in pages] == [11, 11, 11]
+    assert [item["name"] for page in pages for item in page["items"]] == expected
+    bootstrap = test_client.post("/bootstrap/", headers=petr, params={"size": 3})
+    assert [item["name"] for item in bootstrap.json()["organizations"]["items"]] == (
+        expected[:3]
+    )
+
+    response = test_client.get(f"/organizations/{ids[3]}", headers=petr)
+    assert response.json()["name"] == names[3]
+    assert (
+        test_client.get(f"/organizations/{ids[3]}", headers=john).status_code
+        == status.HTTP_404_NOT_FOUND
+    )
+
+    response = test_client.get(
+        "/organizations/batch",
+        headers=petr,
+        params={"ids": [*ids[:5], str(uuid.uuid4())]},
+    )
+    assert [item["id"] for item in response.json()["organizations"]] == ids[:5]
+    assert len(response.json()["missing"]) == 1
+
+    search = test_client.get(
+        "/organizations/search", headers=petr, params={"q": "zation 0", "size": 20}
+    )
+    assert [item["name"] for item in search.json()["items"]] == names
+
+    test_client.patch(
+        f"/organizations/{ids[0]}", headers=petr, json={"name": "Renamed"}
+    )
+    test_client.delete(f"/organizations/{ids[1]}", headers=petr)
+    names = [
+        item["name"]
+        for item in test_client.get("/organizations/", headers=petr).json()["items"]
+    ]
+    assert names[:3] == ["Default Organization", "Renamed", "Organization 02"]
+
+    # Purging the deleted organization cleans up its shard and the directory
+    assert await purge_deleted_organizations() == 2
+    entries = await db.exec(
+        select(MembershipDirectoryEntry).where(
+            MembershipDirectoryEntry.organization_id == uuid.UUID(ids[1])
+        )
+    )
+    assert entries.all() == []
+
+    # Deleting the profile deletes the organizations it was the only admin of
+    assert test_client.delete("/profiles/", headers=petr).status_code == 204
+    remaining = set()
+    for shard in range(SHARDS):
+        remaining |= await _organization_ids(shard)
+    assert len(remaining) == 2  # John's
+    entries = await db.exec(select(MembershipDirectoryEntry))
+    assert len(entries.all()) == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("sharded")
+async def test_sharded_search_merges_in_database_order(
+    test_client: TestClient,
+) -> None:
+    """Test that search merges shards the way each shard sorted its results"""
+    petr = {"Authorization": "Bearer petr_token"}
+    test_client.post("/profiles/", headers=petr)
+    # SQLite ignores the case of ASCII letters only, "Éclair" doesn't start
+    # with "éc" for it, but still contains it
+    prefixed = [f"éclat {i}" for i in range(4)]
+    contained = [f"Éclair éclair {i}" for i in range(4)] + [
+        f"Zeta éclair {i}" for i in range(4)
+    ]
+    for name in prefixed + contained:
+        test_client.post("/organizations/", headers=petr, json={"name": name})
+
+    search = test_client.get(
+        "/organizations/search", headers=petr, params={"q": "éc", "size": 20}
+    )
+    assert [item["name"] for item in search.json()["items"]] == (
+        sorted(prefixed) + sorted(contained)
+    )
@@ -0,0 +1,70 @@
+import asyncio
+import signal
+from types import FrameType
+from typing import Any
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.broadcaster import get_broadcaster
+from app.drain import create_drain
+from app.main import app
+from app.routes import profiles
+
+PETR = {"Authorization": "Bearer petr_token"}
+
+
+@pytest.mark.asyncio
+async def test_shutdown_signal_drains_before_the_server_stops(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that a SIGTERM drains requests before the server gets to stop"""
+    monkeypatch.setenv("INDIE_PITCHER_API_KEY", "unused")
+    email_started, release = asyncio.Event(), asyncio.Event()
+
+    async def send_welcome_email(*args: Any) -> None:
+        email_started.set()
+        await release.wait()
+
+    monkeypatch.setattr(profiles, "sendWelcomeEmail", send_welcome_email)
+
+    # Installed by uvicorn before the lifespan starts, stops the server
+    server_stopping = asyncio.Event()
+
+    def stop_server(signum: int, frame: FrameType | None) -> None:
+        server_stopping.set()
+
+    previous = signal.signal(signal.SIGTERM, stop_server)
+    transport = ASGITransport(app=app)
+    try:
+        async with (
+            app.router.lifespan_context(app),
+            AsyncClient(transport=transport, base_url="http://test") as client,
+        ):
+            signup = asyncio.create_task(client.post("/profiles/", headers=PETR))
+            await asyncio.wait_for(email_started.wait(), 5)
+            events = asyncio.create_task(
+                client.get("/organizations/events", headers=PETR)
+            )
+            while not len(get_broadcaster()):
+                await asyncio.sleep(0.01)
+
+            signal.raise_signal(signal.SIGTERM)
+            # Still listening, new requests are told to go elsewhere
+            rejected = await client.get("/")
+            assert rejected.status_code == 503
+            assert rejected.headers["connection"] == "close"
+            await asyncio.sleep(0.05)
+            assert not server_stopping.is_set()
+
+            release.set()
+            assert (await signup).status_code == 200
+            # The event stream is ended rather than waited for
+            assert (await asyncio.wait_for(events, 5)).status_code == 200
+            await asyncio.wait_for(server_stopping.wait(), 5)
+        # The server's handler is back once the app shut down
+        assert signal.getsignal(signal.SIGTERM) is stop_server
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        # Replaces the drain, it would turn the next tests' requests away
+        create_drain()
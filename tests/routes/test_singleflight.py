@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+from collections.abc import AsyncGenerator, Iterator
+from typing import Any
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.database import AsyncSession, async_session
+from app.routes.di import find_profile_by_email
+from app.routes.organizations import find_membership
+from app.singleflight import SingleFlight
+
+CALLERS = 10
+
+
+@pytest.fixture
+def statements() -> Iterator[list[str]]:
+    """Collect every SQL statement sent to the database."""
+    executed: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        executed.append(args[2])
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest_asyncio.fixture
+async def sessions() -> AsyncGenerator[list[AsyncSession]]:
+    """One session per concurrent caller, like separate requests would have."""
+    opened = [async_session() for _ in range(CALLERS)]
+    yield opened
+    for session in opened:
+        await session.close()
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_calls() -> None:
+    """Test that concurrent callers share one call and errors reach all of them"""
+    calls = 0
+    single_flight: SingleFlight[str, int] = SingleFlight()
+
+    async def fn() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(single_flight.do("key", fn) for _ in range(5)))
+    assert results == [42] * 5
+    assert calls == 1
+    assert len(single_flight) == 0
+
+    async def failing() -> int:
+        raise ValueError("boom")
+
+    failures: list[int | BaseException] = await asyncio.gather(
+        *(single_flight.do("key", failing) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(failure, ValueError) for failure in failures)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_profile_lookups_share_query(
+    test_client: TestClient,
+    statements: list[str],
+    sessions: list[AsyncSession],
+) -> None:
+    """Test that N concurrent profile lookups run a single DB query"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    statements.clear()
+
+    profiles = await asyncio.gather(
+        *(
+            find_profile_by_email(session, "petr@indiepitcher.com")
+            for session in sessions
+        )
+    )
+
+    assert len([s for s in statements if "FROM profiles" in s]) == 1
+    assert profiles[0] is not None
+    assert {profile.id for profile in profiles if profile} == {profiles[0].id}
+    # Every caller gets an instance attached to its own session
+    for session, profile in zip(sessions, profiles):
+        assert profile in session
+
+
+@pytest.mark.asyncio
+async def test_concurrent_membership_lookups_share_query(
+    test_client: TestClient,
+    statements: list[str],
+    sessions: list[AsyncSession],
+) -> None:
+    """Test that N concurrent membership lookups run a single DB query"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+    organization_id = test_client.post(
+        "/organizations/",
+        json={"name": "Coalesced Organization"},
+        headers={"Authorization": "Bearer petr_token"},
+    ).json()["id"]
+    profile = await find_profile_by_email(sessions[0], "petr@indiepitcher.com")
+    assert profile is not None
+    statements.clear()
+
+    memberships = await asyncio.gather(
+        *(
+            find_membership(session, profile.id, uuid.UUID(organization_id))
+            for session in sessions
+        )
+    )
+
+    assert len([s for s in statements if "FROM organization_memberships" in s]) == 1
+    assert all(membership is not None for membership in memberships)
+    # Like profiles, every caller gets an instance attached to its own session
+    for session, membership in zip(sessions, memberships):
+        assert membership in session
+
+
+@pytest.mark.asyncio
+async def test_lookup_outlives_the_first_caller(
+    test_client: TestClient, sessions: list[AsyncSession]
+) -> None:
+    """Test that the shared lookup doesn't use the session of the caller who started it"""
+    test_client.post("/profiles/", headers={"Authorization": "Bearer petr_token"})
+
+    first = asyncio.create_task(
+        find_profile_by_email(sessions[0], "petr@indiepitcher.com")
+    )
+    await asyncio.sleep(0)
+    others = asyncio.gather(
+        *(
+            find_profile_by_email(session, "petr@indiepitcher.com")
+            for session in sessions[1:]
+        )
+    )
+    # Like a request that is cancelled while the lookup runs
+    first.cancel()
+
+    profiles = await others
+    assert all(profile is not None for profile in profiles)
+    for session, profile in zip(sessions[1:], profiles):
+        assert profile in session
+    # None of the callers' sessions hold a connection, closing them can't fail
+    # the lookup
+    assert async_session.kw["bind"].pool.checkedout() == 0
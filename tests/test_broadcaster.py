@@ -0,0 +1,54 @@
+import json
+import uuid
+
+import pytest
+
+from app.broadcaster import Broadcaster
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_to_every_connection_of_a_profile() -> None:
+    """Test that each connection of a recipient gets the event, others don't"""
+    broadcaster = Broadcaster()
+    profile_id = uuid.uuid4()
+    first = broadcaster.subscribe(profile_id)
+    second = broadcaster.subscribe(profile_id)
+    other = broadcaster.subscribe(uuid.uuid4())
+
+    broadcaster.publish([profile_id], "organization.updated", {"name": "Acme"})
+
+    for subscription in (first, second):
+        message = await anext(subscription.messages(keepalive_interval=1))
+        event, data = message.strip().split("\n")
+        assert event == "event: organization.updated"
+        assert json.loads(data.removeprefix("data: ")) == {"name": "Acme"}
+    assert await anext(other.messages(keepalive_interval=0.01)) == ": keepalive\n\n"
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_evicted() -> None:
+    """Test that a full queue ends the stream instead of growing"""
+    broadcaster = Broadcaster(max_queued=2)
+    profile_id = uuid.uuid4()
+    subscription = broadcaster.subscribe(profile_id)
+
+    for index in range(3):
+        broadcaster.publish([profile_id], "organization.updated", {"index": index})
+
+    assert subscription.evicted
+    assert not broadcaster.has_subscribers()
+    # The backlog is dropped, the client refetches after reconnecting
+    assert [message async for message in subscription.messages(1)] == []
+
+
+@pytest.mark.asyncio
+async def test_close_ends_every_stream() -> None:
+    """Test that closing the broadcaster ends the open streams"""
+    broadcaster = Broadcaster()
+    subscriptions = [broadcaster.subscribe(uuid.uuid4()) for _ in range(3)]
+
+    broadcaster.close()
+
+    assert len(broadcaster) == 0
+    for subscription in subscriptions:
+        assert [message async for message in subscription.messages(1)] == []
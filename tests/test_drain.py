@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.drain import Drain, DrainMiddleware
+
+
+def _app(drain: Drain, email_sent: asyncio.Event, release: asyncio.Event) -> Starlette:
+    async def send_email() -> None:
+        await release.wait()
+        email_sent.set()
+
+    async def signup(request: Request) -> PlainTextResponse:
+        return PlainTextResponse("ok", background=BackgroundTask(send_email))
+
+    app = Starlette(routes=[Route("/signup", signup, methods=["POST"])])
+    app.add_middleware(DrainMiddleware, drain=drain)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_background_tasks() -> None:
+    """Test that a request counts until its background task finished"""
+    drain = Drain(timeout=5)
+    email_sent, release = asyncio.Event(), asyncio.Event()
+    transport = httpx.ASGITransport(app=_app(drain, email_sent, release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        signup = asyncio.create_task(client.post("/signup"))
+        while len(drain) == 0:
+            await asyncio.sleep(0.01)
+
+        draining = asyncio.create_task(drain.drain())
+        await asyncio.sleep(0.01)
+        assert not draining.done()
+        # New requests are turned away meanwhile
+        rejected = await client.post("/signup")
+        assert rejected.status_code == 503
+        assert rejected.headers["connection"] == "close"
+
+        release.set()
+        report = await draining
+        assert email_sent.is_set()
+        assert report.pending == []
+        assert (await signup).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_drain_reports_what_is_left_at_the_deadline() -> None:
+    """Test that requests still running at the deadline are reported"""
+    drain = Drain(timeout=0.05)
+    email_sent, release = asyncio.Event(), asyncio.Event()
+    transport = httpx.ASGITransport(app=_app(drain, email_sent, release))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        signup = asyncio.create_task(client.post("/signup"))
+        while len(drain) == 0:
+            await asyncio.sleep(0.01)
+
+        report = await drain.drain()
+
+        assert report.pending == ["POST /signup"]
+        assert report.waited >= 0.05
+        release.set()
+        await signup
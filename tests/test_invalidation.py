@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from multiprocessing.synchronize import Event
+from pathlib import Path
+
+import pytest
+
+from app.invalidation import (
+    InvalidatingCache,
+    InvalidationBus,
+    LocalInvalidationTransport,
+    SQLiteInvalidationTransport,
+    membership_key,
+    organization_key,
+)
+
+
+def _worker(
+    path: str, key: str, ready: Event, results: "multiprocessing.Queue[float]"
+) -> None:
+    """Simulates a uvicorn worker holding a cached entry for `key`."""
+
+    async def run() -> None:
+        bus = InvalidationBus(SQLiteInvalidationTransport(path), poll_interval=0.01)
+        cache: InvalidatingCache[str] = InvalidatingCache(bus)
+        cache.set(key, "cached")
+        await bus.poll_once()  # skip the existing backlog
+        bus.start()
+        ready.set()
+        while cache.get(key) is not None:
+            await asyncio.sleep(0.001)
+        results.put(time.time())
+        await bus.stop()
+
+    asyncio.run(run())
+
+
+@pytest.mark.asyncio
+async def test_cache_invalidation_by_prefix() -> None:
+    """Test that invalidating an organization drops its nested memberships"""
+    bus = InvalidationBus(LocalInvalidationTransport())
+    cache: InvalidatingCache[bool] = InvalidatingCache(bus)
+
+    org_id = uuid.uuid4()
+    other_org_id = uuid.uuid4()
+    cache.set(organization_key(org_id), True)
+    cache.set(membership_key(org_id, uuid.uuid4()), True)
+    cache.set(membership_key(other_org_id, uuid.uuid4()), True)
+
+    await bus.publish(organization_key(org_id))
+
+    assert cache.get(organization_key(org_id)) is None
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_transport_skips_own_events(tmp_path: Path) -> None:
+    """Test that a worker does not receive its own events twice"""
+    path = str(tmp_path / "invalidation.db")
+    publisher = InvalidationBus(SQLiteInvalidationTransport(path))
+    subscriber = InvalidationBus(SQLiteInvalidationTransport(path))
+    await publisher.poll_once()
+    await subscriber.poll_once()
+
+    await publisher.publish("profile:petr@indiepitcher.com")
+
+    assert await publisher.poll_once() == 0
+    assert await subscriber.poll_once() == 1
+    assert await subscriber.poll_once() == 0
+
+    await publisher.stop()
+    await subscriber.stop()
+
+
+@pytest.mark.asyncio
+async def test_workers_converge(tmp_path: Path) -> None:
+    """Test that every worker process drops its cached entry after a publish"""
+    path = str(tmp_path / "invalidation.db")
+    key = organization_key(uuid.uuid4())
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = []
+    for _ in range(3):
+        ready = context.Event()
+        process = context.Process(target=_worker, args=(path, key, ready, results))
+        process.start()
+        workers.append((process, ready))
+    for _, ready in workers:
+        assert ready.wait(timeout=30)
+
+    bus = InvalidationBus(SQLiteInvalidationTransport(path))
+    published_at = time.time()
+    await bus.publish(key)
+
+    convergence = max(results.get(timeout=10) for _ in workers) - published_at
+    for process, _ in workers:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+    await bus.stop()
+
+    assert convergence < 1.0
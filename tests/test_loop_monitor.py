@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from app.loop_monitor import BlockingCallDetector, LagHistogram, LoopLagMonitor
+
+
+def _block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_lag_histogram_buckets() -> None:
+    """Test that lags land in the right buckets"""
+    histogram = LagHistogram()
+    for lag_ms in [0.5, 3, 70, 5000]:
+        histogram.record(lag_ms)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["max_ms"] == 5000
+    assert snapshot["buckets"] == {
+        "le_1ms": 1,
+        "le_5ms": 1,
+        "le_10ms": 0,
+        "le_25ms": 0,
+        "le_50ms": 0,
+        "le_100ms": 1,
+        "le_250ms": 0,
+        "le_500ms": 0,
+        "le_1000ms": 0,
+        "gt_1000ms": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_monitor_records_blocking_work(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that synchronous work on the loop shows up as lag"""
+    monitor = LoopLagMonitor(interval=0.01, warning_ms=50)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    _block_the_loop(0.1)
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    with caplog.at_level("INFO", logger="app.loop_monitor"):
+        snapshot = monitor.report()
+        # Reporting starts a new histogram, with nothing over the threshold
+        assert monitor.histogram.count == 0
+        monitor.report()
+    assert float(str(snapshot["max_ms"])) >= 80
+    # Over the threshold it's a warning, visible without logging configured
+    assert [record.levelname for record in caplog.records] == ["WARNING", "INFO"]
+
+
+@pytest.mark.asyncio
+async def test_detector_logs_blocking_stack(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that the detector logs the stack of a callback blocking the loop"""
+    detector = BlockingCallDetector(threshold=0.05)
+    detector.start()
+    await asyncio.sleep(0.02)
+    with caplog.at_level("WARNING", logger="app.loop_monitor"):
+        _block_the_loop(0.3)
+        await asyncio.sleep(0.02)
+    await detector.stop()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 1
+    assert "Event loop blocked" in messages[0]
+    assert "_block_the_loop" in messages[0]
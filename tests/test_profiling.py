@@ -0,0 +1,63 @@
+import pstats
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.profiling import PROFILE_HEADER, RequestProfiler, sign_profiling_request
+
+SECRET = "test-secret"
+
+
+def _client(profiler: RequestProfiler) -> TestClient:
+    app = FastAPI()
+    app.middleware("http")(profiler.middleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict[str, int]:
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+def test_signed_header_writes_profile(tmp_path: Path) -> None:
+    """Test that a correctly signed request is profiled into a named file"""
+    client = _client(RequestProfiler(str(tmp_path), secret=SECRET))
+    header = sign_profiling_request(SECRET, "/items/1", int(time.time()) + 60)
+
+    response = client.get(
+        "/items/1", headers={PROFILE_HEADER: header, "X-Request-ID": "abc123"}
+    )
+
+    assert response.status_code == 200
+    files = list(tmp_path.iterdir())
+    assert len(files) == 1
+    assert files[0].name.endswith("_GET_items_item_id_abc123.prof")
+    assert response.headers["X-Profile-File"] == files[0].name
+    assert pstats.Stats(str(files[0])).get_stats_profile().func_profiles
+
+
+def test_invalid_or_expired_header_is_ignored(tmp_path: Path) -> None:
+    """Test that unsigned, expired or other-path headers don't profile"""
+    client = _client(RequestProfiler(str(tmp_path), secret=SECRET))
+    expired = sign_profiling_request(SECRET, "/items/1", int(time.time()) - 1)
+    other_path = sign_profiling_request(SECRET, "/items/2", int(time.time()) + 60)
+    forged = sign_profiling_request("wrong", "/items/1", int(time.time()) + 60)
+
+    for header in [expired, other_path, forged, "garbage"]:
+        response = client.get("/items/1", headers={PROFILE_HEADER: header})
+        assert response.status_code == 200
+        assert "X-Profile-File" not in response.headers
+
+    assert not tmp_path.exists() or not list(tmp_path.iterdir())
+
+
+def test_sampling_profiles_without_header(tmp_path: Path) -> None:
+    """Test that a sample rate of 1 profiles every request"""
+    client = _client(RequestProfiler(str(tmp_path), sample_rate=1.0))
+
+    client.get("/items/1")
+    client.get("/items/2")
+
+    assert len(list(tmp_path.iterdir())) == 2
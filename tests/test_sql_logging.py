@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.sql_logging import current_route, fingerprint, install_sql_logging, redact
+
+
+def test_fingerprint_groups_query_shapes() -> None:
+    """Test that literals, placeholders and IN lists are normalized"""
+    assert fingerprint(
+        "SELECT *\n  FROM profiles WHERE email = 'petr@indiepitcher.com' LIMIT 10"
+    ) == ("SELECT * FROM profiles WHERE email = ? LIMIT ?")
+    assert fingerprint("SELECT id FROM t WHERE id IN (?, ?, ?)") == fingerprint(
+        "SELECT id FROM t WHERE id IN (?, ?)"
+    )
+
+
+def test_redact_hides_strings() -> None:
+    """Test that string parameters are replaced by their type and length"""
+    assert redact(("petr@indiepitcher.com", 5, None)) == ["<str:21>", 5, None]
+    assert redact([{"email": "a@b.cz"}]) == [{"email": "<str:6>"}]
+
+
+@pytest.mark.asyncio
+async def test_full_and_slow_query_logging(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Test that full mode logs every statement and slow ones go to the slow log"""
+    monkeypatch.setenv("SQL_LOG_MODE", "full")
+    monkeypatch.setenv("SQL_SLOW_QUERY_MS", "0")
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_sql_logging(engine)
+    current_route.set("GET /profiles/")
+
+    with caplog.at_level("INFO", logger="app.sql"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT :email"), {"email": "petr@x.com"})
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["fingerprint"] == "SELECT ?"
+    assert record["parameters"] == ["<str:10>"]
+    assert record["route"] == "GET /profiles/"
+    assert record["duration_ms"] >= 0
+
+    monkeypatch.setenv("SQL_LOG_MODE", "off")
+    monkeypatch.setenv("SQL_SLOW_QUERY_MS", "0.000001")
+    slow_engine = create_async_engine("sqlite+aiosqlite://")
+    install_sql_logging(slow_engine)
+    caplog.clear()
+
+    with caplog.at_level("INFO", logger="app.sql"):
+        async with slow_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    assert [record.name for record in caplog.records] == ["app.sql.slow"]
+
+    await engine.dispose()
+    await slow_engine.dispose()
@@ -0,0 +1,141 @@
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.tracing import (
+    CLIENT,
+    SERVER,
+    JsonLinesExporter,
+    OTLPExporter,
+    Span,
+    Tracer,
+    install_sql_tracing,
+    span,
+    traced,
+)
+
+
+class CollectingExporter:
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, spans: list[Span]) -> None:
+        self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_app(tracer: Tracer) -> FastAPI:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_sql_tracing(engine)
+    app = FastAPI()
+
+    @traced("load_user")
+    async def load_user() -> str:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT 'petr'"))).scalar_one()
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: int, user: str = Depends(load_user)) -> dict[str, str]:
+        with span("render"):
+            return {"name": user}
+
+    app.middleware("http")(tracer.middleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_sampled_request_records_span_tree() -> None:
+    """Test that middleware, dependency and SQL spans form one trace"""
+    exporter = CollectingExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app(tracer)), base_url="http://test"
+    ) as client:
+        response = await client.get("/users/1")
+    tracer.close()
+
+    assert response.status_code == 200
+    spans = {item.name: item for item in exporter.spans}
+    root = spans["GET /users/{user_id}"]
+    assert root.kind == SERVER
+    assert root.parent_id is None
+    assert root.attributes["http.status_code"] == 200
+    assert spans["load_user"].parent_id == root.span_id
+    assert spans["render"].parent_id == root.span_id
+    assert spans["db.query"].parent_id == spans["load_user"].span_id
+    assert spans["db.query"].kind == CLIENT
+    assert spans["db.query"].attributes["db.statement"] == "SELECT ?"
+    assert len({item.trace.trace_id for item in exporter.spans}) == 1
+    assert response.headers["traceparent"].split("-")[1] == root.trace.trace_id
+
+
+@pytest.mark.asyncio
+async def test_sampling_decision() -> None:
+    """Test that unsampled requests create no spans and traceparent is followed"""
+    exporter = CollectingExporter()
+    tracer = Tracer(exporter, sample_rate=0.0)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    async with AsyncClient(
+        transport=ASGITransport(app=create_app(tracer)), base_url="http://test"
+    ) as client:
+        unsampled = await client.get("/users/1")
+        continued = await client.get(
+            "/users/1", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"}
+        )
+    tracer.close()
+
+    assert "traceparent" not in unsampled.headers
+    assert continued.headers["traceparent"].split("-")[1] == trace_id
+    assert {item.trace.trace_id for item in exporter.spans} == {trace_id}
+    root = next(item for item in exporter.spans if item.kind == SERVER)
+    assert root.parent_id == "00f067aa0ba902b7"
+
+
+@pytest.mark.asyncio
+async def test_exporters(tmp_path: Path) -> None:
+    """Test the JSON lines file and the OTLP/HTTP JSON exporters"""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200)
+
+    path = f"{tmp_path}/traces.jsonl"
+    otlp = OTLPExporter(
+        "http://collector:4318",
+        service_name="test",
+        client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+    collected = CollectingExporter()
+    tracer = Tracer(collected, sample_rate=1.0)
+    root = tracer.start_trace("GET /")
+    assert root is not None
+    root.set_attribute("http.status_code", 200)
+    root.end()
+    tracer.close()
+
+    jsonl = JsonLinesExporter(path)
+    jsonl.export(collected.spans)
+    jsonl.shutdown()
+    otlp.export(collected.spans)
+
+    with open(path) as file:
+        record = json.loads(file.readline())
+    assert record["name"] == "GET /"
+    assert record["attributes"] == {"http.status_code": 200}
+
+    assert str(requests[0].url) == "http://collector:4318/v1/traces"
+    payload = json.loads(requests[0].content)
+    [otlp_span] = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp_span["traceId"] == root.trace.trace_id
+    assert otlp_span["attributes"] == [
+        {"key": "http.status_code", "value": {"intValue": "200"}}
+    ]